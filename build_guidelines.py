@@ -0,0 +1,16 @@
+import argparse
+
+from utils.file_utils import GUIDELINE_DIR, GUIDELINE_BUNDLE
+from utils.guideline_bundle import build_bundle
+
+# policy_docs_new_after/<locale>/<category>.txt + 예외 문구 → 가이드라인 번들(JSON) 컴파일
+# 입력이 바뀌지 않았으면 재빌드 생략 (--force로 강제)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile format guidelines into one bundle")
+    parser.add_argument("--root", default=GUIDELINE_DIR, help="가이드라인 폴더 (locale별 하위 폴더)")
+    parser.add_argument("--out", default=GUIDELINE_BUNDLE, help="번들 저장 경로")
+    parser.add_argument("--model", default="gpt-4o", help="토큰 수 계산 기준 모델")
+    parser.add_argument("--force", action="store_true", help="입력이 같아도 다시 빌드")
+    args = parser.parse_args()
+
+    build_bundle(root=args.root, path=args.out, model=args.model, force=args.force)
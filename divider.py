@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 
 # 기준 디렉토리: locale별 하위 폴더들을 포함한 상위 경로
 root_dir = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/policy_docs_new_after"
@@ -13,10 +14,14 @@ sections = {
 }
 section_header_pattern = re.compile(r"^\[(.+?)\]")
 
+# 섹션 파일(category txt) 자체가 분할 결과이므로 같은 폴더 안에서 다시 분할하지 않음
+category_files = {f"{suffix}.txt" for suffix in sections.values()}
+force = "--force" in sys.argv
+
 # 루트 디렉토리 아래 모든 하위 폴더 순회
 for dirpath, _, filenames in os.walk(root_dir):
     for filename in filenames:
-        if not filename.endswith(".txt"):
+        if not filename.endswith(".txt") or filename in category_files:
             continue
 
         file_path = os.path.join(dirpath, filename)
@@ -45,9 +50,14 @@ for dirpath, _, filenames in os.walk(root_dir):
                 section_contents[current_section].append(line)
 
         # 동일 폴더 내에 분리된 파일 저장
+        # 이미 있는 category 파일은 수작업 수정본이므로 덮어쓰지 않음 (--force로만 재생성)
+        # 예외 문구 추가/번들 생성은 build_guidelines.py에서 처리
         for suffix, content in section_contents.items():
             if content:
                 new_filename = f"{suffix}.txt"
                 out_path = os.path.join(dirpath, new_filename)
+                if os.path.exists(out_path) and not force:
+                    print(f"⏭️  Skipped (exists): {out_path}")
+                    continue
                 with open(out_path, "w", encoding="utf-8") as out_file:
                     out_file.writelines(content)
@@ -1,34 +1,8 @@
-import os
+from utils.guideline_bundle import build_bundle
 
-exceptions_text = """
-[Exceptions]
+# 예외 문구(EXCEPTIONS_TEXT)는 더 이상 category txt 파일에 직접 append 하지 않음
+# (실행할 때마다 파일이 커지고 접두사 해시가 바뀌어 prompt cache가 깨지던 문제)
+# → 번들 컴파일 시 [Exceptions]가 없는 가이드라인에만 메모리에서 덧붙임 (여러 번 실행해도 동일)
 
-- Do not apply the formatting rules to numbers that are part of:
-  - telephone numbers
-  - addresses
-  - identification codes
-  - or clearly unordered lists of numbers with no separators
-
-- If the numbers or formats (e.g., 10:00, 12/31, $15) appear to be part of such non-linguistic constructs based on the sentence context, do not apply localization guidelines.
-
-- Always consider the context of the original sentence before making changes.
-"""
-
-BASE_DIR = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/policy_docs_new_after"
-CATEGORIES = ["currency.txt", "date.txt", "numeric.txt", "time.txt"]
-
-# 순회하면서 예외 문구 추가
-for locale in os.listdir(BASE_DIR):
-    locale_dir = os.path.join(BASE_DIR, locale)
-    if not os.path.isdir(locale_dir):
-        continue
-
-    for cat in CATEGORIES:
-        file_path = os.path.join(locale_dir, cat)
-        if not os.path.exists(file_path):
-            continue
-
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write("\n" + exceptions_text.strip() + "\n")
-
-        print(f"Appended to: {file_path}")
+if __name__ == "__main__":
+    build_bundle()
@@ -2,20 +2,66 @@
 import os
 import re
 import json
+import argparse
+import threading
 from glob import glob
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from time import time
 
 from prompt_builder.build_prompt import (
     build_emoji_check_prompt,
     build_missing_check_prompt,
     build_addition_check_prompt,
+    build_fused_check_prompt,
+    build_missing_check_batch_prompt,
+    build_addition_check_batch_prompt,
 )
-from utils.gpt_client import ask_gpt
+from utils.gpt_client import ask_gpt, response_cache_stats, merge_response_cache_stats, start_batch_mode
+from utils.batch_runner import BATCH_PRICE_FACTOR, make_batch_backend, is_collecting
+from utils.line_dedup import LineDedup, cross_file_keys
+from utils.run_journal import FileJournal, JOURNAL_DIRNAME, rebuild_usage_log
+from utils.alignment import aligned_pairs
+from utils.llm_client import chat_client_stats
+from utils.concurrency import LLM_CONCURRENCY_MAX, describe_limiter
+from utils.metrics import (
+    inc, observe, metric_labels, set_metric_labels, in_context, metrics_snapshot, absorb_metrics,
+    write_metrics, serve_metrics,
+)
+from utils.tracing import start_tracing, start_span, span, timed, current_span_id
 
 SAVE_RAW_RESPONSES = False
 PRESERVE_EMPTY_LINES = True
 
+# 라인 단위 동시 처리 스레드 수 (1 = 기존 직렬 실행, 예: LLM_CONCURRENCY_MAX로 올리면 줄 단위 동시 처리)
+# 한 줄 안의 emoji → missing → faithfulness 체인은 항상 순서대로 실행됨
+# 실제 동시 API 호출 수는 AIMD 제어기(utils/concurrency)가 429/지연에 맞춰 이 범위 안에서 조절
+MAX_CONCURRENCY = 1
+
+# 라인 내부 검수 방식
+# - "chained"    : emoji → missing → faithfulness 순차 실행 (이전 suggestion이 다음 입력)
+# - "speculative": 세 검수를 원문 번역으로 동시에 실행하고, 입력이 바뀐 하위 검수만 재실행
+# - "batched"    : missing/faithfulness를 BATCH_SIZE 줄씩 묶어 한 요청으로 검수 (emoji는 단일 라인)
+# - "fused"      : 세 검수를 한 번의 호출(통합 프롬프트)로 판정
+CHECK_MODE = "chained"
+
+# batched 모드에서 한 요청에 담을 줄 수
+BATCH_SIZE = 10
+
+# 실행 전체에서 동일한 (source_line, trans_line, target) 쌍은 한 번만 검수하고 결과 공유
+DEDUP_LINES = True
+
+# batched 모드 저널(체크포인트) 단위: 이 줄 수씩 묶어 검수하고 끝날 때마다 라인 판정을 기록
+# (다른 모드는 줄이 끝나는 대로 바로 기록하므로 묶음 경계에서 기다리지 않음)
+CHECKPOINT_EVERY = 32
+
+CALLS_PER_LINE = {
+    "chained": "2~3 (emoji conditional, chained by suggestions)",
+    "speculative": "2~3 in parallel (emoji conditional, re-run when a suggestion changes the input)",
+    "fused": "1 (fused emoji/missing/faithfulness verdict)",
+    "batched": f"~2/{BATCH_SIZE} (batched missing/faithfulness, emoji conditional, single-line fallback)",
+}
+
 ROOT_INPUT = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/data/input2_json"
 ROOT_OUTPUT = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/data/output_content"
 
@@ -27,6 +73,12 @@ TARGET_FOLDERS = [
 PROMPT_PRICE_PER_1K = 0.005
 COMPLETION_PRICE_PER_1K = 0.025
 
+# --batch 모드 작업 폴더 (라운드별 입력/출력 JSONL)
+BATCH_DIRNAME = "_batch"
+
+# --trace 기본 저장 폴더 (ROOT_OUTPUT 아래, 프로세스별 span JSONL → trace_report.py로 분석)
+TRACE_DIRNAME = "_trace"
+
 grand_usage = {"semantic": defaultdict(int)}
 
 # 이모지 판별 정규식
@@ -52,9 +104,52 @@ EMOJI_REGEX = re.compile(EMOJI_PATTERN)
 def has_emoji(text: str) -> bool:
     return bool(text and EMOJI_REGEX.search(text))
 
-def usd_cost(prompt_tokens: int, completion_tokens: int) -> float:
-    return (prompt_tokens / 1000 * PROMPT_PRICE_PER_1K) + \
-           (completion_tokens / 1000 * COMPLETION_PRICE_PER_1K)
+_WORD_REGEX = re.compile(r"\w")
+
+def extract_emoji_sequence(text: str) -> list:
+    """
+    이모지 클러스터(ZWJ 시퀀스/스킨톤 포함)를 등장 순서대로 추출.
+    각 항목은 (이모지, 위치) — 위치는 앞/뒤 글자 유무 기준 "start" | "middle" | "end" | "only".
+    VS16(U+FE0F)은 표시 방식만 바꾸므로 비교에서 제외.
+    """
+    seq = []
+    for m in EMOJI_REGEX.finditer(text or ""):
+        has_before = bool(_WORD_REGEX.search(text[:m.start()]))
+        has_after = bool(_WORD_REGEX.search(text[m.end():]))
+        if has_before and has_after:
+            pos = "middle"
+        elif has_before:
+            pos = "end"
+        elif has_after:
+            pos = "start"
+        else:
+            pos = "only"
+        seq.append((m.group().replace(VS16, ""), pos))
+    return seq
+
+def needs_emoji_check(src_line: str, trn_line: str) -> bool:
+    """
+    이모지가 한쪽이라도 있고, 양쪽 이모지 시퀀스(종류/개수/순서/상대 위치)가 다를 때만 True.
+    동일하면 LLM 호출 없이 emoji_issue=False로 판정.
+    """
+    if not (has_emoji(src_line) or has_emoji(trn_line)):
+        return False
+    return extract_emoji_sequence(src_line) != extract_emoji_sequence(trn_line)
+
+def usd_cost(prompt_tokens: int, completion_tokens: int,
+             batch_prompt_tokens: int = 0, batch_completion_tokens: int = 0) -> float:
+    """batch_* = 그중 Batch API 결과로 받은 토큰 (BATCH_PRICE_FACTOR 단가, 나머지 실시간 호출은 정가)"""
+    prompt_billed = prompt_tokens - batch_prompt_tokens + batch_prompt_tokens * BATCH_PRICE_FACTOR
+    completion_billed = completion_tokens - batch_completion_tokens + batch_completion_tokens * BATCH_PRICE_FACTOR
+    return ((prompt_billed / 1000 * PROMPT_PRICE_PER_1K) +
+            (completion_billed / 1000 * COMPLETION_PRICE_PER_1K))
+
+def usage_cost(usage: dict) -> float:
+    """파일/폴더 usage dict 요금 (batch_* 항목이 없으면 전부 정가)"""
+    return usd_cost(
+        usage["prompt_tokens"], usage["completion_tokens"],
+        usage.get("batch_prompt_tokens", 0), usage.get("batch_completion_tokens", 0),
+    )
 
 def normalize_gpt_json(raw):
     if isinstance(raw, dict):
@@ -93,80 +188,536 @@ def _pick_next_translation(res: dict, fallback: str) -> str:
                 return s.strip()
     return fallback
 
-def process_file(file_path: str, semantic_dir: str):
-    filename = os.path.basename(file_path)
+# 재시도 후에도 실패한 단계의 판정 dict에 넣는 표시 (값 = 오류 메시지). 그 줄은 "검수 실패"로 출력
+LLM_ERROR_KEY = "llm_error"
+
+def _new_tally() -> dict:
+    # batch_* = Batch API 결과로 받은 토큰 (할인 단가 적용분), errors = 재시도 후에도 실패한 호출 수
+    # calls_made = 실제 API(또는 Batch) 호출 수, cache_hits = 응답 캐시로 대신한 호출 수 (과금 없음)
+    return {"prompt_tokens": 0, "completion_tokens": 0, "batch_prompt_tokens": 0, "batch_completion_tokens": 0,
+            "calls_made": 0, "cache_hits": 0, "errors": 0}
+
+def _tally_usage(tally: dict, usage: dict) -> None:
+    tally["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    tally["completion_tokens"] += usage.get("completion_tokens", 0)
+    if usage.get("batch"):
+        tally["batch_prompt_tokens"] += usage.get("prompt_tokens", 0)
+        tally["batch_completion_tokens"] += usage.get("completion_tokens", 0)
+    if usage.get("error"):
+        tally["errors"] += 1
+    if usage.get("cache_hit"):
+        tally["cache_hits"] += 1
+    elif not usage.get("batch_pending"):
+        # Batch 수집 패스의 자리표시 응답은 호출이 아님
+        tally["calls_made"] += 1
+
+def _merge_tally(dst: dict, src: dict) -> dict:
+    for k, v in src.items():
+        dst[k] = dst.get(k, 0) + v
+    return dst
+
+def _ask_json(messages, tally: dict, stage: str) -> dict:
+    """ask_gpt 호출 + 라인 단위 usage 누적 + JSON 정규화 (stage = 계측 라벨: emoji / missing / addition / fused)"""
+    with metric_labels(stage=stage):
+        raw, usage = ask_gpt(list(messages))
+    _tally_usage(tally, usage)
+    if usage.get("error"):
+        # 빈 판정(= 문제 없음)으로 처리하지 않도록 실패 표시
+        return {LLM_ERROR_KEY: usage["error"]}
+    return normalize_gpt_json(raw)
+
+def _line_errors(line_result: dict) -> dict:
+    """단계별 LLM 오류 {stage: 메시지} (없으면 빈 dict)"""
+    return {
+        stage: line_result[stage][LLM_ERROR_KEY]
+        for stage in ("emoji", "missing", "addition")
+        if LLM_ERROR_KEY in line_result[stage]
+    }
+
+def _check_line(src_line: str, trn_line: str) -> dict:
+    """
+    한 줄 검수: emoji → missing → faithfulness (이전 단계 suggestion이 다음 단계 입력)
+    """
+    tally = _new_tally()
+    current_trn = trn_line
+
+    # Emoji check
+    if needs_emoji_check(src_line, current_trn):
+        res_emoji = _ask_json(build_emoji_check_prompt(src_line, current_trn), tally, "emoji")
+        current_trn = _pick_next_translation(res_emoji, current_trn)
+    else:
+        res_emoji = {"emoji_issue": False, "reasons": [], "suggestions": []}
+
+    # Missing content check
+    res_missing = _ask_json(build_missing_check_prompt(src_line, current_trn), tally, "missing")
+    current_trn = _pick_next_translation(res_missing, current_trn)
+
+    # Faithfulness check
+    res_addition = _ask_json(build_addition_check_prompt(src_line, current_trn), tally, "addition")
+    current_trn = _pick_next_translation(res_addition, current_trn)
+
+    return {
+        "emoji": res_emoji,
+        "missing": res_missing,
+        "addition": res_addition,
+        "final": current_trn,
+        "usage": tally,
+    }
+
+# speculative 모드 단계 호출용 공용 스레드 풀 (프로세스당 1개, 크기 = AIMD 최대 동시 호출 수)
+# 줄 스레드가 단계 결과를 기다리므로 줄 풀과는 분리 (같은 풀이면 줄 작업끼리 자리를 막아 교착)
+_stage_pool: ThreadPoolExecutor | None = None
+_stage_pool_lock = threading.Lock()
+
+def _get_stage_pool() -> ThreadPoolExecutor:
+    global _stage_pool
+    if _stage_pool is None:
+        with _stage_pool_lock:
+            if _stage_pool is None:
+                _stage_pool = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY_MAX, thread_name_prefix="spec-stage")
+    return _stage_pool
+
+def _check_line_speculative(src_line: str, trn_line: str) -> dict:
+    """
+    한 줄 검수 (speculative): emoji/missing/faithfulness를 원문 번역 기준으로 동시에 실행.
+    앞 단계 suggestion으로 입력이 달라진 하위 검수만 다시 실행하므로 결과는 chained와 동일.
+    """
+    need_emoji = needs_emoji_check(src_line, trn_line)
+    spec_tallies = [_new_tally() for _ in range(3)]
+    ask_json = in_context(_ask_json)  # 계측 라벨(locale 등)을 풀 스레드로 전달
+    pool = _get_stage_pool()
+    f_emoji = (
+        pool.submit(ask_json, build_emoji_check_prompt(src_line, trn_line), spec_tallies[0], "emoji")
+        if need_emoji else None
+    )
+    f_missing = pool.submit(ask_json, build_missing_check_prompt(src_line, trn_line), spec_tallies[1], "missing")
+    f_addition = pool.submit(ask_json, build_addition_check_prompt(src_line, trn_line), spec_tallies[2], "addition")
+    spec_emoji = f_emoji.result() if f_emoji else None
+    spec_missing = f_missing.result()
+    spec_addition = f_addition.result()
+
+    tally = _new_tally()
+    for t in spec_tallies:
+        _merge_tally(tally, t)
+
+    current_trn = trn_line
+
+    # Emoji check
+    if need_emoji:
+        res_emoji = spec_emoji
+        current_trn = _pick_next_translation(res_emoji, current_trn)
+    else:
+        res_emoji = {"emoji_issue": False, "reasons": [], "suggestions": []}
+
+    # Missing content check (입력이 바뀐 경우에만 재실행)
+    if current_trn == trn_line:
+        res_missing = spec_missing
+    else:
+        res_missing = _ask_json(build_missing_check_prompt(src_line, current_trn), tally, "missing")
+    current_trn = _pick_next_translation(res_missing, current_trn)
+
+    # Faithfulness check (입력이 바뀐 경우에만 재실행)
+    if current_trn == trn_line:
+        res_addition = spec_addition
+    else:
+        res_addition = _ask_json(build_addition_check_prompt(src_line, current_trn), tally, "addition")
+    current_trn = _pick_next_translation(res_addition, current_trn)
+
+    return {
+        "emoji": res_emoji,
+        "missing": res_missing,
+        "addition": res_addition,
+        "final": current_trn,
+        "usage": tally,
+    }
+
+def _check_line_fused(src_line: str, trn_line: str) -> dict:
+    """
+    한 줄 검수 (fused): 통합 프롬프트 1회 호출 후 결과를 emoji/missing/addition 구조로 분해.
+    이모지가 없거나 양쪽 이모지 시퀀스가 같으면 emoji_issue는 항상 False (chained와 동일).
+    """
+    tally = _new_tally()
+    res = _ask_json(build_fused_check_prompt(src_line, trn_line), tally, "fused")
+
+    if needs_emoji_check(src_line, trn_line):
+        res_emoji = {
+            "emoji_issue": res.get("emoji_issue", False),
+            "reasons": _list(res.get("emoji_reasons")),
+            "suggestions": [],
+        }
+    else:
+        res_emoji = {"emoji_issue": False, "reasons": [], "suggestions": []}
+    res_missing = {
+        "missing_content": res.get("missing_content", False),
+        "missing_spans": _list(res.get("missing_spans")),
+        "reasons": _list(res.get("missing_reasons")),
+        "suggestions": [],
+    }
+    res_addition = {
+        "faithfulness_issue": res.get("faithfulness_issue", False),
+        "faithfulness_type": res.get("faithfulness_type", "none"),
+        "added_spans": _list(res.get("added_spans")),
+        "reasons": _list(res.get("faithfulness_reasons")),
+        "suggestions": _list(res.get("suggestions")),
+    }
+    if LLM_ERROR_KEY in res:
+        for r in (res_emoji, res_missing, res_addition):
+            r[LLM_ERROR_KEY] = res[LLM_ERROR_KEY]
+
+    return {
+        "emoji": res_emoji,
+        "missing": res_missing,
+        "addition": res_addition,
+        "final": _pick_next_translation(res, trn_line),
+        "usage": tally,
+    }
+
+LINE_CHECKERS = {
+    "chained": _check_line,
+    "speculative": _check_line_speculative,
+    "fused": _check_line_fused,
+}
+
+# 라인 작업용 공용 스레드 풀 (프로세스당 1개, 크기 = MAX_CONCURRENCY)
+# 호출마다 풀을 새로 만들지 않으므로 파일/체크포인트 경계에서 스레드를 다시 띄우지 않음
+_line_pool: ThreadPoolExecutor | None = None
+_line_pool_lock = threading.Lock()
+
+def _get_line_pool() -> ThreadPoolExecutor:
+    global _line_pool
+    if _line_pool is None:
+        with _line_pool_lock:
+            if _line_pool is None:
+                _line_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="line")
+    return _line_pool
+
+def _run_parallel(fn, items: list, on_done=None) -> list:
+    """
+    fn을 items에 적용. 결과는 입력 순서 그대로 (MAX_CONCURRENCY > 1 이면 공용 줄 풀 사용).
+    on_done(i, result): 항목이 끝나는 대로(완료 순서) 호출한 스레드에서 실행
+    """
+    results = [None] * len(items)
+    if MAX_CONCURRENCY <= 1 or len(items) <= 1:
+        for i, item in enumerate(items):
+            results[i] = fn(item)
+            if on_done is not None:
+                on_done(i, results[i])
+        return results
+    run = in_context(fn)
+    pool = _get_line_pool()
+    futures = {pool.submit(run, item): i for i, item in enumerate(items)}
+    for future in as_completed(futures):
+        i = futures[future]
+        results[i] = future.result()
+        if on_done is not None:
+            on_done(i, results[i])
+    return results
+
+def _run_line_jobs(jobs: list, worker, on_done=None) -> list:
+    """
+    (src_line, trn_line) 작업 목록을 worker로 처리. 결과는 입력 순서 그대로 반환.
+    MAX_CONCURRENCY > 1 이면 서로 독립인 줄들을 스레드 풀에서 동시에 처리.
+    추적이 켜져 있으면 줄마다 "line" span (하위에 단계별 llm span).
+    """
+    def run_job(job):
+        with span("line", text=job[1][:80]):
+            return worker(*job)
+
+    return _run_parallel(run_job, jobs, on_done)
+
+# =========================
+# batched 모드 (여러 줄을 한 요청으로)
+# =========================
+def _split_tally(tally: dict, n: int) -> list:
+    """usage를 n등분 (정수 유지, 합계 보존)"""
+    shares = [_new_tally() for _ in range(n)]
+    for k, total in tally.items():
+        for j in range(n):
+            shares[j][k] = (total * (j + 1)) // n - (total * j) // n
+    return shares
+
+def _parse_batch_items(raw, n: int, flag_key: str) -> dict:
+    """
+    배치 응답 → {item 번호: 판정 dict}. flag_key가 없거나 번호가 범위를 벗어난 항목은 버림.
+    """
+    items = raw
+    if isinstance(raw, str):
+        s = raw.strip()
+        if s.startswith("```"):
+            s = s.strip("`")
+            parts = s.split("\n", 1)
+            if parts and parts[0].lower().startswith("json"):
+                s = parts[1] if len(parts) > 1 else ""
+        if "[" in s and "]" in s:
+            s = s[s.find("["):s.rfind("]")+1]
+        try:
+            items = json.loads(s)
+        except Exception:
+            items = []
+    if isinstance(items, dict):
+        items = items.get("results", items.get("items", []))
+    if not isinstance(items, list):
+        return {}
+
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict) or flag_key not in item:
+            continue
+        try:
+            idx = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= idx <= n and idx not in parsed:
+            parsed[idx] = {k: v for k, v in item.items() if k != "id"}
+    return parsed
+
+def _run_batched_stage(pairs: list, build_batch, build_single, flag_key: str, tallies: list, stage: str) -> list:
+    """
+    pairs를 BATCH_SIZE씩 묶어 한 요청으로 검수. 응답에서 빠졌거나 깨진 항목은 단일 라인 요청으로 폴백.
+    배치 usage는 묶인 줄들에 균등 배분해 tallies[i]에 누적.
+    """
+    chunks = [list(range(k, min(k + BATCH_SIZE, len(pairs)))) for k in range(0, len(pairs), BATCH_SIZE)]
+
+    def run_chunk(idxs):
+        chunk_tally = _new_tally()
+        with metric_labels(stage=stage), span("batch", stage=stage, lines=len(idxs)):
+            raw, usage = ask_gpt(list(build_batch([pairs[i] for i in idxs])))
+        _tally_usage(chunk_tally, usage)
+        for i, share in zip(idxs, _split_tally(chunk_tally, len(idxs))):
+            _merge_tally(tallies[i], share)
+
+        if usage.get("batch_pending"):
+            # Batch 수집 패스: 묶음 요청 결과 대기 중 → 단일 라인 폴백 요청을 만들지 않음
+            return [{} for _ in idxs]
+        items = _parse_batch_items(raw, len(idxs), flag_key)
+        out = []
+        for pos, i in enumerate(idxs, start=1):
+            res = items.get(pos)
+            if res is None:
+                res = _ask_json(build_single(*pairs[i]), tallies[i], stage)
+            out.append(res)
+        return out
+
+    results = []
+    for chunk_out in _run_parallel(run_chunk, chunks):
+        results.extend(chunk_out)
+    return results
+
+def _check_lines_batched(jobs: list) -> list:
+    """
+    batched 모드 라인 검수. 단계 순서(emoji → missing → faithfulness)와
+    suggestion 체인은 chained와 같고, 단계 내부에서만 여러 줄을 한 요청으로 묶음.
+    """
+    tallies = [_new_tally() for _ in jobs]
+
+    # Emoji check (이모지 있는 줄만 단일 라인 요청)
+    def emoji_step(i):
+        src_line, trn_line = jobs[i]
+        if needs_emoji_check(src_line, trn_line):
+            res = _ask_json(build_emoji_check_prompt(src_line, trn_line), tallies[i], "emoji")
+            return res, _pick_next_translation(res, trn_line)
+        return {"emoji_issue": False, "reasons": [], "suggestions": []}, trn_line
+
+    emoji_out = _run_parallel(emoji_step, list(range(len(jobs))))
+    res_emoji = [r for r, _ in emoji_out]
+    current = [t for _, t in emoji_out]
+
+    # Missing content check (batched)
+    res_missing = _run_batched_stage(
+        [(jobs[i][0], current[i]) for i in range(len(jobs))],
+        build_missing_check_batch_prompt, build_missing_check_prompt, "missing_content", tallies, "missing",
+    )
+    current = [_pick_next_translation(r, t) for r, t in zip(res_missing, current)]
+
+    # Faithfulness check (batched)
+    res_addition = _run_batched_stage(
+        [(jobs[i][0], current[i]) for i in range(len(jobs))],
+        build_addition_check_batch_prompt, build_addition_check_prompt, "faithfulness_issue", tallies, "addition",
+    )
+    current = [_pick_next_translation(r, t) for r, t in zip(res_addition, current)]
+
+    return [
+        {
+            "emoji": res_emoji[i],
+            "missing": res_missing[i],
+            "addition": res_addition[i],
+            "final": current[i],
+            "usage": tallies[i],
+        }
+        for i in range(len(jobs))
+    ]
+
+def _run_checks(jobs: list, on_done=None) -> list:
+    """CHECK_MODE에 맞춰 (src_line, trn_line) 작업들을 검수. 결과는 입력 순서 (on_done은 _run_parallel과 같음)."""
+    if CHECK_MODE == "batched":
+        # 단계 단위로 묶어 검수하므로 모든 줄이 함께 끝남
+        results = _check_lines_batched(jobs)
+        if on_done is not None:
+            for i, result in enumerate(results):
+                on_done(i, result)
+        return results
+    return _run_line_jobs(jobs, LINE_CHECKERS[CHECK_MODE], on_done)
+
+def _check_jobs(jobs: list, target=None, dedup: LineDedup | None = None, on_done=None) -> list:
+    """
+    dedup이 있으면 (src_line, trn_line, target) 고유 키만 검수하고
+    판정은 모든 등장 위치에 공유 (usage는 등장 횟수로 배분).
+    on_done(i, result): jobs[i]의 판정이 나오는 대로 호출 (이미 검수된 키는 먼저)
+    """
+    if dedup is None:
+        return _run_checks(jobs, on_done)
+
+    keys = [(src, trn, target) for src, trn in jobs]
+    positions = defaultdict(list)   # 키 → jobs 위치 (같은 파일 안 중복 포함)
+    for i, key in enumerate(keys):
+        positions[key].append(i)
+    results = [None] * len(jobs)
+
+    def deliver(key):
+        for i in positions[key]:
+            verdict, usage = dedup.take(key)
+            verdict["usage"] = usage
+            results[i] = verdict
+            if on_done is not None:
+                on_done(i, verdict)
+
+    todo = dedup.pending(keys)
+    todo_keys = set(todo)
+    for key in positions:
+        if key not in todo_keys:
+            deliver(key)
+
+    def stored(j, result):
+        usage = result.pop("usage")
+        dedup.store(todo[j], result, usage)
+        deliver(todo[j])
+
+    _run_checks([(k[0], k[1]) for k in todo], stored)
+    return results
+
+def _line_pairs(data: dict) -> list:
+    """
+    text/trans를 검수 단위 (line_no, line_nos, src_line, trn_line) 목록으로.
+    줄 수가 같으면 줄 단위, 다르면 문장 정렬로 분할/병합된 줄을 한 단위로 묶음 (utils/alignment).
+    line_nos = 단위가 차지하는 실제 번역 줄 번호 (1-base), line_no = 그 첫 줄
+    """
+    units = []
+    src_lines = data.get("text", "").splitlines()
+    trn_lines = data.get("trans", "").splitlines()
+    for src_line, trn_line, trn_ids in aligned_pairs(src_lines, trn_lines):
+        line_nos = [j + 1 for j in trn_ids]
+        units.append((line_nos[0], line_nos, src_line, trn_line))
+    return units
+
+def register_file_lines(file_path: str, dedup: LineDedup, skip_lines=()) -> list:
+    """
+    사전 스캔: 파일의 검수 대상 라인 키를 dedup에 등록 (등장 횟수 집계용). 반환: 등록한 키 목록
+    skip_lines: 저널에 이미 완료로 기록된 줄 번호 (resume 시 다시 검수하지 않음)
+    """
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    target = data.get("target")
+    keys = []
+    for line_no, _, src_line, trn_line in _line_pairs(data):
+        if (src_line or trn_line) and line_no not in skip_lines:
+            keys.append((src_line, trn_line, target))
+            dedup.register(keys[-1])
+    return keys
+
+def process_file(
+    file_path: str,
+    semantic_dir: str,
+    dedup: LineDedup | None = None,
+    journal: FileJournal | None = None,
+):
+    filename = os.path.basename(file_path)
+    with timed("io"), open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
     source = data.get("source")
     target = data.get("target")
-    text = data.get("text", "")
-    trans = data.get("trans", "")
+    set_metric_labels(pipeline="content", locale=target or "")
 
-    src_lines = text.splitlines()
-    trn_lines = trans.splitlines()
-    max_len = max(len(src_lines), len(trn_lines))
+    # 1) 라인 쌍 수집 (빈 줄은 호출 없이 보존)
+    units = _line_pairs(data)
+    max_len = max(len(data.get("text", "").splitlines()), len(data.get("trans", "").splitlines()))
 
     sem_prompt_tokens = 0
     sem_completion_tokens = 0
+    sem_batch_prompt_tokens = 0
+    sem_batch_completion_tokens = 0
     semantic_issues_accum = []
     total_calls_made = 0
+    total_cache_hits = 0
+    total_errors = 0
+    failed_lines = []
 
     final_lines = []
     changed_lines = []
 
-    for i in range(max_len):
-        src_line = src_lines[i].strip() if i < len(src_lines) else ""
-        trn_line_original = trn_lines[i].strip() if i < len(trn_lines) else ""
+    # 2) 라인 검수 (동시 실행 가능, 결과는 입력 순서)
+    #    저널이 있으면 이미 완료된 줄은 건너뛰고, 줄 판정이 끝나는 대로 기록 (batched 모드는 CHECKPOINT_EVERY 줄 단위)
+    line_results = {}
+    if journal is not None:
+        done_lines, _ = journal.load()
+        for line_no, (verdict, usage) in done_lines.items():
+            line_results[line_no] = dict(verdict, usage=usage)
 
+    todo = [
+        (line_no, (src_line, trn_line)) for line_no, _, src_line, trn_line in units
+        if (src_line or trn_line) and line_no not in line_results
+    ]
+    step = CHECKPOINT_EVERY if journal is not None and CHECK_MODE == "batched" else max(len(todo), 1)
+    for start in range(0, len(todo), step):
+        chunk = todo[start:start + step]
+
+        def line_done(j, line_result, chunk=chunk):
+            line_no = chunk[j][0]
+            line_results[line_no] = line_result
+            # LLM 오류로 실패한 줄은 기록하지 않음 → --resume 때 다시 검수
+            if journal is not None and not _line_errors(line_result):
+                verdict = {k: v for k, v in line_result.items() if k != "usage"}
+                journal.record_line(line_no, verdict, line_result["usage"])
+
+        _check_jobs([pair for _, pair in chunk], target, dedup, line_done)
+
+    # 3) 원래 줄 순서대로 결과 조립
+    for line_no, line_nos, src_line, trn_line_original in units:
         if not src_line and not trn_line_original:
             if PRESERVE_EMPTY_LINES:
                 final_lines.append("")
             continue
 
-        current_trn = trn_line_original
-
-        # Emoji check
-        if has_emoji(src_line) or has_emoji(current_trn):
-            sys1, usr1 = build_emoji_check_prompt(src_line, current_trn)
-            res1_raw, usage1 = ask_gpt([sys1, usr1])
-            sem_prompt_tokens += usage1.get("prompt_tokens", 0)
-            sem_completion_tokens += usage1.get("completion_tokens", 0)
-            total_calls_made += 1
-            res_emoji = normalize_gpt_json(res1_raw)
-            current_trn = _pick_next_translation(res_emoji, current_trn)
-        else:
-            res_emoji = {"emoji_issue": False, "reasons": [], "suggestions": []}
-
-        # Missing content check
-        sys2, usr2 = build_missing_check_prompt(src_line, current_trn)
-        res2_raw, usage2 = ask_gpt([sys2, usr2])
-        sem_prompt_tokens += usage2.get("prompt_tokens", 0)
-        sem_completion_tokens += usage2.get("completion_tokens", 0)
-        total_calls_made += 1
-        res_missing = normalize_gpt_json(res2_raw)
-        current_trn = _pick_next_translation(res_missing, current_trn)
-
-        # Faithfulness check
-        sys3, usr3 = build_addition_check_prompt(src_line, current_trn)
-        res3_raw, usage3 = ask_gpt([sys3, usr3])
-        sem_prompt_tokens += usage3.get("prompt_tokens", 0)
-        sem_completion_tokens += usage3.get("completion_tokens", 0)
-        total_calls_made += 1
-        res_addition = normalize_gpt_json(res3_raw)
-        current_trn = _pick_next_translation(res_addition, current_trn)
-
-        emoji_issue = _b(res_emoji.get("emoji_issue"), False)
-        missing_issue = _b(res_missing.get("missing_content"), False)
-        faith_issue = _b(res_addition.get("faithfulness_issue"), False)
+        line_result = line_results[line_no]
+        res_emoji = line_result["emoji"]
+        res_missing = line_result["missing"]
+        res_addition = line_result["addition"]
+        current_trn = line_result["final"]
+
+        sem_prompt_tokens += line_result["usage"]["prompt_tokens"]
+        sem_completion_tokens += line_result["usage"]["completion_tokens"]
+        sem_batch_prompt_tokens += line_result["usage"].get("batch_prompt_tokens", 0)
+        sem_batch_completion_tokens += line_result["usage"].get("batch_completion_tokens", 0)
+        total_calls_made += line_result["usage"]["calls_made"]
+        total_cache_hits += line_result["usage"].get("cache_hits", 0)
+        total_errors += line_result["usage"].get("errors", 0)
+
+        # 실패한 단계는 판정 없음(None), 번역은 원문 유지 (일부 단계 suggestion만 반영하지 않음)
+        errors = _line_errors(line_result)
+        if errors:
+            failed_lines.extend(line_nos)
+            current_trn = trn_line_original
+        emoji_issue = None if "emoji" in errors else _b(res_emoji.get("emoji_issue"), False)
+        missing_issue = None if "missing" in errors else _b(res_missing.get("missing_content"), False)
+        faith_issue = None if "addition" in errors else _b(res_addition.get("faithfulness_issue"), False)
 
         final_lines.append(current_trn)
         if current_trn != trn_line_original:
-            changed_lines.append(i + 1)
+            changed_lines.extend(line_nos)
 
-        if emoji_issue or missing_issue or faith_issue:
+        if errors or emoji_issue or missing_issue or faith_issue:
             issue_item = {
-                "line_no": i + 1,
+                "line_no": line_no,
                 "source_line": src_line,
                 "trans_line": trn_line_original,
                 "final_trans_line": current_trn,
@@ -183,6 +734,12 @@ def process_file(file_path: str, semantic_dir: str):
                     "suggestions": _list(res_addition.get("suggestions")),
                 }
             }
+            if errors:
+                issue_item["failed"] = True
+                issue_item["errors"] = errors
+            if len(line_nos) > 1:
+                # 분할/병합으로 여러 번역 줄을 한 단위로 검수한 경우 마지막 줄 번호
+                issue_item["line_end"] = line_nos[-1]
             if SAVE_RAW_RESPONSES:
                 issue_item["raw"] = {
                     "emoji": res_emoji,
@@ -193,13 +750,22 @@ def process_file(file_path: str, semantic_dir: str):
 
     final_translation = "\n".join(final_lines)
 
+    # Batch 수집 패스는 판정이 아직 비어 있으므로 출력/저널을 남기지 않음
+    if is_collecting():
+        return None
+
+    sem_cost = usd_cost(sem_prompt_tokens, sem_completion_tokens, sem_batch_prompt_tokens, sem_batch_completion_tokens)
+    issue_count = sum(1 for item in semantic_issues_accum if not item.get("failed"))
     semantic_payload = {
         "source": source,
         "target": target,
         "file": filename,
         "summary": {
             "total_lines": max_len,
-            "issue_lines": len(semantic_issues_accum),
+            "issue_lines": issue_count,
+            # LLM 오류로 검수하지 못한 줄 (issues에 failed=True로 포함, 판정 None)
+            "failed_line_count": len(failed_lines),
+            "failed_lines": failed_lines,
         },
         "issues": semantic_issues_accum,
         "revised": final_translation,
@@ -211,51 +777,82 @@ def process_file(file_path: str, semantic_dir: str):
             "prompt_tokens": sem_prompt_tokens,
             "completion_tokens": sem_completion_tokens,
             "total_tokens": sem_prompt_tokens + sem_completion_tokens,
-            "cost_usd": round(usd_cost(sem_prompt_tokens, sem_completion_tokens), 4),
+            "cost_usd": round(sem_cost, 4),
             "calls_made": total_calls_made,
-            "calls_per_line": "2~3 (emoji conditional, chained by suggestions)",
+            "cache_hits": total_cache_hits,
+            "errors": total_errors,
+            "calls_per_line": CALLS_PER_LINE[CHECK_MODE],
         }
     }
 
     os.makedirs(semantic_dir, exist_ok=True)
     semantic_outpath = os.path.join(semantic_dir, filename)
-    with open(semantic_outpath, "w", encoding="utf-8") as f:
+    with timed("io"), open(semantic_outpath, "w", encoding="utf-8") as f:
         json.dump(semantic_payload, f, ensure_ascii=False, indent=2)
 
     print(f"✅ Processed: {filename}")
     rel_path = os.path.relpath(semantic_outpath, os.path.dirname(semantic_dir))
-    print(f"   - semantic  → {rel_path}  (issues: {len(semantic_issues_accum)})")
+    failed_note = f", ⚠️ LLM 오류로 검수 실패 {len(failed_lines)}줄" if failed_lines else ""
+    print(f"   - semantic  → {rel_path}  (issues: {issue_count}{failed_note})")
 
-    grand_usage["semantic"]["prompt_tokens"] += sem_prompt_tokens
-    grand_usage["semantic"]["completion_tokens"] += sem_completion_tokens
-    grand_usage["semantic"]["total_tokens"] += (sem_prompt_tokens + sem_completion_tokens)
+    file_usage = {
+        "prompt_tokens": sem_prompt_tokens,
+        "completion_tokens": sem_completion_tokens,
+        "total_tokens": sem_prompt_tokens + sem_completion_tokens,
+        "calls_made": total_calls_made,
+        "cache_hits": total_cache_hits,
+        "errors": total_errors,
+        "failed_line_count": len(failed_lines),
+        "changed_line_count": len(changed_lines),
+    }
+    if sem_batch_prompt_tokens or sem_batch_completion_tokens:
+        # Batch 결과로 받은 토큰 (할인 단가 적용분, 나머지는 실시간 호출)
+        file_usage["batch_prompt_tokens"] = sem_batch_prompt_tokens
+        file_usage["batch_completion_tokens"] = sem_batch_completion_tokens
+    if journal is not None and not failed_lines:
+        # 실패한 줄이 있으면 파일을 완료로 기록하지 않음 (--resume 때 그 줄만 다시 검수)
+        journal.record_done(file_usage)
+    inc("pipeline_lines_total", sum(1 for _, _, src_line, trn_line in units if src_line or trn_line))
+    inc("pipeline_cost_usd_total", sem_cost)
 
     return {
         "filename": filename,
-        "semantic": {
-            "prompt_tokens": sem_prompt_tokens,
-            "completion_tokens": sem_completion_tokens,
-            "total_tokens": sem_prompt_tokens + sem_completion_tokens,
-            "calls_made": total_calls_made,
-            "changed_line_count": len(changed_lines),
-        }
+        "semantic": file_usage,
     }
 
-def write_usage_log(log_dict, out_dir):
-    prompt_tokens = sum(v["prompt_tokens"] for v in log_dict.values())
-    completion_tokens = sum(v["completion_tokens"] for v in log_dict.values())
+def write_usage_log(log_dict, out_dir, cache_stats=None, client_stats=None, batch_stats=None):
+    # 파일마다 갱신 저장되므로 이전 _summary는 합산에서 제외
+    entries = [v for k, v in log_dict.items() if k != "_summary"]
+    prompt_tokens = sum(v["prompt_tokens"] for v in entries)
+    completion_tokens = sum(v["completion_tokens"] for v in entries)
+    batch_prompt_tokens = sum(v.get("batch_prompt_tokens", 0) for v in entries)
+    batch_completion_tokens = sum(v.get("batch_completion_tokens", 0) for v in entries)
     total_tokens = prompt_tokens + completion_tokens
-    cost_total = usd_cost(prompt_tokens, completion_tokens)
-    calls_made_total = sum(v.get("calls_made", 0) for v in log_dict.values())
+    cost_total = usd_cost(prompt_tokens, completion_tokens, batch_prompt_tokens, batch_completion_tokens)
+    calls_made_total = sum(v.get("calls_made", 0) for v in entries)
     log_dict["_summary"] = {
         "prompt_tokens": prompt_tokens,
         "completion_tokens": completion_tokens,
         "total_tokens": total_tokens,
         "cost_usd": round(cost_total, 4),
         "calls_made": calls_made_total,
+        "cache_hits": sum(v.get("cache_hits", 0) for v in entries),
+        "errors": sum(v.get("errors", 0) for v in entries),
+        "failed_line_count": sum(v.get("failed_line_count", 0) for v in entries),
     }
+    if batch_prompt_tokens or batch_completion_tokens:
+        log_dict["_summary"]["batch_prompt_tokens"] = batch_prompt_tokens
+        log_dict["_summary"]["batch_completion_tokens"] = batch_completion_tokens
+    if cache_stats is not None:
+        log_dict["_summary"]["response_cache"] = cache_stats
+    if client_stats:
+        # 프로세스별 LLM 클라이언트 통계 (AIMD 동시 호출 한도/이력 포함)
+        log_dict["_summary"]["llm_client"] = client_stats
+    if batch_stats is not None:
+        # Batch 모드 라운드별 제출/성공/실패 (비용은 batch_* 토큰에만 BATCH_PRICE_FACTOR 적용)
+        log_dict["_summary"]["batch"] = batch_stats
     os.makedirs(out_dir, exist_ok=True)
-    with open(os.path.join(out_dir, "token_usage_log.json"), "w", encoding="utf-8") as f:
+    with timed("io"), open(os.path.join(out_dir, "token_usage_log.json"), "w", encoding="utf-8") as f:
         json.dump(log_dict, f, ensure_ascii=False, indent=2)
 
 def safe_pick_10_numeric_jsons(input_folder: str):
@@ -270,8 +867,107 @@ def safe_pick_10_numeric_jsons(input_folder: str):
     candidates.sort(key=lambda t: t[0])
     return [p for _, p in candidates[:10]]
 
+def run_file(
+    fp: str, semantic_dir: str, dedup: LineDedup | None, journal: FileJournal | None,
+    trace_parent: str | None = None,
+) -> dict:
+    """process_file + 파일 단위 처리 시간/캐시 통계 (직렬/프로세스 풀 공통). trace_parent: 워커면 부모 프로세스 span id"""
+    cache_snapshot = response_cache_stats()
+    s = time()
+    folder_name = os.path.basename(os.path.dirname(semantic_dir))  # <ROOT_OUTPUT>/<folder>/semantic
+    with span("file", parent=trace_parent, file=os.path.basename(fp), folder=folder_name) as fs:
+        usage = process_file(fp, semantic_dir, dedup, journal)
+        fs.set(total_tokens=usage["semantic"]["total_tokens"], calls_made=usage["semantic"]["calls_made"])
+    usage["elapsed"] = time() - s
+    observe("pipeline_file_seconds", usage["elapsed"])
+    usage["response_cache"] = response_cache_stats(since=cache_snapshot)
+    usage["llm_client"] = chat_client_stats()
+    usage["metrics"] = metrics_snapshot()
+    return usage
+
+def _check_keys_worker(task) -> dict:
+    """
+    프로세스 풀 작업 단위 (dedup): 여러 파일에 걸쳐 등장하는 (src_line, trn_line, target) 키를
+    파일 처리 전에 한 번만 검수. 반환: {"results": [(key, verdict, usage)], "llm_client", "metrics"}
+    """
+    keys, trace_parent = task
+    by_target = defaultdict(list)
+    for key in keys:
+        by_target[key[2]].append(key)
+    results = []
+    with span("shared_lines", parent=trace_parent, lines=len(keys)):
+        for target, group in by_target.items():
+            set_metric_labels(pipeline="content", locale=target or "")
+            for key, result in zip(group, _run_checks([(src, trn) for src, trn, _ in group])):
+                results.append((key, result, result.pop("usage")))
+    return {"results": results, "llm_client": chat_client_stats(), "metrics": metrics_snapshot()}
+
+def _process_file_worker(task) -> dict:
+    """
+    프로세스 풀 작업 단위: 파일 1개 처리 후 usage dict 반환 (모듈 전역 상태는 부모가 합산).
+    shared: 부모가 먼저 검수한 파일 간 중복 키 (LineDedup.export) → 파일 dedup에 넣어 다시 호출하지 않음
+    """
+    fp, semantic_dir, trace_parent, shared = task
+    journal = FileJournal(os.path.join(semantic_dir, JOURNAL_DIRNAME), os.path.basename(fp))
+    dedup = None
+    if DEDUP_LINES:
+        done_lines, _ = journal.load()
+        dedup = LineDedup()
+        register_file_lines(fp, dedup, skip_lines=done_lines)
+        dedup.seed(shared)
+    usage = run_file(fp, semantic_dir, dedup, journal, trace_parent)
+    usage["dedup"] = dedup.stats() if dedup is not None else None
+    return usage
+
+def _add_usage(acc: dict, usage: dict) -> None:
+    acc["prompt_tokens"] += usage["prompt_tokens"]
+    acc["completion_tokens"] += usage["completion_tokens"]
+    acc["total_tokens"] += usage["total_tokens"]
+    acc["batch_prompt_tokens"] += usage.get("batch_prompt_tokens", 0)
+    acc["batch_completion_tokens"] += usage.get("batch_completion_tokens", 0)
+    acc["errors"] += usage.get("errors", 0)
+    acc["failed_line_count"] += usage.get("failed_line_count", 0)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NAC semantic QA (emoji / missing / faithfulness)")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="저널 기준으로 완료된 파일/라인은 건너뛰고 이어서 처리",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="파일 단위 병렬 처리 프로세스 수 (1 = 단일 프로세스)",
+    )
+    parser.add_argument(
+        "--batch", nargs="?", const="openai", choices=["openai", "local"], default=None,
+        help="Batch API로 실행 (라운드별 제출 → 완료 대기 → 병합). local = 파일 기반 테스트용 대역",
+    )
+    parser.add_argument(
+        "--metrics-file", default=None,
+        help="Prometheus 텍스트 포맷 계측 파일 (파일마다 갱신)",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="이 포트로 /metrics 엔드포인트 노출 (127.0.0.1)",
+    )
+    parser.add_argument(
+        "--trace", nargs="?", const=os.path.join(ROOT_OUTPUT, TRACE_DIRNAME), default=None,
+        help="run/folder/file/line/LLM 호출 span을 JSONL로 기록할 폴더 (분석: python trace_report.py <폴더>)",
+    )
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     ss = time()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        print(f"📈 계측 엔드포인트: http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.trace:
+        start_tracing(args.trace)
+    run_span = start_span("run", pipeline="content", workers=args.workers, check_mode=CHECK_MODE).activate()
+
+    # 처리 대상 목록 확정 (dedup 사전 스캔을 위해 폴더 순회 전에 수집)
+    plan = []
     for folder_name in TARGET_FOLDERS:
         input_folder = os.path.join(ROOT_INPUT, folder_name)
         output_base = os.path.join(ROOT_OUTPUT, folder_name)
@@ -287,33 +983,187 @@ if __name__ == "__main__":
             print(f"❌ 처리할 JSON이 없습니다: {input_folder}")
             continue
 
+        plan.append((folder_name, input_folder, semantic_dir, json_files))
+
+    # 저널 준비: resume이면 완료 파일/라인 확인, 아니면 기존 저널 초기화
+    journals = {}
+    resume_state = {}
+    for _, _, semantic_dir, json_files in plan:
+        journal_dir = os.path.join(semantic_dir, JOURNAL_DIRNAME)
+        for fp in json_files:
+            journal = FileJournal(journal_dir, os.path.basename(fp))
+            if args.resume:
+                resume_state[fp] = journal.load()
+            else:
+                journal.reset()
+                resume_state[fp] = ({}, None)
+            journals[fp] = journal
+
+    # Batch 모드: 수집 패스로 모든 요청을 Batch 결과로 채운 뒤 아래 본 실행은 결과만 조회
+    batch_runner = None
+    if args.batch:
+        if args.workers > 1:
+            print("⚠️  --batch 모드는 단일 프로세스로 실행 (병렬 처리는 Batch 서비스가 담당)")
+            args.workers = 1
+        batch_dir = os.path.join(ROOT_OUTPUT, BATCH_DIRNAME)
+        batch_runner = start_batch_mode(make_batch_backend(args.batch, batch_dir), batch_dir)
+
+        def _collect_pass():
+            for _, _, semantic_dir, json_files in plan:
+                for fp in json_files:
+                    if resume_state[fp][1] is None:
+                        process_file(fp, semantic_dir)
+
+        with span("batch_collect"):
+            batch_runner.run(_collect_pass)
+
+    # 프로세스 풀 모드: 모든 파일을 먼저 제출해 폴더 경계 없이 워커에 분산
+    # dedup은 부모가 전체 파일을 사전 스캔 → 여러 파일에 걸친 키만 먼저 워커들에 나눠 검수하고
+    # 판정/usage 몫을 파일 작업에 넘김 (호출 수와 파일별 usage가 직렬 실행과 같음)
+    pool = (
+        ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=start_tracing if args.trace else None, initargs=(args.trace,) if args.trace else (),
+        )
+        if args.workers > 1 else None
+    )
+    futures = {}
+    dedup = LineDedup() if DEDUP_LINES else None
+    dedup_stats = []
+    client_stats = {}  # pid → 가장 최근 LLM 클라이언트 통계 (프로세스 풀이면 워커별)
+    file_keys = {}
+    for _, _, semantic_dir, json_files in plan:
+        for fp in json_files:
+            done_lines, done_usage = resume_state[fp]
+            if done_usage is None and dedup is not None:
+                file_keys[fp] = register_file_lines(fp, dedup, skip_lines=done_lines)
+
+    if pool is not None:
+        shared_keys = cross_file_keys(list(file_keys.values()))
+        if shared_keys:
+            per_task = -(-len(shared_keys) // args.workers)
+            tasks = [
+                (shared_keys[k:k + per_task], current_span_id())
+                for k in range(0, len(shared_keys), per_task)
+            ]
+            for out in pool.map(_check_keys_worker, tasks):
+                for key, verdict, usage in out["results"]:
+                    dedup.store(key, verdict, usage)
+                if out.get("llm_client"):
+                    client_stats[out["llm_client"]["pid"]] = out["llm_client"]
+                absorb_metrics(out["metrics"])
+        for _, _, semantic_dir, json_files in plan:
+            for fp in json_files:
+                if resume_state[fp][1] is None:
+                    shared = dedup.export(file_keys[fp]) if dedup is not None else []
+                    futures[fp] = pool.submit(_process_file_worker, (fp, semantic_dir, current_span_id(), shared))
+
+    for folder_name, input_folder, semantic_dir, json_files in plan:
+        folder_span = start_span("folder", folder=folder_name).activate()
         print(f"\n📂 Folder: {folder_name}")
         print(f"   Input : {input_folder}")
         print(f"   Output: {semantic_dir}")
-        folder_usage_log_sem = {}
+        # resume이면 완료된 파일 usage를 저널에서 복원
+        folder_usage_log_sem = (
+            rebuild_usage_log(os.path.join(semantic_dir, JOURNAL_DIRNAME)) if args.resume else {}
+        )
+        folder_cache_stats = []
 
         for fp in json_files:
-            s = time()
-            usage = process_file(fp, semantic_dir)
+            _, done_usage = resume_state[fp]
+            if done_usage is not None:
+                print(f"⏭️  Skipped (already done): {os.path.basename(fp)}")
+                _add_usage(grand_usage["semantic"], done_usage)
+                continue
+
+            if pool is not None:
+                usage = futures[fp].result()
+                if usage.get("dedup"):
+                    dedup_stats.append(usage["dedup"])
+            else:
+                usage = run_file(fp, semantic_dir, dedup, journals[fp])
             sem_u = usage["semantic"]
             folder_usage_log_sem[usage["filename"]] = sem_u
-            e = time()
-            sem_cost = usd_cost(sem_u["prompt_tokens"], sem_u["completion_tokens"])
-            print(f"⌛ 처리 시간: {e - s:.2f}s")
+            folder_cache_stats.append(usage["response_cache"])
+            if usage.get("llm_client"):
+                client_stats[usage["llm_client"]["pid"]] = usage["llm_client"]
+            absorb_metrics(usage.get("metrics"))
+            if args.metrics_file:
+                write_metrics(args.metrics_file)
+            _add_usage(grand_usage["semantic"], sem_u)
+            sem_cost = usage_cost(sem_u)
+            print(f"⌛ 처리 시간: {usage['elapsed']:.2f}s")
             print(f"💵 {usage['filename']}  semantic ${sem_cost:.4f}\n")
 
-        write_usage_log(folder_usage_log_sem, semantic_dir)
+            # 파일마다 usage 로그 갱신 (중간에 중단돼도 완료분은 남도록)
+            write_usage_log(
+                folder_usage_log_sem, semantic_dir,
+                merge_response_cache_stats(folder_cache_stats), list(client_stats.values()),
+                batch_runner.stats() if batch_runner is not None else None,
+            )
+
+        write_usage_log(
+            folder_usage_log_sem, semantic_dir,
+            merge_response_cache_stats(folder_cache_stats), list(client_stats.values()),
+            batch_runner.stats() if batch_runner is not None else None,
+        )
+        folder_span.end()
+
+    if pool is not None:
+        pool.shutdown()
+    if dedup is not None:
+        dedup_stats.append(dedup.stats())
 
     sem_prompt = grand_usage["semantic"]["prompt_tokens"]
     sem_comp = grand_usage["semantic"]["completion_tokens"]
     sem_total = grand_usage["semantic"]["total_tokens"]
-    sem_cost_grand = usd_cost(sem_prompt, sem_comp)
+    sem_cost_grand = usage_cost(grand_usage["semantic"])
 
     print("\n📊 총 토큰 사용량 (SEMANTIC, ALL FOLDERS):")
     print(f"- Prompt:     {sem_prompt}")
     print(f"- Completion: {sem_comp}")
     print(f"- Total:      {sem_total}")
     print(f"💰 총 요금:   ${sem_cost_grand:.4f}")
+    if grand_usage["semantic"]["errors"]:
+        print(f"⚠️ LLM 오류 {grand_usage['semantic']['errors']}회: 검수 실패 {grand_usage['semantic']['failed_line_count']}줄 "
+              f"(출력 issues에 failed=True, --resume으로 실패한 줄만 재검수)")
+
+    cache_stats = response_cache_stats()
+    if cache_stats.get("enabled"):
+        print(f"🗄️ 응답 캐시: hit {cache_stats['hits']} / miss {cache_stats['misses']} "
+              f"(hit ratio {cache_stats['hit_ratio']:.2%})")
+
+    if dedup_stats:
+        occurrences = sum(d["occurrences"] for d in dedup_stats)
+        unique_checked = sum(d["unique_checked"] for d in dedup_stats)
+        reused = max(occurrences - unique_checked, 0)  # 프로세스 풀이면 부모가 먼저 검수한 키는 워커 통계에 없음
+        print(f"♻️ 중복 라인 재사용: {reused} / {occurrences} (고유 검수 {unique_checked})")
+
+    if batch_runner is not None:
+        batch_stats = batch_runner.stats()
+        rounds = batch_stats["rounds"]
+        print(f"📦 Batch: 라운드 {len(rounds)}회, 요청 {sum(r['submitted'] for r in rounds)}건 "
+              f"(실패 {sum(r['failed'] for r in rounds)}) — "
+              f"Batch 결과만 Batch 단가(x{BATCH_PRICE_FACTOR}), 실시간 폴백은 정가")
+        if batch_stats["unused_results"]:
+            # 앞 단계 suggestion으로 입력이 바뀌어 버려진 추측 요청 (청구는 되지만 파일 usage에는 미포함)
+            print(f"   미사용 결과 {batch_stats['unused_results']}건: "
+                  f"prompt {batch_stats['unused_prompt_tokens']} / completion {batch_stats['unused_completion_tokens']} 토큰")
+
+    for pid, st in sorted(client_stats.items()):
+        print(f"🚦 동시 호출 한도 [pid {pid}] 호출 {st['calls']} / 재시도 {st['retries']} / 429 {st['rate_limited']}: "
+              f"{describe_limiter(st['concurrency'])}")
+        if st["hedge"]["enabled"]:
+            print(f"   hedge {st['hedges']}건 (호출 대비 {st['hedge']['rate']:.1%}, 상한 {st['hedge']['max_rate']:.0%}) / "
+                  f"복제 쪽 승 {st['hedge_wins']} / 추가 과금 토큰 {st['hedge_billed_tokens']}")
+
+    if args.metrics_file:
+        write_metrics(args.metrics_file)
+        print(f"📈 계측 파일: {args.metrics_file}")
+
+    run_span.end(total_tokens=sem_total, total_cost_usd=round(sem_cost_grand, 4))
+    if args.trace:
+        print(f"🔍 추적: {args.trace} (python trace_report.py {args.trace})")
 
     ee = time()
     print(f"\n모든 시스템 작동 시간: {ee - ss:.2f}s")
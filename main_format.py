@@ -1,14 +1,30 @@
 import os
 import json
 import random
+import argparse
 from glob import glob
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from time import time
 
-from utils.gpt_client import ask_gpt
+from utils.gpt_client import ask_gpt, response_cache_stats, merge_response_cache_stats, start_batch_mode
+from utils.batch_runner import BATCH_PRICE_FACTOR, make_batch_backend, is_collecting
+from utils.line_dedup import LineDedup, cross_file_keys
+from utils.run_journal import FileJournal, JOURNAL_DIRNAME, rebuild_usage_log
+from utils.format_detector import detect_categories
+from utils.alignment import aligned_sources
+from utils.guideline_store import get_guideline_store
+from utils.prefix_scheduler import PrefixScheduler, diff_prefix_stats, merge_prefix_stats
+from utils.llm_client import chat_client_stats
+from utils.concurrency import LLM_CONCURRENCY_MAX, describe_limiter
+from utils.metrics import (
+    inc, observe, metric_labels, set_metric_labels, metrics_snapshot, absorb_metrics, write_metrics, serve_metrics,
+)
+from utils.tracing import start_tracing, start_span, span, use_span, timed, current_span_id
 from prompt_builder.prompt_cache import (
     build_category_messages,        # 카테고리 감지(접두사 캐시)
     build_check_messages_cached,    # 검수(접두사 캐시)
+    build_check_messages_combined,  # 다중 카테고리 통합 검수(카테고리 집합별 접두사 캐시)
 )
 
 # =========================
@@ -27,36 +43,299 @@ RATES = {
     "gpt-5":  {"input": 0.00000125, "cached": 0.000000125, "output": 0.00001000},
 }
 
+# --batch 모드 작업 폴더 (OUTPUT_DIR 아래, 라운드별 입력/출력 JSONL)
+BATCH_DIRNAME = "_batch"
+
+# --trace 기본 저장 폴더 (OUTPUT_DIR 아래, 프로세스별 span JSONL → trace_report.py로 분석)
+TRACE_DIRNAME = "_trace"
+
+# dry-run: API 호출 없이 로컬 토큰 계측으로 비용만 추정 (--dry-run)
+#   system = 전부 cached, user = non-cached, 출력 ≈ 번역 문장 길이로 가정
+#   LLM 카테고리 감지가 필요한 줄은 감지 호출까지만 추정 (이후 검수는 결과를 알 수 없어 제외)
+DRY_RUN = False
+
+# 실행 전체에서 동일한 (source, 문장, target) 줄은 한 번만 검수하고 결과 공유
+DEDUP_LINES = True
+
+# 카테고리 감지: 명확한 줄은 규칙 기반으로 판정하고 애매한 줄만 LLM 호출
+RULE_BASED_CATEGORIES = True
+
+# 카테고리가 2개 이상인 줄은 모든 guideline을 담은 접두사로 한 번에 검수
+COMBINE_CATEGORIES = True
+
+# 같은 system 접두사 요청끼리 묶어 연속 전송 (OpenAI prompt cache 적중률 ↑)
+# 파일의 검수 대상 줄을 SCHEDULE_LINES개씩 라운드(카테고리 감지 → 검수 단계)로 진행
+SCHEDULE_BY_PREFIX = True
+SCHEDULE_LINES = 64
+SCHEDULE_WINDOW_SIZE = 64       # 큐에 이만큼 쌓이면 즉시 전송
+SCHEDULE_WINDOW_SECONDS = 0.5   # 첫 요청 적재 후 최대 대기 시간
+# 접두사 그룹 안의 요청 동시 전송 스레드 수 (실제 in-flight 수는 AIMD 제어기가 429/지연에 맞춰 조절)
+SCHEDULE_PARALLEL = LLM_CONCURRENCY_MAX
+
+prefix_scheduler = (
+    PrefixScheduler(
+        ask_gpt, window_size=SCHEDULE_WINDOW_SIZE, window_seconds=SCHEDULE_WINDOW_SECONDS,
+        max_parallel=SCHEDULE_PARALLEL,
+    )
+    if SCHEDULE_BY_PREFIX else None
+)
+
 total_usage = defaultdict(int)  # 전체 합산
 
-def process_file(filepath: str, parent_folder: str):
+# usage 토큰 항목 (batch_<항목> = 그중 Batch API 결과로 받은 토큰, Batch 모드에서만 기록)
+USAGE_TOKEN_KEYS = ("cached_prompt_tokens", "non_cached_prompt_tokens", "completion_tokens")
+
+def _cost_usd(usage: dict) -> dict:
+    """RATES(per-token) 기준 입력/출력/합계 비용 (batch_* 토큰만 BATCH_PRICE_FACTOR 단가, 실시간 폴백 호출은 정가)"""
+    rate = RATES[MODEL_NAME]
+
+    def billed(key: str) -> float:
+        batch = usage.get(f"batch_{key}", 0)
+        return usage.get(key, 0) - batch + batch * BATCH_PRICE_FACTOR
+
+    input_cost = billed("non_cached_prompt_tokens") * rate["input"] + billed("cached_prompt_tokens") * rate["cached"]
+    output_cost = billed("completion_tokens") * rate["output"]
+    return {"input": input_cost, "output": output_cost, "total": input_cost + output_cost}
+
+def _sum_usage(acc: dict, usage: dict) -> None:
+    """줄/파일 usage 합산 (batch_* / errors 항목은 있을 때만)"""
+    for key in USAGE_TOKEN_KEYS:
+        acc[key] += usage[key]
+        if usage.get(f"batch_{key}"):
+            acc[f"batch_{key}"] = acc.get(f"batch_{key}", 0) + usage[f"batch_{key}"]
+    if usage.get("errors"):
+        acc["errors"] = acc.get("errors", 0) + usage["errors"]
+
+def _add_usage(usage_acc: dict, usage: dict) -> None:
+    """API usage를 줄 usage에 누적 (cached = 실제 prompt cache 적중 토큰, 나머지 입력은 non-cached)"""
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    cached_tokens = usage.get("cached_tokens", 0)
+    _sum_usage(usage_acc, {
+        "cached_prompt_tokens": cached_tokens,
+        "non_cached_prompt_tokens": prompt_tokens - cached_tokens,
+        "completion_tokens": usage.get("completion_tokens", 0),
+    })
+    if usage.get("error"):
+        # 재시도 후에도 실패한 호출 (판정 없이 원문 유지 → 줄을 검수 실패로 표시)
+        usage_acc["errors"] = usage_acc.get("errors", 0) + 1
+    if usage.get("batch"):
+        # Batch 결과로 받은 요청은 할인 단가로 따로 집계
+        _sum_usage(usage_acc, {
+            **{key: 0 for key in USAGE_TOKEN_KEYS},
+            "batch_cached_prompt_tokens": cached_tokens,
+            "batch_non_cached_prompt_tokens": prompt_tokens - cached_tokens,
+            "batch_completion_tokens": usage.get("completion_tokens", 0),
+        })
+
+def _estimate_usage(meta: dict) -> tuple:
+    """dry-run용 가짜 응답: builder의 로컬 계측값을 API usage 형식으로 (응답은 "error" → 판정 변경 없음)"""
+    cached = meta["cached_input_tokens"]
+    non_cached = meta["non_cached_input_tokens"]
+    completion = meta["estimated_output_tokens"]
+    return "error", {
+        "prompt_tokens": cached + non_cached,
+        "cached_tokens": cached,
+        "completion_tokens": completion,
+        "total_tokens": cached + non_cached + completion,
+    }
+
+def _step_result(categories, category_source: str, revised: str, usage_acc: dict) -> tuple:
+    """(verdict, usage). LLM 오류가 한 번이라도 있으면 verdict["failed"] = True (판정을 믿을 수 없는 줄)"""
+    verdict = {"categories": categories, "category_source": category_source, "revised": revised}
+    if usage_acc.get("errors"):
+        verdict["failed"] = True
+    return verdict, usage_acc
+
+def _sentence_steps(original_sentence: str, source_for_line: str, target: str):
+    """
+    한 줄 포맷 검수 단계: 카테고리 감지 → 카테고리별 검수(앞 결과가 다음 입력).
+    제너레이터: (meta, messages)를 yield 하고 (reply, usage)를 받음.
+    반환(StopIteration.value): ({"categories", "category_source", "revised"}, usage)
+    """
+    usage_acc = {"cached_prompt_tokens": 0, "non_cached_prompt_tokens": 0, "completion_tokens": 0}
+
+    # 1) 카테고리 감지: 규칙으로 명확히 판정되면 LLM 호출 생략
+    categories = detect_categories(original_sentence) if RULE_BASED_CATEGORIES else None
+    category_source = "rule"
+
+    if categories is None:
+        # 애매한 줄만 LLM (system 고정 → cached input)
+        category_source = "llm"
+        sys_msg, usr_msg, meta = build_category_messages(original_sentence, model=MODEL_NAME, estimate_tokens=DRY_RUN)
+        meta["stage"] = "category"
+        categories, usage = yield meta, [sys_msg, usr_msg]
+        _add_usage(usage_acc, usage)
+
+    revised = original_sentence
+
+    if not categories or categories == "error" or categories == []:
+        return _step_result([], category_source, revised, usage_acc)
+
+    # 2-a) 다중 카테고리 통합 검수 (한 번의 호출)
+    if COMBINE_CATEGORIES and isinstance(categories, list) and len(categories) > 1:
+        built = build_check_messages_combined(
+            revised, source_for_line, target, categories, model=MODEL_NAME, estimate_tokens=DRY_RUN
+        )
+        if built:
+            sys_msg2, usr_msg2, meta2 = built
+            meta2.update(stage="check", category="+".join(meta2["categories"]))
+            revised_result, usage = yield meta2, [sys_msg2, usr_msg2]
+            _add_usage(usage_acc, usage)
+
+            if isinstance(revised_result, str) and revised_result != "error":
+                revised = revised_result.strip()
+        return _step_result(categories, category_source, revised, usage_acc)
+
+    # 2-b) 카테고리별 포맷 검수 (guideline을 system 접두사로 → 76개 캐시 활용)
+    for category in categories:
+        built = build_check_messages_cached(
+            revised, source_for_line, target, category, model=MODEL_NAME, estimate_tokens=DRY_RUN
+        )
+        if not built:
+            continue  # 해당 카테고리 guideline 없으면 스킵
+        sys_msg2, usr_msg2, meta2 = built
+        meta2.update(stage="check", category=category)
+
+        revised_result, usage = yield meta2, [sys_msg2, usr_msg2]
+        _add_usage(usage_acc, usage)
+
+        if isinstance(revised_result, str) and revised_result != "error":
+            revised = revised_result.strip()
+
+    return _step_result(categories, category_source, revised, usage_acc)
+
+def _drive_steps(step_gens: list, scheduler: PrefixScheduler | None = None, lines: list | None = None) -> list:
+    """
+    여러 줄의 검수 제너레이터를 라운드 단위로 진행.
+    scheduler가 있으면 라운드마다 모든 줄의 요청을 제출 → 접두사별로 묶여 연속 전송,
+    없으면 줄마다 ask_gpt 직접 호출 (기존 순서 그대로). DRY_RUN이면 호출 없이 추정 usage.
+    계측 라벨(stage / category)은 meta 기준으로 요청마다 설정 (스케줄러는 submit 시점 라벨로 전송)
+    추적: 줄마다 "line" span (lines = 줄 원문, 속성용). 라운드가 번갈아 진행되므로 그 줄 차례에만 현재 span으로 설정
+    """
+    results = [None] * len(step_gens)
+    pending = {}
+    line_spans = [start_span("line", text=(lines[i][:80] if lines else "")) for i in range(len(step_gens))]
+
+    def _advance(i, answer=None, first=False):
+        try:
+            with use_span(line_spans[i]):
+                pending[i] = next(step_gens[i]) if first else step_gens[i].send(answer)
+        except StopIteration as stop:
+            pending.pop(i, None)
+            results[i] = stop.value
+            line_spans[i].end(categories=stop.value[0]["categories"], category_source=stop.value[0]["category_source"])
+
+    for i in range(len(step_gens)):
+        _advance(i, first=True)
+
+    while pending:
+        if DRY_RUN or scheduler is None:
+            for i in sorted(pending):
+                meta, messages = pending[i]
+                with metric_labels(stage=meta["stage"], category=meta.get("category", "")), use_span(line_spans[i]):
+                    answer = _estimate_usage(meta) if DRY_RUN else ask_gpt(messages, model=MODEL_NAME)
+                _advance(i, answer)
+            continue
+        handles = {}
+        for i, (meta, messages) in sorted(pending.items()):
+            with metric_labels(stage=meta["stage"], category=meta.get("category", "")), use_span(line_spans[i]):
+                handles[i] = scheduler.submit(meta["prefix_key"], messages, MODEL_NAME)
+        for i, handle in handles.items():
+            _advance(i, handle.result())
+    return results
+
+def _check_sentence(original_sentence: str, source_for_line: str, target: str):
+    """한 줄 포맷 검수 (직접 호출). 반환: ({"categories", "category_source", "revised"}, usage)"""
+    return _drive_steps([_sentence_steps(original_sentence, source_for_line, target)], lines=[original_sentence])[0]
+
+def _check_sentences(items: list, scheduler: PrefixScheduler | None = None) -> list:
+    """여러 줄 [(sentence, source_for_line, target)] 검수 → [(verdict, usage)] (입력 순서 유지)"""
+    return _drive_steps([_sentence_steps(*item) for item in items], scheduler, lines=[item[0] for item in items])
+
+def _line_sources(source_sentences: list, trans_sentences: list) -> list:
+    """번역 각 줄에 대응하는 source 문장 (줄 수가 다르면 정렬된 source 구간만 사용)"""
+    return aligned_sources(source_sentences, trans_sentences)
+
+def register_file_lines(filepath: str, dedup: LineDedup, skip_lines=()) -> list:
+    """
+    사전 스캔: 파일의 검수 대상 라인 키를 dedup에 등록 (등장 횟수 집계용). 반환: 등록한 키 목록
+    skip_lines: 저널에 이미 완료로 기록된 줄 번호 (resume 시 다시 검수하지 않음)
+    """
     with open(filepath, "r", encoding="utf-8") as f:
         data = json.load(f)
+    trans_sentences = data["trans"].splitlines()
+    sources = _line_sources(data["text"].splitlines(), trans_sentences)
+    keys = []
+    for i, (sentence, source_for_line) in enumerate(zip(trans_sentences, sources)):
+        if sentence.strip() and (i + 1) not in skip_lines:
+            keys.append((source_for_line, sentence.strip(), data["target"]))
+            dedup.register(keys[-1])
+    return keys
+
+def process_file(
+    filepath: str,
+    parent_folder: str,
+    dedup: LineDedup | None = None,
+    journal: FileJournal | None = None,
+):
+    with timed("io"), open(filepath, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
     source = data["source"]
     target = data["target"]     # 타깃 로케일 (예: "ko-KR")
     text = data["text"]
     trans = data["trans"]
+    set_metric_labels(pipeline="format", locale=target)
 
     source_sentences = text.splitlines()
     trans_sentences = trans.splitlines()
     checked_sentences = []
     checked_detail = []
-
-    # 파일 단위 토큰 누적(캐시/비캐시/출력 분리)
-    file_cached_prompt_tokens = 0
-    file_non_cached_prompt_tokens = 0
-    file_output_tokens = 0
+    failed_lines = []   # LLM 오류로 검수하지 못한 줄 번호 (원문 유지)
+
+    # 파일 단위 토큰 누적(캐시/비캐시/출력 분리, Batch 모드면 batch_* 포함)
+    file_tokens = {key: 0 for key in USAGE_TOKEN_KEYS}
+
+    # 대응하는 source 문장 추출 (줄 수가 다르면 문장 정렬)
+    line_sources = _line_sources(source_sentences, trans_sentences)
+
+    # resume: 저널에 완료로 기록된 줄은 다시 호출하지 않음
+    done_lines = journal.load()[0] if journal is not None else {}
+
+    # 접두사 스케줄링: 검수 대상 줄을 SCHEDULE_LINES개씩 묶어 단계별로 미리 검수
+    line_verdicts = dict(done_lines)
+    if prefix_scheduler is not None:
+        todo = [
+            i for i, sentence in enumerate(trans_sentences)
+            if sentence.strip() and i + 1 not in done_lines
+        ]
+        for start in range(0, len(todo), SCHEDULE_LINES):
+            chunk = todo[start:start + SCHEDULE_LINES]
+            keys = [(line_sources[i], trans_sentences[i].strip(), target) for i in chunk]
+            if dedup is not None:
+                # 동일 (source, 문장, target)은 실행 전체에서 한 번만 검수 (usage는 등장 횟수로 배분)
+                unique = dedup.pending(keys)
+                for key, (verdict, line_usage) in zip(unique, _check_sentences(
+                    [(sentence, source_for_line, tgt) for source_for_line, sentence, tgt in unique],
+                    prefix_scheduler,
+                )):
+                    dedup.store(key, verdict, line_usage)
+                results = [dedup.take(key) for key in keys]
+            else:
+                results = _check_sentences(
+                    [(sentence, source_for_line, tgt) for source_for_line, sentence, tgt in keys],
+                    prefix_scheduler,
+                )
+            for i, (verdict, line_usage) in zip(chunk, results):
+                line_verdicts[i + 1] = (verdict, line_usage)
+                # LLM 오류로 실패한 줄은 기록하지 않음 → --resume 때 다시 검수
+                if journal is not None and not verdict.get("failed"):
+                    journal.record_line(i + 1, verdict, line_usage)
 
     # Step: Format Check (줄 단위)
     for i, sentence in enumerate(trans_sentences):
         original_sentence = sentence.strip()
-
-        # 대응하는 source 문장 추출 (fallback 포함)
-        if len(source_sentences) == len(trans_sentences):
-            source_for_line = source_sentences[i].strip()
-        else:
-            source_for_line = text  # fallback: 전체 사용
+        source_for_line = line_sources[i]
 
         # 빈 줄은 그대로 보존
         if not original_sentence:
@@ -69,55 +348,44 @@ def process_file(filepath: str, parent_folder: str):
             })
             continue
 
-        # 1) 카테고리 감지 (system 고정 → cached input)
-        sys_msg, usr_msg, meta = build_category_messages(original_sentence, model=MODEL_NAME)
-        categories, usage = ask_gpt([sys_msg, usr_msg], model=MODEL_NAME)
-
-        file_cached_prompt_tokens     += meta["cached_input_tokens"]
-        file_non_cached_prompt_tokens += meta["non_cached_input_tokens"]
-        file_output_tokens            += usage.get("completion_tokens", 0)
-
-        revised = original_sentence
-
-        if not categories or categories == "error" or categories == []:
-            checked_sentences.append(revised)
-            checked_detail.append({
-                "source_text": source_for_line,
-                "original": sentence,
-                "revised": revised,
-                "violated": False,
-                "categories": []
-            })
-            continue
-
-        # 2) 카테고리별 포맷 검수 (guideline을 system 접두사로 → 76개 캐시 활용)
-        for category in categories:
-            built = build_check_messages_cached(
-                revised, source_for_line, target, category, model=MODEL_NAME
+        # 동일 (source, 문장, target)은 실행 전체에서 한 번만 검수 (usage는 등장 횟수로 배분)
+        if i + 1 in line_verdicts:
+            verdict, line_usage = line_verdicts[i + 1]
+        elif dedup is not None:
+            verdict, line_usage = dedup.resolve(
+                (source_for_line, original_sentence, target),
+                lambda: _check_sentence(original_sentence, source_for_line, target),
             )
-            if not built:
-                continue  # 해당 카테고리 guideline 없으면 스킵
-            sys_msg2, usr_msg2, meta2 = built
-
-            revised_result, usage = ask_gpt([sys_msg2, usr_msg2], model=MODEL_NAME)
+        else:
+            verdict, line_usage = _check_sentence(original_sentence, source_for_line, target)
 
-            file_cached_prompt_tokens     += meta2["cached_input_tokens"]
-            file_non_cached_prompt_tokens += meta2["non_cached_input_tokens"]
-            file_output_tokens            += usage.get("completion_tokens", 0)
+        if journal is not None and i + 1 not in line_verdicts and not verdict.get("failed"):
+            journal.record_line(i + 1, verdict, line_usage)
 
-            if isinstance(revised_result, str) and revised_result != "error":
-                revised = revised_result.strip()
+        _sum_usage(file_tokens, line_usage)
 
-        violated_flag = (original_sentence != revised)
+        revised = verdict["revised"]
+        categories = verdict["categories"]
+        if verdict.get("failed"):
+            # 재시도 후에도 LLM 오류: 위반 여부를 알 수 없으므로 원문 유지 + failed 표시
+            failed_lines.append(i + 1)
+            revised = sentence
+            violated_flag = None
+        else:
+            violated_flag = bool(categories) and (original_sentence != revised)
 
         checked_sentences.append(revised)
-        checked_detail.append({
+        detail = {
             "source_text": source_for_line,
             "original": sentence,
             "revised": revised,
             "violated": violated_flag,
-            "categories": categories
-        })
+            "categories": categories,
+            "category_source": verdict.get("category_source", "llm"),
+        }
+        if verdict.get("failed"):
+            detail["failed"] = True
+        checked_detail.append(detail)
 
     filename = os.path.basename(filepath)
 
@@ -130,39 +398,196 @@ def process_file(filepath: str, parent_folder: str):
         "checked_sentences": checked_detail
     }
 
-    os.makedirs(os.path.join(OUTPUT_DIR, parent_folder), exist_ok=True)
-    output_path = os.path.join(OUTPUT_DIR, parent_folder, filename)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    # Batch 수집 패스는 판정이 아직 비어 있으므로 출력/저널을 남기지 않음
+    if is_collecting():
+        return None
 
-    print(f"✅ Processed: {parent_folder}/{filename}")
+    # dry-run은 검수 결과가 없으므로 출력 파일을 덮어쓰지 않음
+    if not DRY_RUN:
+        os.makedirs(os.path.join(OUTPUT_DIR, parent_folder), exist_ok=True)
+        output_path = os.path.join(OUTPUT_DIR, parent_folder, filename)
+        with timed("io"), open(output_path, "w", encoding="utf-8") as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
 
-    # 파일 비용 계산 (per 1k tokens 환산)
-    rate = RATES[MODEL_NAME]
-    file_input_cost = (file_non_cached_prompt_tokens / 1000.0) * rate["input"] \
-                    + (file_cached_prompt_tokens     / 1000.0) * rate["cached"]
-    file_output_cost = (file_output_tokens / 1000.0) * rate["output"]
-    file_total_cost  = file_input_cost + file_output_cost
+    failed_note = f" (⚠️ 검수 실패 {len(failed_lines)}줄: {failed_lines})" if failed_lines else ""
+    print(f"✅ {'Estimated' if DRY_RUN else 'Processed'}: {parent_folder}/{filename}{failed_note}")
 
-    return {
+    # 파일 비용 계산 (실제 API usage 기준: cached_tokens / 나머지 입력 / 출력)
+    file_cost = _cost_usd(file_tokens)
+    file_input_cost, file_output_cost, file_total_cost = file_cost["input"], file_cost["output"], file_cost["total"]
+
+    file_usage = {
         "filename": filename,
-        "cached_prompt_tokens": file_cached_prompt_tokens,
-        "non_cached_prompt_tokens": file_non_cached_prompt_tokens,
-        "completion_tokens": file_output_tokens,
+        **file_tokens,
         "input_cost_usd": round(file_input_cost, 6),
         "output_cost_usd": round(file_output_cost, 6),
         "total_cost_usd": round(file_total_cost, 6),
         # 레거시 호환/총합
-        "total_tokens": file_cached_prompt_tokens + file_non_cached_prompt_tokens + file_output_tokens,
+        "total_tokens": sum(file_tokens[key] for key in USAGE_TOKEN_KEYS),
+        # 재시도 후에도 실패한 LLM 호출 수 / 그로 인해 검수하지 못한 줄 수
+        "errors": file_tokens.get("errors", 0),
+        "failed_line_count": len(failed_lines),
+    }
+    if journal is not None and not failed_lines:
+        # 실패한 줄이 있으면 파일을 완료로 기록하지 않음 (--resume 때 그 줄만 다시 검수)
+        journal.record_done(file_usage)
+    inc("pipeline_lines_total", sum(1 for s in trans_sentences if s.strip()))
+    inc("pipeline_cost_usd_total", file_total_cost)
+    return file_usage
+
+def write_usage_log(
+    folder_usage_log: dict, folder_name: str,
+    cache_stats=None, prefix_stats=None, client_stats=None, batch_stats=None,
+):
+    """폴더 token_usage_log.json 저장 (_summary는 파일별 usage 합산으로 매번 재계산)"""
+    entries = [v for k, v in folder_usage_log.items() if k != "_summary"]
+    folder_tokens = {key: 0 for key in USAGE_TOKEN_KEYS}
+    for v in entries:
+        _sum_usage(folder_tokens, v)
+
+    # 폴더 비용 계산
+    folder_cost = _cost_usd(folder_tokens)
+    folder_input_cost, folder_output_cost, folder_total_cost = folder_cost["input"], folder_cost["output"], folder_cost["total"]
+
+    folder_usage_log["_summary"] = {
+        **folder_tokens,
+        "input_cost_usd": round(folder_input_cost, 6),
+        "output_cost_usd": round(folder_output_cost, 6),
+        "total_cost_usd": round(folder_total_cost, 6),
+        "total_tokens": sum(folder_tokens[key] for key in USAGE_TOKEN_KEYS),
+        "errors": folder_tokens.get("errors", 0),
+        "failed_line_count": sum(v.get("failed_line_count", 0) for v in entries),
+    }
+    if cache_stats is not None:
+        folder_usage_log["_summary"]["response_cache"] = cache_stats
+    if prefix_stats:
+        # 접두사별 OpenAI prompt cache 적중률 (cached_tokens / prompt_tokens)
+        folder_usage_log["_summary"]["prompt_cache_by_prefix"] = prefix_stats
+    if client_stats:
+        # 프로세스별 LLM 클라이언트 통계 (AIMD 동시 호출 한도/이력 포함)
+        folder_usage_log["_summary"]["llm_client"] = client_stats
+    if batch_stats is not None:
+        # Batch 모드 라운드별 제출/성공/실패 (비용은 batch_* 토큰에만 BATCH_PRICE_FACTOR 적용)
+        folder_usage_log["_summary"]["batch"] = batch_stats
+
+    log_name = "token_usage_estimate.json" if DRY_RUN else "token_usage_log.json"
+    folder_output_path = os.path.join(OUTPUT_DIR, folder_name, log_name)
+    os.makedirs(os.path.join(OUTPUT_DIR, folder_name), exist_ok=True)
+    with timed("io"), open(folder_output_path, "w", encoding="utf-8") as f:
+        json.dump(folder_usage_log, f, indent=2, ensure_ascii=False)
+
+def run_file(
+    file_path: str, folder_name: str, dedup: LineDedup | None, journal: FileJournal | None,
+    trace_parent: str | None = None,
+) -> dict:
+    """process_file + 파일 단위 처리 시간/캐시 통계 (직렬/프로세스 풀 공통). trace_parent: 워커면 부모 프로세스 span id"""
+    cache_snapshot = response_cache_stats()
+    prefix_snapshot = prefix_scheduler.stats() if prefix_scheduler is not None else {}
+    s_time = time()
+    with span("file", parent=trace_parent, file=os.path.basename(file_path), folder=folder_name) as fs:
+        usage = process_file(file_path, folder_name, dedup, journal)
+        if usage is not None:
+            fs.set(total_tokens=usage["total_tokens"], total_cost_usd=usage["total_cost_usd"])
+    elapsed = time() - s_time
+    observe("pipeline_file_seconds", elapsed)
+    return {
+        "usage": usage,
+        "elapsed": elapsed,
+        "response_cache": response_cache_stats(since=cache_snapshot),
+        "prompt_cache": diff_prefix_stats(prefix_scheduler.stats(), prefix_snapshot) if prefix_scheduler is not None else {},
+        "llm_client": chat_client_stats(),
+        "metrics": metrics_snapshot(),
     }
 
+def _check_keys_worker(task) -> dict:
+    """
+    프로세스 풀 작업 단위 (dedup): 여러 파일에 걸쳐 등장하는 (source, 문장, target) 키를
+    파일 처리 전에 한 번만 검수. 반환: {"results": [(key, verdict, usage)], "llm_client", "metrics"}
+    """
+    global DRY_RUN
+    keys, DRY_RUN, trace_parent = task
+    by_target = defaultdict(list)
+    for key in keys:
+        by_target[key[2]].append(key)
+    results = []
+    with span("shared_lines", parent=trace_parent, lines=len(keys)):
+        for target, group in by_target.items():
+            set_metric_labels(pipeline="format", locale=target)
+            verdicts = _check_sentences(
+                [(sentence, source_for_line, tgt) for source_for_line, sentence, tgt in group], prefix_scheduler,
+            )
+            results.extend((key, verdict, line_usage) for key, (verdict, line_usage) in zip(group, verdicts))
+    return {"results": results, "llm_client": chat_client_stats(), "metrics": metrics_snapshot()}
+
+def _process_file_worker(task) -> dict:
+    """
+    프로세스 풀 작업 단위: 파일 1개 처리 후 usage dict 반환 (total_usage 합산은 부모가 담당).
+    shared: 부모가 먼저 검수한 파일 간 중복 키 (LineDedup.export) → 파일 dedup에 넣어 다시 호출하지 않음
+    """
+    global DRY_RUN
+    file_path, folder_name, DRY_RUN, trace_parent, shared = task
+    journal = None
+    if not DRY_RUN:
+        journal = FileJournal(os.path.join(OUTPUT_DIR, folder_name, JOURNAL_DIRNAME), os.path.basename(file_path))
+    dedup = None
+    if DEDUP_LINES:
+        done_lines = journal.load()[0] if journal is not None else {}
+        dedup = LineDedup()
+        register_file_lines(file_path, dedup, skip_lines=done_lines)
+        dedup.seed(shared)
+    result = run_file(file_path, folder_name, dedup, journal, trace_parent)
+    result["dedup"] = dedup.stats() if dedup is not None else None
+    return result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NAC format QA (currency / date / numeric / time)")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="저널 기준으로 완료된 파일/라인은 건너뛰고 이어서 처리",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="파일 단위 병렬 처리 프로세스 수 (1 = 단일 프로세스)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="API 호출 없이 로컬 토큰 계측으로 비용만 추정 (출력/저널 미기록)",
+    )
+    parser.add_argument(
+        "--batch", nargs="?", const="openai", choices=["openai", "local"], default=None,
+        help="Batch API로 실행 (라운드별 제출 → 완료 대기 → 병합). local = 파일 기반 테스트용 대역",
+    )
+    parser.add_argument(
+        "--metrics-file", default=None,
+        help="Prometheus 텍스트 포맷 계측 파일 (파일마다 갱신)",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="이 포트로 /metrics 엔드포인트 노출 (127.0.0.1)",
+    )
+    parser.add_argument(
+        "--trace", nargs="?", const=os.path.join(OUTPUT_DIR, TRACE_DIRNAME), default=None,
+        help="run/folder/file/line/LLM 호출 span을 JSONL로 기록할 폴더 (분석: python trace_report.py <폴더>)",
+    )
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    DRY_RUN = args.dry_run
     random.seed(111)
     ss = time()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        print(f"📈 계측 엔드포인트: http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.trace:
+        start_tracing(args.trace)
+    run_span = start_span("run", pipeline="format", workers=args.workers, dry_run=DRY_RUN).activate()
     folders = glob(os.path.join(INPUT_DIR, "*"))
 
     folder_logs = {}  # 폴더별 로그 파일 저장용
 
+    # 처리 대상 목록 확정 (dedup 사전 스캔을 위해 폴더 순회 전에 샘플링)
+    plan = []
     for folder_path in folders:
         if not os.path.isdir(folder_path):
             continue
@@ -170,69 +595,209 @@ if __name__ == "__main__":
         folder_name = os.path.basename(folder_path)
         json_files = glob(os.path.join(folder_path, "*.json"))
         json_files = random.sample(json_files, min(50, len(json_files)))
+        plan.append((folder_name, json_files))
 
-        folder_usage_log = {}
-
-        # 폴더 단위 누적
-        folder_cached_prompt_tokens = 0
-        folder_non_cached_prompt_tokens = 0
-        folder_completion_tokens = 0
-
+    # 저널 준비: resume이면 완료 파일/라인 확인, 아니면 기존 저널 초기화 (dry-run은 저널 미사용)
+    journals = {}
+    resume_state = {}
+    for folder_name, json_files in plan:
+        journal_dir = os.path.join(OUTPUT_DIR, folder_name, JOURNAL_DIRNAME)
         for file_path in json_files:
-            s_time = time()
-            usage = process_file(file_path, folder_name)
-
-            folder_usage_log[usage["filename"]] = usage
+            if DRY_RUN:
+                journals[file_path] = None
+                resume_state[file_path] = ({}, None)
+                continue
+            journal = FileJournal(journal_dir, os.path.basename(file_path))
+            if args.resume:
+                resume_state[file_path] = journal.load()
+            else:
+                journal.reset()
+                resume_state[file_path] = ({}, None)
+            journals[file_path] = journal
+
+    # Batch 모드: 수집 패스로 모든 요청을 Batch 결과로 채운 뒤 아래 본 실행은 결과만 조회
+    batch_runner = None
+    if args.batch and not DRY_RUN:
+        if args.workers > 1:
+            print("⚠️  --batch 모드는 단일 프로세스로 실행 (병렬 처리는 Batch 서비스가 담당)")
+            args.workers = 1
+        batch_dir = os.path.join(OUTPUT_DIR, BATCH_DIRNAME)
+        batch_runner = start_batch_mode(make_batch_backend(args.batch, batch_dir), batch_dir)
+
+        def _collect_pass():
+            for folder_name, json_files in plan:
+                for file_path in json_files:
+                    if resume_state[file_path][1] is None:
+                        process_file(file_path, folder_name)
+
+        with span("batch_collect"):
+            batch_runner.run(_collect_pass)
+
+    # 프로세스 풀 모드: 모든 파일을 먼저 제출해 폴더 경계 없이 워커에 분산
+    # dedup은 부모가 전체 파일을 사전 스캔 → 여러 파일에 걸친 키만 먼저 워커들에 나눠 검수하고
+    # 판정/usage 몫을 파일 작업에 넘김 (호출 수와 파일별 usage가 직렬 실행과 같음)
+    pool = (
+        ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=start_tracing if args.trace else None, initargs=(args.trace,) if args.trace else (),
+        )
+        if args.workers > 1 else None
+    )
+    futures = {}
+    dedup = LineDedup() if DEDUP_LINES else None
+    dedup_stats = []
+    run_prefix_stats = []
+    client_stats = {}  # pid → 가장 최근 LLM 클라이언트 통계 (프로세스 풀이면 워커별)
+    file_keys = {}
+    for folder_name, json_files in plan:
+        for file_path in json_files:
+            done_lines, done_usage = resume_state[file_path]
+            if done_usage is None and dedup is not None:
+                file_keys[file_path] = register_file_lines(file_path, dedup, skip_lines=done_lines)
+
+    if pool is not None:
+        shared_keys = cross_file_keys(list(file_keys.values()))
+        if shared_keys:
+            per_task = -(-len(shared_keys) // args.workers)
+            tasks = [
+                (shared_keys[k:k + per_task], DRY_RUN, current_span_id())
+                for k in range(0, len(shared_keys), per_task)
+            ]
+            for out in pool.map(_check_keys_worker, tasks):
+                for key, verdict, line_usage in out["results"]:
+                    dedup.store(key, verdict, line_usage)
+                if out.get("llm_client"):
+                    client_stats[out["llm_client"]["pid"]] = out["llm_client"]
+                absorb_metrics(out["metrics"])
+        for folder_name, json_files in plan:
+            for file_path in json_files:
+                if resume_state[file_path][1] is None:
+                    shared = dedup.export(file_keys[file_path]) if dedup is not None else []
+                    futures[file_path] = pool.submit(
+                        _process_file_worker, (file_path, folder_name, DRY_RUN, current_span_id(), shared)
+                    )
+
+    for folder_name, json_files in plan:
+        folder_span = start_span("folder", folder=folder_name).activate()
+        # 폴더마다 가이드라인 변경 확인 (mtime이 바뀐 파일만 다시 읽음)
+        reloaded = get_guideline_store().refresh()
+        if reloaded:
+            print(f"📚 가이드라인 {reloaded}개 다시 로드")
+
+        # resume이면 완료된 파일 usage를 저널에서 복원
+        folder_usage_log = (
+            rebuild_usage_log(os.path.join(OUTPUT_DIR, folder_name, JOURNAL_DIRNAME))
+            if args.resume and not DRY_RUN else {}
+        )
+        folder_cache_stats = []
+        folder_prefix_stats = []
 
-            # 폴더 누적
-            folder_cached_prompt_tokens     += usage["cached_prompt_tokens"]
-            folder_non_cached_prompt_tokens += usage["non_cached_prompt_tokens"]
-            folder_completion_tokens        += usage["completion_tokens"]
+        for file_path in json_files:
+            _, done_usage = resume_state[file_path]
+            if done_usage is not None:
+                print(f"⏭️  Skipped (already done): {folder_name}/{os.path.basename(file_path)}")
+                usage = done_usage
+            else:
+                if pool is not None:
+                    result = futures[file_path].result()
+                    if result.get("dedup"):
+                        dedup_stats.append(result["dedup"])
+                else:
+                    result = run_file(file_path, folder_name, dedup, journals[file_path])
+                usage = result["usage"]
+                folder_usage_log[usage["filename"]] = usage
+                folder_cache_stats.append(result["response_cache"])
+                folder_prefix_stats.append(result["prompt_cache"])
+                run_prefix_stats.append(result["prompt_cache"])
+                if result.get("llm_client"):
+                    client_stats[result["llm_client"]["pid"]] = result["llm_client"]
+                absorb_metrics(result.get("metrics"))
+                if args.metrics_file:
+                    write_metrics(args.metrics_file)
+
+                print(f"⌛ 하나의 Payload 처리 시간: {result['elapsed']:.2f}s")
+                print(f"💵 {usage['filename']} 비용(USD): {usage['total_cost_usd']:.6f}\n")
+
+                # 파일마다 usage 로그 갱신 (중간에 중단돼도 완료분은 남도록)
+                write_usage_log(
+                    folder_usage_log, folder_name,
+                    merge_response_cache_stats(folder_cache_stats), merge_prefix_stats(folder_prefix_stats),
+                    list(client_stats.values()), batch_runner.stats() if batch_runner is not None else None,
+                )
 
             # 전체 누적
-            total_usage["cached_prompt_tokens"]     += usage["cached_prompt_tokens"]
-            total_usage["non_cached_prompt_tokens"] += usage["non_cached_prompt_tokens"]
-            total_usage["completion_tokens"]        += usage["completion_tokens"]
-            total_usage["total_tokens"]             += usage["total_tokens"]
-
-            e_time = time()
-            print(f"⌛ 하나의 Payload 처리 시간: {e_time - s_time:.2f}s")
-            print(f"💵 {usage['filename']} 비용(USD): {usage['total_cost_usd']:.6f}\n")
-
-        # 폴더 비용 계산
-        rate = RATES[MODEL_NAME]
-        folder_input_cost = (folder_non_cached_prompt_tokens / 1000.0) * rate["input"] \
-                          + (folder_cached_prompt_tokens     / 1000.0) * rate["cached"]
-        folder_output_cost = (folder_completion_tokens / 1000.0) * rate["output"]
-        folder_total_cost  = folder_input_cost + folder_output_cost
-
-        folder_usage_log["_summary"] = {
-            "cached_prompt_tokens": folder_cached_prompt_tokens,
-            "non_cached_prompt_tokens": folder_non_cached_prompt_tokens,
-            "completion_tokens": folder_completion_tokens,
-            "input_cost_usd": round(folder_input_cost, 6),
-            "output_cost_usd": round(folder_output_cost, 6),
-            "total_cost_usd": round(folder_total_cost, 6),
-            "total_tokens": folder_cached_prompt_tokens + folder_non_cached_prompt_tokens + folder_completion_tokens,
-        }
-
-        folder_output_path = os.path.join(OUTPUT_DIR, folder_name, "token_usage_log.json")
-        os.makedirs(os.path.join(OUTPUT_DIR, folder_name), exist_ok=True)
-        with open(folder_output_path, "w", encoding="utf-8") as f:
-            json.dump(folder_usage_log, f, indent=2, ensure_ascii=False)
+            _sum_usage(total_usage, usage)
+            total_usage["total_tokens"] += usage["total_tokens"]
+            total_usage["failed_line_count"] = total_usage.get("failed_line_count", 0) + usage.get("failed_line_count", 0)
+
+        write_usage_log(
+            folder_usage_log, folder_name,
+            merge_response_cache_stats(folder_cache_stats), merge_prefix_stats(folder_prefix_stats),
+            list(client_stats.values()), batch_runner.stats() if batch_runner is not None else None,
+        )
+        folder_span.end()
+
+    if pool is not None:
+        pool.shutdown()
+    if dedup is not None:
+        dedup_stats.append(dedup.stats())
 
     # 전체 비용 계산
-    rate = RATES[MODEL_NAME]
-    prompt_cost  = (total_usage["non_cached_prompt_tokens"] / 1000.0) * rate["input"] \
-                 + (total_usage["cached_prompt_tokens"]     / 1000.0) * rate["cached"]
-    completion_cost = (total_usage["completion_tokens"] / 1000.0) * rate["output"]
-    total_cost = prompt_cost + completion_cost
+    total_cost = _cost_usd(total_usage)["total"]
 
     print(f"\n📊총 토큰 사용량: {total_usage['total_tokens']}")
     print(f"- Cached input tokens:     {total_usage['cached_prompt_tokens']}")
     print(f"- Non-cached input tokens: {total_usage['non_cached_prompt_tokens']}")
     print(f"- Output tokens:           {total_usage['completion_tokens']}")
-    print(f"💰 총 요금(USD): {total_cost:.6f}")
+    print(f"💰 총 요금(USD){' (dry-run 추정)' if DRY_RUN else ''}: {total_cost:.6f}")
+    if total_usage.get("errors"):
+        print(f"⚠️ LLM 오류 {total_usage['errors']}회: 검수 실패 {total_usage.get('failed_line_count', 0)}줄 "
+              f"(출력 checked_sentences에 failed=True, --resume으로 실패한 줄만 재검수)")
+
+    cache_stats = response_cache_stats()
+    if cache_stats.get("enabled"):
+        print(f"🗄️ 응답 캐시: hit {cache_stats['hits']} / miss {cache_stats['misses']} "
+              f"(hit ratio {cache_stats['hit_ratio']:.2%})")
+
+    prefix_stats = merge_prefix_stats(run_prefix_stats)
+    if prefix_stats:
+        print("🧩 접두사별 prompt cache 적중률 (cached / prompt tokens):")
+        for key, st in sorted(prefix_stats.items(), key=lambda kv: -kv[1]["requests"]):
+            target, label, ghash = key.split("::", 2)
+            print(f"   {target} / {label} [{ghash[:8]}] 요청 {st['requests']}: "
+                  f"{st['cached_tokens']}/{st['prompt_tokens']} ({st['hit_ratio']:.2%})")
+
+    if dedup_stats:
+        occurrences = sum(d["occurrences"] for d in dedup_stats)
+        unique_checked = sum(d["unique_checked"] for d in dedup_stats)
+        reused = max(occurrences - unique_checked, 0)  # 프로세스 풀이면 부모가 먼저 검수한 키는 워커 통계에 없음
+        print(f"♻️ 중복 라인 재사용: {reused} / {occurrences} (고유 검수 {unique_checked})")
+
+    if batch_runner is not None:
+        batch_stats = batch_runner.stats()
+        rounds = batch_stats["rounds"]
+        print(f"📦 Batch: 라운드 {len(rounds)}회, 요청 {sum(r['submitted'] for r in rounds)}건 "
+              f"(실패 {sum(r['failed'] for r in rounds)}) — "
+              f"Batch 결과만 Batch 단가(x{BATCH_PRICE_FACTOR}), 실시간 폴백은 정가")
+        if batch_stats["unused_results"]:
+            # 앞 단계 suggestion으로 입력이 바뀌어 버려진 추측 요청 (청구는 되지만 파일 usage에는 미포함)
+            print(f"   미사용 결과 {batch_stats['unused_results']}건: "
+                  f"prompt {batch_stats['unused_prompt_tokens']} / completion {batch_stats['unused_completion_tokens']} 토큰")
+
+    for pid, st in sorted(client_stats.items()):
+        print(f"🚦 동시 호출 한도 [pid {pid}] 호출 {st['calls']} / 재시도 {st['retries']} / 429 {st['rate_limited']}: "
+              f"{describe_limiter(st['concurrency'])}")
+        if st["hedge"]["enabled"]:
+            print(f"   hedge {st['hedges']}건 (호출 대비 {st['hedge']['rate']:.1%}, 상한 {st['hedge']['max_rate']:.0%}) / "
+                  f"복제 쪽 승 {st['hedge_wins']} / 추가 과금 토큰 {st['hedge_billed_tokens']}")
+
+    if args.metrics_file:
+        write_metrics(args.metrics_file)
+        print(f"📈 계측 파일: {args.metrics_file}")
+
+    run_span.end(total_tokens=total_usage["total_tokens"], total_cost_usd=round(total_cost, 6))
+    if args.trace:
+        print(f"🔍 추적: {args.trace} (python trace_report.py {args.trace})")
 
     ee = time()
     print(f"모든 시스템 작동 시간: {ee - ss:.2f}s")
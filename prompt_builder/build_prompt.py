@@ -74,6 +74,116 @@ def build_addition_check_prompt(source: str, translated: str):
     user_msg = {"role": "user", "content": _base_user_block(source, translated)}
     return system_msg, user_msg
 
+# =========================================================
+# 통합(fused) 의미 검수 프롬프트
+#  - emoji / missing / faithfulness 판정과 최종 suggestion을 한 번의 호출로 받음
+# =========================================================
+def build_fused_check_prompt(source: str, translated: str):
+    system_msg = {
+        "role": "system",
+        "content": (
+            "You are a localization QA AI checking three aspects of a translation at once.\n"
+            "1) Emoji consistency: look ONLY at emojis (including ZWJ sequences, skin tones). "
+            "If any emoji is missing, added, moved, reordered, or placed in a different part of the sentence than in the source, flag it.\n"
+            "2) Missing content: flag true if ANY unit of meaning in the source is absent in the translation "
+            "(word, number, name, interjection, clause). Minor reordering is okay as long as meaning is preserved.\n"
+            "3) Faithfulness: flag true when the translation inserts or modifies content not present in the source.\n"
+            "Classify faithfulness severity:\n"
+            "- mild: small stylistic intensifiers/adverbs/adjectives that slightly extend tone/scope.\n"
+            "- severe: added phrases/claims/greetings or changes that alter the meaning.\n"
+            "Return strictly in this format:\n"
+            "{\n"
+            "  \"emoji_issue\": true|false,\n"
+            "  \"emoji_reasons\": [\"short reason\" ...],\n"
+            "  \"missing_content\": true|false,\n"
+            "  \"missing_spans\": [\"exact source fragment that appears missing\" ...],\n"
+            "  \"missing_reasons\": [\"short reason\" ...],\n"
+            "  \"faithfulness_issue\": true|false,\n"
+            "  \"faithfulness_type\": \"none\"|\"mild\"|\"severe\",\n"
+            "  \"added_spans\": [\"exact translation fragment that seems added\" ...],\n"
+            "  \"faithfulness_reasons\": [\"short reason\" ...],\n"
+            "  \"suggestions\": [\"corrected translation string only\" ...]\n"
+            "}\n"
+            "- If any issue is true, give ONE suggestion that fixes all issues together, and it MUST be the final translation text itself (no 'Include', 'Add', 'Remove', or explanations).\n"
+            "- For each aspect that is false, its arrays must be [] (and faithfulness_type must be \"none\").\n"
+            "- If all three are false, suggestions must be []. Do not propose fixes."
+        )
+    }
+    user_msg = {"role": "user", "content": _base_user_block(source, translated)}
+    return system_msg, user_msg
+
+# =========================================================
+# 배치(다중 라인) 의미 검수 프롬프트
+#  - N개의 번호 붙은 (source, translation) 쌍을 한 번에 보내고
+#  - 항목별 판정을 JSON 배열로 받음 (각 항목은 단일 라인 스키마 + "id")
+# =========================================================
+def _batch_user_block(pairs) -> str:
+    items = []
+    for idx, (source, translated) in enumerate(pairs, start=1):
+        items.append(
+            f"[{idx}]\n"
+            f"Source:\n{source.strip()}\n"
+            f"Translation:\n{translated.strip()}"
+        )
+    return (
+        "Items:\n\n"
+        + "\n\n".join(items)
+        + "\n\nEvaluate every item independently and return the JSON array."
+    )
+
+def build_missing_check_batch_prompt(pairs):
+    system_msg = {
+        "role": "system",
+        "content": (
+            "You are a localization QA AI focusing ONLY on missing content.\n"
+            "You will receive numbered items, each with a source line and its translation. Evaluate each item independently.\n"
+            "Flag true if ANY unit of meaning in the source is absent in the translation "
+            "(word, number, name, interjection, clause). Minor reordering is okay as long as meaning is preserved.\n"
+            "Return strictly a JSON array with exactly one object per item, in this format:\n"
+            "[\n"
+            "  {\n"
+            "    \"id\": item number,\n"
+            "    \"missing_content\": true|false,\n"
+            "    \"missing_spans\": [\"exact source fragment that appears missing\" ...],\n"
+            "    \"reasons\": [\"short reason\" ...],\n"
+            "    \"suggestions\": [\"corrected translation string only\" ...]\n"
+            "  }\n"
+            "]\n"
+            "- If missing_content is true, the suggestion MUST be the final translation text itself (no 'Include', 'Add', or any explanation).\n"
+            "- If false, arrays must be []. Do not propose fixes."
+        )
+    }
+    user_msg = {"role": "user", "content": _batch_user_block(pairs)}
+    return system_msg, user_msg
+
+def build_addition_check_batch_prompt(pairs):
+    system_msg = {
+        "role": "system",
+        "content": (
+            "You are a localization QA AI focusing ONLY on added/altered meaning (faithfulness).\n"
+            "You will receive numbered items, each with a source line and its translation. Evaluate each item independently.\n"
+            "Flag true when the translation inserts or modifies content not present in the source.\n"
+            "Classify severity:\n"
+            "- mild: small stylistic intensifiers/adverbs/adjectives that slightly extend tone/scope.\n"
+            "- severe: added phrases/claims/greetings or changes that alter the meaning.\n"
+            "Return strictly a JSON array with exactly one object per item, in this format:\n"
+            "[\n"
+            "  {\n"
+            "    \"id\": item number,\n"
+            "    \"faithfulness_issue\": true|false,\n"
+            "    \"faithfulness_type\": \"none\"|\"mild\"|\"severe\",\n"
+            "    \"added_spans\": [\"exact translation fragment that seems added\" ...],\n"
+            "    \"reasons\": [\"short reason\" ...],\n"
+            "    \"suggestions\": [\"corrected translation string only\" ...]\n"
+            "  }\n"
+            "]\n"
+            "- If faithfulness_issue is true, the suggestion MUST be the final translation text itself (no 'Remove', 'Delete', 'Replace', or explanations).\n"
+            "- If false, type must be \"none\" and arrays must be []. Do not propose fixes."
+        )
+    }
+    user_msg = {"role": "user", "content": _batch_user_block(pairs)}
+    return system_msg, user_msg
+
 
 
 
@@ -107,6 +217,15 @@ SYSTEM_RULES_BLOCK = (
     "If the source sentence ends with a colon (:), comma (,), ellipsis (..), regular space, or any other non-period character, preserve it as-is.\n"
 )
 
+# =========================================================
+# 1-1) 다중 카테고리 통합 검수용 추가 규칙 (SYSTEM_RULES_BLOCK 뒤에 붙음)
+#    ⚠ 캐시 안정성을 위해 문자/개행/스페이싱 절대 임의 변경 금지
+# =========================================================
+SYSTEM_COMBINED_RULES_BLOCK = (
+    "Several guidelines are given above, one per formatting category.\n"
+    "Check the translated sentence against ALL of them and apply every needed correction together in a single revision.\n"
+)
+
 # =========================================================
 # 2) 카테고리 감지용 System 블록 (간결/항상 고정)
 #    ⚠ 캐시 안정성을 위해 문자/개행/스페이싱 절대 임의 변경 금지
@@ -3,90 +3,42 @@ from __future__ import annotations
 import hashlib
 from typing import Optional, Tuple, Dict, List, Any
 
-# 가이드라인 로드
-from utils.file_utils import load_guideline
+# 가이드라인 로드 (시작 시 전체 preload된 메모리 스토어)
+from utils.guideline_store import GuidelineEntry, get_guideline_store
+# 토큰 계측 (모델별 인코더 캐시)
+from utils.token_utils import count_tokens, split_and_count_cached_non_cached
 # 프롬프트 상수 (고정 system 블록)
 from prompt_builder.build_prompt import (
-    SYSTEM_CATEGORY_BLOCK,  # 카테고리 감지용 고정 system
-    SYSTEM_RULES_BLOCK,     # 포맷 검수 공통 규칙
+    SYSTEM_CATEGORY_BLOCK,        # 카테고리 감지용 고정 system
+    SYSTEM_RULES_BLOCK,           # 포맷 검수 공통 규칙
+    SYSTEM_COMBINED_RULES_BLOCK,  # 다중 카테고리 통합 검수 추가 규칙
 )
 
-# =========================
-# 토큰 카운트 유틸 (tiktoken 우선, 없으면 폴백)
-# =========================
-try:
-    import tiktoken
-except Exception:
-    tiktoken = None  # 폴백 사용
-
-_MODEL_TO_ENCODING = {
-    "gpt-4o": "o200k_base",
-    "gpt-5": "cl100k_base"
-}
-
-def _get_encoding_name(model: str) -> str:
-    if tiktoken is None:
-        return "fallback"
-    try:
-        # 모델명을 직접 인식하면 그대로 사용
-        tiktoken.encoding_for_model(model)
-        return model
-    except Exception:
-        return _MODEL_TO_ENCODING.get(model, "cl100k_base")
-
-def _count_tokens(text: str, model: str) -> int:
-    if not text:
-        return 0
-    if tiktoken is None:
-        # 매우 보수적인 폴백(공백 단위 근사) — 비용 추정용
-        return max(1, len(text.split()))
-    enc_name = _get_encoding_name(model)
-    try:
-        enc = tiktoken.encoding_for_model(enc_name)
-    except Exception:
-        enc = tiktoken.get_encoding(enc_name)
-    return len(enc.encode(text))
-
-def _split_and_count_cached_non_cached(messages: List[Dict[str, Any]], model: str) -> Dict[str, int]:
-    """
-    설계상: system = 전부 cached input, user/assistant = non-cached input
-    """
-    cached = 0
-    non_cached = 0
-    for m in messages:
-        n = _count_tokens(m.get("content", "") or "", model)
-        if m.get("role") == "system":
-            cached += n
-        else:
-            non_cached += n
-    return {
-        "cached_input_tokens": cached,
-        "non_cached_input_tokens": non_cached,
-    }
+# 통합 검수 시 가이드라인 배치 순서 (캐시 접두사 안정성을 위해 고정)
+CATEGORY_ORDER = ["currency", "date", "numeric", "time"]
 
 # =========================
 # 내부 캐시
 # =========================
-_guideline_text_cache: dict[tuple[str, str], str] = {}  # (target, category) -> guideline text (가공 금지)
 _system_prefix_cache: dict[str, str] = {}               # cache_key -> system prefix string
+_system_prefix_tokens: dict[tuple[str, str], int] = {}  # (cache_key, model) -> system prefix 토큰 수
 
 def _hash_text(s: str) -> str:
     """가이드라인 본문 그대로 해시. 1자라도 바뀌면 캐시 키가 달라짐."""
     return hashlib.sha256((s or "").encode("utf-8")).hexdigest()
 
-def _get_guideline_text(target: str, category: str) -> Optional[str]:
+# 카테고리 감지용 고정 system의 접두사 키 (스케줄러 그룹핑용, _system_prefix_cache 키와 같은 형식)
+CATEGORY_PREFIX_KEY = f"*::category::{_hash_text(SYSTEM_CATEGORY_BLOCK)}"
+
+def _get_guideline_entry(target: str, category: str) -> Optional[GuidelineEntry]:
     """
-    (target, category) 기준 가이드라인 텍스트 1회 로드 후 그대로 보관.
+    (target, category) 가이드라인 (원문 + sha256 + 토큰 수). 스토어 메모리 조회만 수행.
     ⚠ 개행/스페이싱/유니코드 정규화 등 가공 금지 (캐시 안정성).
     """
-    key = (target, category)
-    if key in _guideline_text_cache:
-        return _guideline_text_cache[key]
-    text = load_guideline(target, category)
-    if not text:
+    entry = get_guideline_store().get(target, category)
+    if entry is None or not entry.text:
         return None
-    _guideline_text_cache[key] = text
-    return text
+    return entry
 
 def _build_system_prefix(target: str, category: str, guideline_text: str) -> str:
     """
@@ -101,39 +53,109 @@ def _build_system_prefix(target: str, category: str, guideline_text: str) -> str
         f"{SYSTEM_RULES_BLOCK}"
     )
 
-def _get_system_prefix(target: str, category: str) -> Optional[str]:
+def _get_system_prefix_entry(target: str, category: str) -> Tuple[Optional[str], Optional[str]]:
     """
-    (target, category, guideline_hash)로 접두사 조회/생성.
-    guideline 미존재 시 None.
+    (target, category, guideline_hash)로 접두사 조회/생성 → (cache_key, prefix).
+    guideline 미존재 시 (None, None).
     """
-    guideline_text = _get_guideline_text(target, category)
-    if not guideline_text:
-        return None
+    entry = _get_guideline_entry(target, category)
+    if entry is None:
+        return None, None
 
-    ghash = _hash_text(guideline_text)
+    guideline_text = entry.text
+    ghash = entry.sha256
     cache_key = f"{target}::{category}::{ghash}"
     if cache_key in _system_prefix_cache:
-        return _system_prefix_cache[cache_key]
+        return cache_key, _system_prefix_cache[cache_key]
 
     prefix = _build_system_prefix(target, category, guideline_text)
     _system_prefix_cache[cache_key] = prefix
-    return prefix
+    return cache_key, prefix
+
+def _build_combined_system_prefix(target: str, sections: List[Tuple[str, str]]) -> str:
+    """
+    다중 카테고리 통합 접두사: 카테고리별 [GUIDELINE] 블록을 고정 순서로 나열 + 공통 규칙.
+    헤더/개행/스페이싱 절대 변경 금지.
+    """
+    categories = ", ".join(category for category, _ in sections)
+    guidelines = "".join(
+        f"[GUIDELINE: {category}]\n{guideline_text}\n\n" for category, guideline_text in sections
+    )
+    return (
+        f"[LOCALE]\n{target} / {categories}\n\n"
+        f"{guidelines}"
+        "[INSTRUCTIONS]\n"
+        f"{SYSTEM_RULES_BLOCK}"
+        f"{SYSTEM_COMBINED_RULES_BLOCK}"
+    )
+
+def _get_combined_system_prefix(
+    target: str, categories: List[str]
+) -> Tuple[Optional[str], Optional[str], List[str]]:
+    """
+    카테고리 집합 단위로 통합 접두사 조회/생성 → (cache_key, prefix, 실제 포함된 카테고리).
+    - 순서는 CATEGORY_ORDER 기준으로 정렬 (입력 순서와 무관하게 같은 집합 = 같은 접두사)
+    - guideline 없는 카테고리는 제외, 1개만 남으면 단일 카테고리 접두사를 그대로 사용
+    """
+    ordered = sorted(
+        set(categories),
+        key=lambda c: (CATEGORY_ORDER.index(c) if c in CATEGORY_ORDER else len(CATEGORY_ORDER), c),
+    )
+    sections = []
+    hashes = []
+    for category in ordered:
+        entry = _get_guideline_entry(target, category)
+        if entry is not None:
+            sections.append((category, entry.text))
+            hashes.append(entry.sha256)
+
+    if not sections:
+        return None, None, []
+    if len(sections) == 1:
+        cache_key, prefix = _get_system_prefix_entry(target, sections[0][0])
+        return cache_key, prefix, [sections[0][0]]
+
+    applied = [category for category, _ in sections]
+    ghash = _hash_text("".join(hashes))
+    cache_key = f"{target}::{'+'.join(applied)}::{ghash}"
+    if cache_key not in _system_prefix_cache:
+        _system_prefix_cache[cache_key] = _build_combined_system_prefix(target, sections)
+    return cache_key, _system_prefix_cache[cache_key], applied
 
 # =========================
 # 메시지 빌더 (카테고리 감지 / 포맷 검수)
 # =========================
+def _prefix_tokens(prefix_key: str, prefix: str, model: str) -> int:
+    """system 접두사 토큰 수는 (접두사 키, 모델)당 1회만 계산 → 호출마다 user 부분만 인코딩"""
+    key = (prefix_key, model)
+    if key not in _system_prefix_tokens:
+        _system_prefix_tokens[key] = count_tokens(prefix, model)
+    return _system_prefix_tokens[key]
+
+def _estimate_meta(meta: Dict[str, Any], messages: List[Dict[str, Any]], model: str, output_text: str) -> Dict[str, Any]:
+    """dry-run 추정용 로컬 토큰 계측 (system=cached, user=non-cached, 출력≈output_text 길이)"""
+    system_tokens = _prefix_tokens(meta["prefix_key"], messages[0]["content"], model)
+    meta.update(split_and_count_cached_non_cached(messages, model, system_tokens=system_tokens))
+    meta["estimated_output_tokens"] = count_tokens(output_text, model)
+    return meta
+
 def build_category_messages(
     sentence: str,
     model: str = "gpt-4o",
-) -> Tuple[dict, dict, Dict[str, int]]:
+    estimate_tokens: bool = False,
+) -> Tuple[dict, dict, Dict[str, Any]]:
     """
     카테고리 감지 메시지 (캐시 친화)
     - system: SYSTEM_CATEGORY_BLOCK (고정 → cached input)
     - user: 문장만 포함 (변동 → non-cached input)
+    meta["prefix_key"]: system 접두사 키 (스케줄러 그룹핑용)
+    estimate_tokens=True(dry-run 추정)일 때만 로컬 토큰 계측 결과를 meta에 추가
     """
     system_msg = {"role": "system", "content": SYSTEM_CATEGORY_BLOCK}
     user_msg = {"role": "user", "content": f"Translated sentence: {sentence}\n\nWhich categories apply?"}
-    meta = _split_and_count_cached_non_cached([system_msg, user_msg], model)
+    meta = {"prefix_key": CATEGORY_PREFIX_KEY}
+    if estimate_tokens:
+        _estimate_meta(meta, [system_msg, user_msg], model, '["numeric"]')
     return system_msg, user_msg, meta
 
 def build_check_messages_cached(
@@ -142,13 +164,50 @@ def build_check_messages_cached(
     target: str,
     category: str,
     model: str = "gpt-4o",
-) -> Optional[Tuple[dict, dict, Dict[str, int]]]:
+    estimate_tokens: bool = False,
+) -> Optional[Tuple[dict, dict, Dict[str, Any]]]:
     """
     포맷 검수 메시지 (캐시 친화)
     - system: [LOCALE] + [GUIDELINE] + [INSTRUCTIONS(=SYSTEM_RULES_BLOCK)]  → cached input
     - user  : Source/Translated/출력 cue                                   → non-cached input
+    meta["prefix_key"]: _system_prefix_cache 키 (스케줄러 그룹핑용)
+    estimate_tokens=True(dry-run 추정)일 때만 로컬 토큰 계측 결과를 meta에 추가
+    """
+    prefix_key, system_prefix = _get_system_prefix_entry(target, category)
+    if not system_prefix:
+        return None
+
+    system_msg = {"role": "system", "content": system_prefix}
+    user_msg = {
+        "role": "user",
+        "content": (
+            "Source sentence:\n"
+            f"{source_text.strip()}\n\n"
+            "Translated sentence:\n"
+            f"{sentence.strip()}\n\n"
+            "Revised translation:"
+        ),
+    }
+    meta = {"prefix_key": prefix_key}
+    if estimate_tokens:
+        _estimate_meta(meta, [system_msg, user_msg], model, sentence)
+    return system_msg, user_msg, meta
+
+def build_check_messages_combined(
+    sentence: str,
+    source_text: str,
+    target: str,
+    categories: List[str],
+    model: str = "gpt-4o",
+    estimate_tokens: bool = False,
+) -> Optional[Tuple[dict, dict, Dict[str, Any]]]:
+    """
+    다중 카테고리 통합 포맷 검수 메시지 (한 번의 호출로 모든 카테고리 검수)
+    - system: [LOCALE] + 카테고리별 [GUIDELINE: ...] + [INSTRUCTIONS]  → cached input (카테고리 집합별 메모이즈)
+    - user  : build_check_messages_cached와 동일
+    meta["categories"]: 실제 포함된(guideline이 있는) 카테고리, meta["prefix_key"]: 접두사 키
     """
-    system_prefix = _get_system_prefix(target, category)
+    prefix_key, system_prefix, applied = _get_combined_system_prefix(target, categories)
     if not system_prefix:
         return None
 
@@ -163,5 +222,7 @@ def build_check_messages_cached(
             "Revised translation:"
         ),
     }
-    meta = _split_and_count_cached_non_cached([system_msg, user_msg], model)
+    meta = {"prefix_key": prefix_key, "categories": applied}
+    if estimate_tokens:
+        _estimate_meta(meta, [system_msg, user_msg], model, sentence)
     return system_msg, user_msg, meta
@@ -1,28 +1,85 @@
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
+from __future__ import annotations
 import os
+import time
+import threading
 from dotenv import load_dotenv
-import openai
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# 벡터 DB 경로 및 임베딩 모델 정의
-PERSIST_DIR = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/vector_store/"
-embedding = OpenAIEmbeddings()
+# 벡터 DB 경로 (RAG_PERSIST_DIR로 변경 가능)
+PERSIST_DIR = os.getenv(
+    "RAG_PERSIST_DIR", "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/vector_store/"
+)
+NOT_FOUND_MESSAGE = "관련 정책 문서를 찾을 수 없습니다."
 
-# 벡터 DB 로드
-vectordb = Chroma(persist_directory=PERSIST_DIR, embedding_function=embedding)
+class PolicyRetriever:
+    """
+    정책 문서 벡터 DB 검색기.
+    - import 시에는 아무것도 열지 않고, 첫 검색(또는 warm_up) 때 임베딩 클라이언트 + Chroma DB를 1회만 생성
+    - 생성은 lock으로 1회 보장, 이후 검색은 같은 임베딩 클라이언트(HTTP 연결 풀)와 DB 연결을 공유
+    - DB 폴더가 없으면 첫 검색 시 FileNotFoundError (import는 항상 성공)
+    """
+
+    def __init__(self, persist_dir: str = PERSIST_DIR):
+        self.persist_dir = persist_dir
+        self._vectordb = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._vectordb is None:
+            with self._lock:
+                if self._vectordb is None:
+                    if not os.path.isdir(self.persist_dir):
+                        raise FileNotFoundError(f"벡터 DB 폴더가 존재하지 않습니다: {self.persist_dir}")
+                    # langchain / openai는 로드가 무거우므로 실제로 DB를 열 때만 import
+                    import openai
+                    from langchain.embeddings import OpenAIEmbeddings
+                    from langchain.vectorstores import Chroma
+                    openai.api_key = os.getenv("OPENAI_API_KEY")
+                    self._vectordb = Chroma(persist_directory=self.persist_dir, embedding_function=OpenAIEmbeddings())
+        return self._vectordb
+
+    @property
+    def is_open(self) -> bool:
+        return self._vectordb is not None
+
+    def warm_up(self, probe_query: str | None = None) -> float:
+        """
+        DB를 미리 열어 둠 (첫 검색 지연 제거). probe_query를 주면 임베딩 API까지 한 번 호출해 연결을 맺어 둠.
+        반환: 걸린 시간(초)
+        """
+        start = time.time()
+        vectordb = self._open()
+        if probe_query:
+            vectordb.similarity_search(probe_query, k=1)
+        return time.time() - start
+
+    def query(self, language: str, query: str, top_k: int = 2) -> str:
+        results = self._open().similarity_search(query, k=top_k, filter={"target": language})
+        if results:
+            return results[0].page_content
+        return NOT_FOUND_MESSAGE
+
+_retriever: PolicyRetriever | None = None
+_retriever_lock = threading.Lock()
+
+def get_policy_retriever() -> PolicyRetriever:
+    """프로세스 전역 검색기 (DB는 첫 검색/warm_up 때 열림)"""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = PolicyRetriever()
+    return _retriever
+
+def warm_up_policy_retriever(probe_query: str | None = None) -> float:
+    """진입점에서 미리 호출하면 첫 query_policy의 DB 오픈 비용을 앞당김. 반환: 걸린 시간(초)"""
+    return get_policy_retriever().warm_up(probe_query)
 
 def query_policy(language: str, query: str, top_k: int = 2) -> str:
     """
     특정 target 언어의 정책 문서에서 query에 가장 유사한 내용을 검색합니다.
     """
-    results = vectordb.similarity_search(query, k=top_k, filter={"target": language})
-    
-    if results:
-        return results[0].page_content
-    else:
-        return "관련 정책 문서를 찾을 수 없습니다."
+    return get_policy_retriever().query(language, query, top_k)
 
 # # 테스트 예시
 # if __name__ == "__main__":
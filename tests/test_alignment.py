@@ -0,0 +1,25 @@
+from utils.alignment import aligned_pairs
+
+
+def test_empty_translation_attaches_source_to_line_1():
+    # 번역이 비어 있으면 새 줄을 만들지 않고 1번 줄(인덱스 0)에 source를 모두 붙임
+    assert aligned_pairs(["Hello", "World"], []) == [("Hello\nWorld", "", (0,))]
+
+
+def test_blank_translation_attaches_source_to_nearest_line():
+    pairs = aligned_pairs(["Hello", "", "World"], ["", ""])
+    assert pairs == [("Hello", "", (0,)), ("World", "", (1,))]
+    assert all(trn_ids for _, _, trn_ids in pairs)
+
+
+def test_short_translation_keeps_one_unit_per_translation_line():
+    pairs = aligned_pairs(["A one.", "B two.", "C three."], ["A 하나."])
+    assert pairs == [("A one.\nB two.\nC three.", "A 하나.", (0,))]
+
+
+def test_missing_middle_line_is_merged_into_previous_unit():
+    src = ["Total: 10 items.", "Shipping is free.", "Call 555 today!"]
+    trn = ["합계: 10개.", "오늘 555로 전화하세요!"]
+    pairs = aligned_pairs(src, trn)
+    assert [trn_ids for _, _, trn_ids in pairs] == [(0,), (1,)]
+    assert "Shipping is free." in pairs[0][0] + pairs[1][0]
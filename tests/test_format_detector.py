@@ -0,0 +1,41 @@
+import pytest
+
+from utils.format_detector import detect_categories
+
+
+@pytest.mark.parametrize("sentence, expected", [
+    ("Hello world", []),
+    ("$15.99", ["currency"]),
+    ("The price is 3.50 EUR", ["currency"]),
+    ("December 25, 2024", ["date"]),
+    ("31.12.2024", ["date"]),
+    ("2024.01.05", ["date"]),
+    ("12/31/2024", ["date"]),
+    ("10:30 AM", ["time"]),
+    ("1,000 users", ["numeric"]),
+    ("1.000.000 Nutzer", ["numeric"]),
+])
+def test_clear_cases(sentence, expected):
+    assert detect_categories(sentence) == expected
+
+
+@pytest.mark.parametrize("sentence", [
+    # 숫자 없는 날짜/금액
+    "in January",
+    "See you on Monday",
+    "월요일에 만나요",
+    "five dollars",
+    "백 달러",
+    # 버전 문자열
+    "Version 1.2.10 released",
+    "Update to 2.0.1 now",
+    "v2 is out",
+    # N/N 형태
+    "24/7 support",
+    "12/31",
+    "Add 1/2 cup of sugar",
+    # 단독 정수 / 전화번호
+    "Call 555-1234",
+])
+def test_ambiguous_cases_are_left_to_llm(sentence):
+    assert detect_categories(sentence) is None
@@ -0,0 +1,147 @@
+import os
+import json
+import argparse
+from glob import glob
+from collections import defaultdict
+
+from utils.tracing import TRACE_FILE_PREFIX
+
+# --trace로 남긴 span JSONL(run → folder → file → line → llm) 분석: 느린 파일/줄/프롬프트 순위 + 시간 분해
+# 시간 분해(times_ms): net = API 전송, wait = RPM/TPM·동시 호출 한도·백오프 대기, tokenize = 로컬 토큰 계측, io = JSON 입출력
+# 동시 실행(스레드/프로세스)이 있으면 하위 합계가 벽시계 시간(dur)보다 클 수 있음
+TIME_KINDS = ("net", "wait", "tokenize", "io")
+
+def load_spans(paths: list) -> list:
+    """폴더면 trace-*.jsonl 전체, 파일이면 그대로 (쓰다 만 마지막 줄은 무시)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob(os.path.join(path, f"{TRACE_FILE_PREFIX}*.jsonl"))))
+        else:
+            files.append(path)
+    spans = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            for raw in f:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    spans.append(json.loads(raw))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+def summarize(spans: list) -> dict:
+    """span마다 하위 포함 시간 분해 / llm 호출 수 / 소속 파일을 계산"""
+    by_id = {s["id"]: s for s in spans}
+    for s in spans:
+        s["subtree_ms"] = defaultdict(float)
+        s["llm_calls"] = 0
+        s["llm_chain"] = []
+
+    def ancestors(s):
+        seen = set()
+        parent = by_id.get(s.get("parent"))
+        while parent is not None and parent["id"] not in seen:
+            seen.add(parent["id"])
+            yield parent
+            parent = by_id.get(parent.get("parent"))
+
+    for s in spans:
+        chain = [s, *ancestors(s)]
+        s["file_span"] = next((a for a in chain if a["name"] == "file"), None)
+        for a in chain:
+            for kind, ms in (s.get("times_ms") or {}).items():
+                a["subtree_ms"][kind] += ms
+            if s["name"] == "llm":
+                a["llm_calls"] += 1
+                a["llm_chain"].append((s["start"], _llm_label(s)))
+    for s in spans:
+        s["llm_chain"] = [label for _, label in sorted(s["llm_chain"])]
+    return by_id
+
+def _llm_label(s: dict) -> str:
+    attrs = s.get("attrs", {})
+    stage = attrs.get("stage") or "?"
+    return f"{stage}:{attrs['category']}" if attrs.get("category") else stage
+
+def _where(s: dict) -> str:
+    fs = s.get("file_span")
+    if fs is None:
+        return "-"
+    return f"{fs['attrs'].get('folder', '')}/{fs['attrs'].get('file', '')}"
+
+def _breakdown(s: dict) -> str:
+    return " ".join(f"{kind} {s['subtree_ms'].get(kind, 0.0) / 1000:.2f}s" for kind in TIME_KINDS)
+
+def _p95(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+
+def print_report(spans: list, top: int) -> None:
+    summarize(spans)
+    named = defaultdict(list)
+    for s in spans:
+        named[s["name"]].append(s)
+
+    print(f"📄 span {len(spans)}개: " + ", ".join(f"{name} {len(v)}" for name, v in sorted(named.items())))
+
+    print("\n⏱️ 실행별 시간 분해 (하위 span 누적, 동시 실행 시 합계 > 벽시계)")
+    for s in sorted(named["run"], key=lambda s: s["start"]):
+        attrs = s.get("attrs", {})
+        print(f"   {attrs.get('pipeline', '?')} [pid {s['pid']}] 벽시계 {s['dur_ms'] / 1000:.2f}s, "
+              f"LLM {s['llm_calls']}회 — {_breakdown(s)}")
+    if not named["run"]:
+        # run span이 없으면(중단된 실행) 전체 합계만
+        total = defaultdict(float)
+        for s in spans:
+            for kind, ms in (s.get("times_ms") or {}).items():
+                total[kind] += ms
+        print("   (run span 없음) " + " ".join(f"{k} {total.get(k, 0.0) / 1000:.2f}s" for k in TIME_KINDS))
+
+    file_lines = defaultdict(int)
+    for s in named["line"]:
+        if s["file_span"] is not None:
+            file_lines[s["file_span"]["id"]] += 1
+
+    print(f"\n🐢 느린 파일 Top {top}")
+    for s in sorted(named["file"], key=lambda s: -s["dur_ms"])[:top]:
+        lines = file_lines[s["id"]]
+        other = max(0.0, s["dur_ms"] - sum(s["subtree_ms"].get(k, 0.0) for k in TIME_KINDS))
+        print(f"   {s['dur_ms'] / 1000:8.2f}s  줄 {lines:5d}  LLM {s['llm_calls']:5d}  {_breakdown(s)} "
+              f"기타 {other / 1000:.2f}s  {_where(s)}")
+
+    print(f"\n🐢 느린 줄 Top {top} (LLM 호출 순서: 단계:카테고리)")
+    for s in sorted(named["line"], key=lambda s: -s["dur_ms"])[:top]:
+        chain = " → ".join(s["llm_chain"]) or "-"
+        print(f"   {s['dur_ms'] / 1000:8.2f}s  LLM {s['llm_calls']:2d}  [{chain}]  {_where(s)}  {s['attrs'].get('text', '')!r}")
+
+    print(f"\n🐢 느린 LLM 호출 Top {top}")
+    for s in sorted(named["llm"], key=lambda s: -s["dur_ms"])[:top]:
+        attrs = s.get("attrs", {})
+        print(f"   {s['dur_ms'] / 1000:8.2f}s  {_llm_label(s):18s} {attrs.get('locale', '-'):6s} "
+              f"시도 {attrs.get('attempts', 1)}  {attrs.get('outcome', '?'):8s} "
+              f"prompt {attrs.get('prompt_tokens', 0)} (cached {attrs.get('cached_tokens', 0)}) "
+              f"/ out {attrs.get('completion_tokens', 0)}  net {s['subtree_ms'].get('net', 0.0) / 1000:.2f}s "
+              f"wait {s['subtree_ms'].get('wait', 0.0) / 1000:.2f}s  {_where(s)}  {attrs.get('user', '')[:60]!r}")
+
+    print(f"\n🧩 프롬프트(system 접두사)별 LLM 시간 Top {top}")
+    groups = defaultdict(list)
+    for s in named["llm"]:
+        attrs = s.get("attrs", {})
+        groups[(_llm_label(s), attrs.get("locale", ""), attrs.get("system_sha", ""))].append(s)
+    ranked = sorted(groups.items(), key=lambda kv: -sum(s["dur_ms"] for s in kv[1]))
+    for (label, locale, sha), group in ranked[:top]:
+        durs = [s["dur_ms"] / 1000 for s in group]
+        prompt = sum(s["attrs"].get("prompt_tokens", 0) for s in group) / len(group)
+        print(f"   {label:18s} {locale or '-':6s} [{sha[:8] or '-'}] 호출 {len(group):5d}  합계 {sum(durs):8.2f}s  "
+              f"평균 {sum(durs) / len(durs):.2f}s  p95 {_p95(durs):.2f}s  최대 {max(durs):.2f}s  평균 prompt {prompt:.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank slow files/lines/prompts from --trace span logs")
+    parser.add_argument("paths", nargs="+", help="--trace 폴더 또는 trace-<pid>.jsonl 파일")
+    parser.add_argument("--top", type=int, default=10, help="항목별 출력 개수")
+    args = parser.parse_args()
+
+    print_report(load_spans(args.paths), args.top)
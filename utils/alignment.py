@@ -0,0 +1,210 @@
+# utils/alignment.py
+"""
+source / translation 줄 정렬 (줄 수가 다를 때 사용).
+
+Gale-Church 계열 동적 계획법으로 비어 있지 않은 줄끼리 정렬.
+- 비드(bead) 종류: 1-1, 1-2, 2-1 (분할/병합), 1-0, 0-1 (누락/추가)
+- 비용: 길이 비율 + 숫자 앵커 불일치 + 문장부호 앵커 불일치 + 비드 종류별 기본 비용
+LLM 호출 없이 로컬에서만 계산.
+"""
+from __future__ import annotations
+import math
+import re
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+Bead = Tuple[Tuple[int, ...], Tuple[int, ...]]
+
+# 비드 종류별 기본 비용 (1-1이 가장 싸고, 누락/추가가 가장 비쌈)
+_BEAD_PRIOR = {
+    (1, 1): 0.0,
+    (1, 2): 1.2,
+    (2, 1): 1.2,
+    (1, 0): 3.0,
+    (0, 1): 3.0,
+}
+_W_LENGTH = 2.0
+_W_NUMBER = 4.0
+_W_PUNCT = 0.8
+
+# 대각선에서 이만큼 벗어난 셀은 계산하지 않음 (긴 문서에서 O(n*m) 방지)
+_BAND_MIN = 20
+
+_NUMBER_REGEX = re.compile(r"\d{1,3}(?:[.,\u00a0\u202f' ]\d{3})+(?!\d)|\d+")
+_ANCHOR_PUNCT = {
+    "?": "?", "？": "?", "¿": "?", "؟": "?",
+    "!": "!", "！": "!", "¡": "!",
+    ":": ":", "：": ":",
+}
+_TERMINAL_PUNCT = {
+    ".": ".", "。": ".", "｡": ".", "…": ".", "।": ".",
+    "?": "?", "？": "?", "؟": "?",
+    "!": "!", "！": "!",
+    ":": ":", "：": ":",
+}
+
+def _numbers(text: str) -> Counter:
+    """숫자 앵커: 천 단위 구분자(1,000 / 1.000 / 1 000)와 무관하도록 숫자만 붙여서 비교"""
+    return Counter(re.sub(r"\D", "", m) for m in _NUMBER_REGEX.findall(text))
+
+def _punct(text: str) -> Tuple[Counter, str]:
+    anchors = Counter(_ANCHOR_PUNCT[ch] for ch in text if ch in _ANCHOR_PUNCT)
+    stripped = text.rstrip(" \"'”’»)]】」』")
+    terminal = _TERMINAL_PUNCT.get(stripped[-1:], "") if stripped else ""
+    return anchors, terminal
+
+def _counter_mismatch(a: Counter, b: Counter) -> float:
+    if a == b:
+        return 0.0
+    total = sum((a | b).values())
+    if not total:
+        return 0.0
+    return sum(((a - b) + (b - a)).values()) / total
+
+def _features(line: str) -> Tuple[int, Counter, Counter, str]:
+    """줄 단위 앵커 (글자 수, 숫자, 문장부호, 끝 문장부호) — DP 셀마다 다시 계산하지 않도록 미리 추출"""
+    anchors, terminal = _punct(line)
+    return len(line), _numbers(line), anchors, terminal
+
+def _span_features(feats: Sequence[Tuple[int, Counter, Counter, str]]) -> Tuple[int, Counter, Counter, str]:
+    if len(feats) == 1:
+        return feats[0]
+    length = sum(f[0] for f in feats) + len(feats) - 1
+    numbers, anchors = Counter(), Counter()
+    for f in feats:
+        numbers += f[1]
+        anchors += f[2]
+    return length, numbers, anchors, feats[-1][3]
+
+def _bead_cost(src, trn, ratio: float) -> float:
+    src_len, src_numbers, src_anchor, src_terminal = src
+    trn_len, trn_numbers, trn_anchor, trn_terminal = trn
+    # 길이: 번역/원문 글자 수 비율을 문서 전체 비율로 보정한 로그 차이
+    length = abs(math.log((trn_len + 1) / (src_len * ratio + 1)))
+    number = _counter_mismatch(src_numbers, trn_numbers)
+    punct = _counter_mismatch(src_anchor, trn_anchor) + (0.5 if src_terminal != trn_terminal else 0.0)
+    return _W_LENGTH * length + _W_NUMBER * number + _W_PUNCT * punct
+
+def align_lines(src_lines: Sequence[str], trn_lines: Sequence[str]) -> List[Bead]:
+    """
+    비어 있지 않은 줄끼리 정렬해 비드 목록 반환 (원래 줄 인덱스 기준, 0-base, 문서 순서).
+    예: ((0,), (0, 1)) = source 0번 줄이 번역 0·1번 줄로 분할됨
+    """
+    src_idx = [i for i, line in enumerate(src_lines) if line.strip()]
+    trn_idx = [j for j, line in enumerate(trn_lines) if line.strip()]
+    src = [_features(src_lines[i].strip()) for i in src_idx]
+    trn = [_features(trn_lines[j].strip()) for j in trn_idx]
+    n, m = len(src), len(trn)
+    # 길이별 구간 앵커 (spans[k][p] = p번째 줄부터 k줄)
+    src_spans = {1: src, 2: [_span_features(src[p:p + 2]) for p in range(max(n - 1, 0))]}
+    trn_spans = {1: trn, 2: [_span_features(trn[p:p + 2]) for p in range(max(m - 1, 0))]}
+
+    total_src = sum(f[0] for f in src)
+    total_trn = sum(f[0] for f in trn)
+    ratio = (total_trn / total_src) if total_src and total_trn else 1.0
+    band = max(_BAND_MIN, abs(n - m) + _BAND_MIN)
+
+    INF = float("inf")
+    cost = [[INF] * (m + 1) for _ in range(n + 1)]
+    back = [[None] * (m + 1) for _ in range(n + 1)]
+    cost[0][0] = 0.0
+
+    for i in range(n + 1):
+        center = (i * m / n) if n else 0
+        lo = max(0, int(center) - band)
+        hi = min(m, int(center) + band)
+        for j in range(lo, hi + 1):
+            if i == 0 and j == 0:
+                continue
+            best, best_move = INF, None
+            for (di, dj), prior in _BEAD_PRIOR.items():
+                pi, pj = i - di, j - dj
+                if pi < 0 or pj < 0 or cost[pi][pj] == INF:
+                    continue
+                c = cost[pi][pj] + prior
+                if di and dj:
+                    c += _bead_cost(src_spans[di][pi], trn_spans[dj][pj], ratio)
+                if c < best:
+                    best, best_move = c, (di, dj)
+            cost[i][j] = best
+            back[i][j] = best_move
+
+    # 밴드 밖으로 밀려 도달하지 못한 경우 (극단적인 줄 수 차이) → 인덱스 순 대응
+    if cost[n][m] == INF:
+        return [
+            ((src_idx[k],) if k < n else (), (trn_idx[k],) if k < m else ())
+            for k in range(max(n, m))
+        ]
+
+    beads = []
+    i, j = n, m
+    while i or j:
+        di, dj = back[i][j]
+        beads.append((tuple(src_idx[i - di:i]), tuple(trn_idx[j - dj:j])))
+        i, j = i - di, j - dj
+    beads.reverse()
+    return beads
+
+def aligned_sources(src_lines: Sequence[str], trn_lines: Sequence[str], joiner: str = " ") -> List[str]:
+    """
+    번역 각 줄(빈 줄 포함)에 대응하는 source 구간 텍스트.
+    - 줄 수가 같으면 인덱스 그대로 1:1
+    - 다르면 align_lines 결과로: 2-1은 두 source 줄을 joiner로 연결, 1-2는 같은 source를 두 줄에 공유,
+      대응 source가 없는 줄(0-1)/빈 줄은 ""
+    """
+    if len(src_lines) == len(trn_lines):
+        return [s.strip() for s in src_lines]
+    spans = [""] * len(trn_lines)
+    for src_ids, trn_ids in align_lines(src_lines, trn_lines):
+        span = joiner.join(src_lines[i].strip() for i in src_ids)
+        for j in trn_ids:
+            spans[j] = span
+    return spans
+
+def aligned_pairs(
+    src_lines: Sequence[str], trn_lines: Sequence[str], joiner: str = "\n"
+) -> List[Tuple[str, str, Tuple[int, ...]]]:
+    """
+    검수 단위 (src_text, trn_text, trn_ids) 목록 (번역 문서 순서). trn_ids = 단위가 차지하는 번역 줄 인덱스 (0-base)
+    - 줄 수가 같으면 인덱스 그대로 1:1 (빈 줄도 ("", "", (j,))로 유지)
+    - 다르면 비드 1개 = 단위 1개 (분할/병합된 줄은 joiner로 연결),
+      번역의 빈 줄은 ("", "", (j,))로 원래 위치에 유지
+    - 1-0 비드(번역에 대응 줄 없음)는 바로 앞 단위의 source에 붙임 (첫 단위 전이면 다음 단위에) → 모든 단위가 실제 번역 줄을 가짐
+      번역에 내용 있는 줄이 하나도 없으면 source 위치에서 가장 가까운 번역 (빈) 줄에 붙임
+      (번역이 아예 비어 있으면 1번 줄 = 인덱스 0) → 새 출력 줄을 만들지 않음
+    """
+    if len(src_lines) == len(trn_lines):
+        return [(s.strip(), t.strip(), (j,)) for j, (s, t) in enumerate(zip(src_lines, trn_lines))]
+
+    pairs = []
+    last = None          # 마지막 내용 단위 위치 (1-0 비드를 붙일 곳)
+    orphans = []         # 첫 내용 단위 전에 나온 1-0 비드 (첫 source 인덱스, source)
+    next_trn = 0
+    for src_ids, trn_ids in align_lines(src_lines, trn_lines):
+        src_text = joiner.join(src_lines[i].strip() for i in src_ids)
+        if not trn_ids:
+            if last is None:
+                orphans.append((src_ids[0], src_text))
+            else:
+                prev_src, prev_trn, prev_ids = pairs[last]
+                pairs[last] = (joiner.join(t for t in (prev_src, src_text) if t), prev_trn, prev_ids)
+            continue
+        # 이 비드 앞에 있는 번역 빈 줄은 제자리에 보존
+        pairs.extend(("", "", (j,)) for j in range(next_trn, trn_ids[0]))
+        next_trn = trn_ids[-1] + 1
+        if orphans:
+            src_text = joiner.join(t for t in (*(text for _, text in orphans), src_text) if t)
+            orphans = []
+        last = len(pairs)
+        pairs.append((src_text, joiner.join(trn_lines[j].strip() for j in trn_ids), tuple(trn_ids)))
+    pairs.extend(("", "", (j,)) for j in range(next_trn, len(trn_lines)))
+    if orphans:
+        # 번역에 내용 있는 줄이 없음 → pairs[j]는 번역 j번 빈 줄 그대로
+        if not pairs:
+            pairs.append(("", "", (0,)))
+        attached = {}
+        for src_pos, src_text in orphans:
+            attached.setdefault(min(src_pos, len(pairs) - 1), []).append(src_text)
+        for j, texts in attached.items():
+            pairs[j] = (joiner.join(texts), "", (j,))
+    return pairs
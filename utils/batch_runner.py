@@ -0,0 +1,333 @@
+# utils/batch_runner.py
+"""
+Batch API 실행 모드 (야간 전체 코퍼스 검수용: 지연 대신 단가/레이트리밋 우선).
+
+라운드 방식 (응답 캐시 키 = custom_id 이므로 같은 요청은 항상 같은 id):
+1) 수집 패스: 파이프라인을 그대로 돌리되 ask_gpt는 결과가 없으면 호출 대신 pending에 적재하고
+   "error"(dry-run과 같은 무변경 응답)를 돌려줌 → 파일 출력/저널 기록 없음
+2) pending 전체를 JSONL 1개로 써서 제출 → 완료까지 poll → 결과를 메모리 + 응답 캐시에 병합
+3) 다시 수집 패스: 이전 라운드 결과로 체인(emoji → missing → faithfulness, 카테고리 감지 → 검수)이
+   한 단계씩 더 진행되며 다음 단계 요청이 새로 pending에 쌓임. pending이 없을 때까지 반복
+4) 본 실행: 모든 호출이 Batch 결과로 채워져 기존과 같은 출력/token_usage_log.json 작성
+   (BATCH_MAX_ROUNDS를 넘기거나 계속 실패한 요청, BATCH_MAX_WAIT_SECONDS 안에 끝나지 않은 요청만 실시간 호출로 처리)
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from utils.llm_client import OPENAI_BASE_URL, LLM_TIMEOUT, LLMError, get_chat_client
+from utils.concurrency import LLM_CONCURRENCY_MAX
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_PRICE_FACTOR = 0.5     # Batch API 단가 = 실시간 단가 × 0.5
+BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", "30"))
+# 전체 라운드 대기 한도 (넘으면 진행 중 batch 취소 → 남은 요청은 본 실행에서 실시간 호출)
+BATCH_MAX_WAIT_SECONDS = float(os.getenv("LLM_BATCH_MAX_WAIT_SECONDS", str(24 * 3600)))
+BATCH_MAX_ROUNDS = 8         # 체인 최대 깊이(3단계)보다 넉넉하게
+BATCH_MAX_ATTEMPTS = 3       # 실패한 항목 재제출 횟수 (넘으면 본 실행에서 실시간 호출)
+
+_TERMINAL_STATUS = {"completed", "failed", "expired", "cancelled"}
+
+class BatchError(Exception):
+    """Batch 제출/조회 실패"""
+
+def _write_jsonl(path: str, records: List[dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+def _read_jsonl(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# =========================
+# Batch 서비스 백엔드
+# =========================
+class OpenAIBatchBackend:
+    """OpenAI Files + Batches API (입력 파일 업로드 → batch 생성 → 상태 조회 → 출력/오류 파일 다운로드)"""
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None, timeout: float = LLM_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._batches: Dict[str, dict] = {}
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            resp = self.session.request(method, f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise BatchError(f"{method} {path}: {type(e).__name__}: {e}")
+        if resp.status_code != 200:
+            raise BatchError(f"{method} {path}: HTTP {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self._request(
+                "POST", "/files", files={"file": (os.path.basename(input_path), f)}, data={"purpose": "batch"}
+            ).json()
+        batch = self._request("POST", "/batches", json={
+            "input_file_id": uploaded["id"],
+            "endpoint": BATCH_ENDPOINT,
+            "completion_window": BATCH_COMPLETION_WINDOW,
+        }).json()
+        self._batches[batch["id"]] = batch
+        return batch["id"]
+
+    def poll(self, batch_id: str) -> str:
+        batch = self._request("GET", f"/batches/{batch_id}").json()
+        self._batches[batch_id] = batch
+        return batch.get("status", "")
+
+    def cancel(self, batch_id: str) -> None:
+        self._request("POST", f"/batches/{batch_id}/cancel")
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        """출력 파일 + 오류 파일을 output_path 하나로 (줄 단위 JSON)"""
+        batch = self._batches[batch_id]
+        with open(output_path, "w", encoding="utf-8") as out:
+            for key in ("output_file_id", "error_file_id"):
+                if batch.get(key):
+                    content = self._request("GET", f"/files/{batch[key]}/content").text
+                    out.write(content if content.endswith("\n") or not content else content + "\n")
+
+class LocalBatchBackend:
+    """
+    테스트용 파일 기반 Batch 서비스 대역.
+    submit: 입력 JSONL을 <work_dir>/<batch_id>/input.jsonl로 복사
+    poll  : 첫 조회 때 각 요청을 get_chat_client()로 실행해 OpenAI Batch 출력 형식의 output.jsonl 작성
+    OPENAI_BASE_URL을 로컬 스텁 서버로 두면 네트워크 없이 전체 흐름 확인 가능.
+    """
+
+    def __init__(self, work_dir: str, max_parallel: int = LLM_CONCURRENCY_MAX):
+        self.work_dir = work_dir
+        self.max_parallel = max_parallel
+
+    def _dir(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, batch_id)
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._dir(batch_id), exist_ok=True)
+        shutil.copyfile(input_path, os.path.join(self._dir(batch_id), "input.jsonl"))
+        return batch_id
+
+    def _execute(self, index: int, request: dict) -> dict:
+        body = request["body"]
+        try:
+            reply, usage = get_chat_client().chat(
+                body["messages"], model=body["model"], temperature=body.get("temperature", 0.0)
+            )
+        except LLMError as e:
+            response = {"status_code": e.status or 500, "body": {"error": {"message": str(e)}}}
+        else:
+            response = {"status_code": 200, "body": {
+                "object": "chat.completion",
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            }}
+        return {"id": f"batch_req_{index}", "custom_id": request["custom_id"], "response": response, "error": None}
+
+    def poll(self, batch_id: str) -> str:
+        output_path = os.path.join(self._dir(batch_id), "output.jsonl")
+        if not os.path.exists(output_path):
+            batch_requests = _read_jsonl(os.path.join(self._dir(batch_id), "input.jsonl"))
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+                records = list(pool.map(self._execute, range(len(batch_requests)), batch_requests))
+            _write_jsonl(output_path + ".tmp", records)
+            os.replace(output_path + ".tmp", output_path)
+        return "completed"
+
+    def cancel(self, batch_id: str) -> None:
+        pass  # poll 한 번에 끝나므로 취소할 것이 없음
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        shutil.copyfile(os.path.join(self._dir(batch_id), "output.jsonl"), output_path)
+
+def make_batch_backend(name: str, work_dir: str):
+    """--batch 인자 → 백엔드 ("openai" | "local")"""
+    if name == "local":
+        return LocalBatchBackend(os.path.join(work_dir, "local_service"))
+    if name == "openai":
+        return OpenAIBatchBackend()
+    raise ValueError(f"알 수 없는 batch 백엔드: {name}")
+
+# =========================
+# 라운드 실행기
+# =========================
+class BatchRunner:
+    """
+    lookup(custom_id, body): 결과가 있으면 (reply, usage), 없으면 None (수집 중이면 pending에 적재)
+    run(collect_pass): pending이 없을 때까지 수집 패스 → 제출 → poll → 병합 반복 (전체 max_wait초 한도)
+    store(custom_id, reply, usage): 병합 시 호출 (응답 캐시에 저장해 다음 실행에서도 재사용)
+    """
+
+    def __init__(
+        self,
+        backend,
+        work_dir: str,
+        store: Optional[Callable[[str, str, dict], None]] = None,
+        poll_seconds: float = BATCH_POLL_SECONDS,
+        max_rounds: int = BATCH_MAX_ROUNDS,
+        max_wait: float = BATCH_MAX_WAIT_SECONDS,
+    ):
+        self.backend = backend
+        self.work_dir = work_dir
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self.max_rounds = max_rounds
+        self.max_wait = max_wait
+        self._deadline = float("inf")
+        self.collecting = False
+        self._results: Dict[str, Tuple[str, dict]] = {}
+        self._pending: Dict[str, dict] = {}
+        self._attempts: Dict[str, int] = defaultdict(int)
+        self._used: set = set()      # 본 실행에서 실제로 쓰인 결과 (나머지는 체인 입력이 바뀌어 버려진 추측 요청)
+        self._lock = threading.Lock()
+        self._rounds: List[Dict[str, Any]] = []
+
+    def lookup(self, custom_id: str, body: dict) -> Optional[Tuple[str, dict]]:
+        with self._lock:
+            hit = self._results.get(custom_id)
+            if hit is not None:
+                if not self.collecting:
+                    self._used.add(custom_id)
+                return hit[0], dict(hit[1])
+            if self.collecting and self._attempts[custom_id] < BATCH_MAX_ATTEMPTS:
+                self._pending.setdefault(custom_id, body)
+            return None
+
+    def run(self, collect_pass: Callable[[], None]) -> None:
+        self._deadline = time.time() + self.max_wait
+        for round_no in range(1, self.max_rounds + 1):
+            self._pending = {}
+            self.collecting = True
+            try:
+                collect_pass()
+            finally:
+                self.collecting = False
+            if not self._pending:
+                return
+            if self._run_round(round_no, self._pending) == "timeout":
+                # 이후 라운드도 기다릴 시간이 없음 → 결과 없는 요청은 본 실행에서 실시간 호출
+                print(f"⚠️  Batch 대기 한도 {self.max_wait:.0f}s 초과: 남은 요청은 실시간 호출로 처리")
+                return
+        if self._pending:
+            print(f"⚠️  Batch 라운드 {self.max_rounds}회 초과: 남은 요청은 실시간 호출로 처리")
+
+    def _run_round(self, round_no: int, pending: Dict[str, dict]) -> str:
+        input_path = os.path.join(self.work_dir, f"round_{round_no:02d}_input.jsonl")
+        output_path = os.path.join(self.work_dir, f"round_{round_no:02d}_output.jsonl")
+        _write_jsonl(input_path, [
+            {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+            for custom_id, body in sorted(pending.items())
+        ])
+
+        started = time.time()
+        batch_id = self.backend.submit(input_path)
+        print(f"📦 Batch 라운드 {round_no}: 요청 {len(pending)}건 제출 ({batch_id})")
+        while True:
+            try:
+                status = self.backend.poll(batch_id)
+            except BatchError as e:
+                print(f"Batch 상태 조회 실패 (다음 poll에서 재시도): {e}")
+                status = ""
+            if status in _TERMINAL_STATUS:
+                break
+            if time.time() >= self._deadline:
+                status = "timeout"
+                try:
+                    self.backend.cancel(batch_id)
+                except BatchError as e:
+                    print(f"Batch 취소 실패 (만료까지 청구될 수 있음): {e}")
+                break
+            time.sleep(max(0.0, min(self.poll_seconds, self._deadline - time.time())))
+
+        merged = 0
+        if status == "completed" or status == "expired":
+            # expired여도 완료된 요청은 출력 파일에 들어 있음
+            self.backend.download(batch_id, output_path)
+            merged = self._merge(output_path)
+        failed = [custom_id for custom_id in pending if custom_id not in self._results]
+        for custom_id in failed:
+            self._attempts[custom_id] += 1
+
+        elapsed = time.time() - started
+        print(f"   → {status}: 성공 {merged} / 실패 {len(failed)} ({elapsed:.1f}s)")
+        self._rounds.append({
+            "round": round_no,
+            "batch_id": batch_id,
+            "status": status,
+            "submitted": len(pending),
+            "succeeded": merged,
+            "failed": len(failed),
+            "elapsed_s": round(elapsed, 3),
+        })
+        return status
+
+    def _merge(self, output_path: str) -> int:
+        merged = 0
+        for rec in _read_jsonl(output_path):
+            response = rec.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            try:
+                body = response["body"]
+                reply = (body["choices"][0]["message"]["content"] or "").strip()
+            except (KeyError, IndexError, TypeError):
+                continue
+            usage = dict(body.get("usage") or {})
+            with self._lock:
+                self._results[rec["custom_id"]] = (reply, usage)
+            if self.store is not None:
+                self.store(rec["custom_id"], reply, usage)
+            merged += 1
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        run summary용: 라운드별 제출/성공/실패, 병합된 결과 수,
+        Batch로 청구된 전체 토큰(본 실행에서 안 쓰인 결과 포함 — 파일별 usage에는 쓰인 결과만 집계됨)
+        """
+        with self._lock:
+            results = dict(self._results)
+            used = set(self._used)
+        unused = [cid for cid in results if cid not in used]
+        return {
+            "rounds": list(self._rounds),
+            "results": len(results),
+            "unused_results": len(unused),
+            "billed_prompt_tokens": sum(int(u.get("prompt_tokens", 0) or 0) for _, u in results.values()),
+            "billed_completion_tokens": sum(int(u.get("completion_tokens", 0) or 0) for _, u in results.values()),
+            "unused_prompt_tokens": sum(int(results[cid][1].get("prompt_tokens", 0) or 0) for cid in unused),
+            "unused_completion_tokens": sum(int(results[cid][1].get("completion_tokens", 0) or 0) for cid in unused),
+        }
+
+_runner: Optional[BatchRunner] = None
+
+def set_batch_runner(runner: Optional[BatchRunner]) -> None:
+    global _runner
+    _runner = runner
+
+def get_batch_runner() -> Optional[BatchRunner]:
+    return _runner
+
+def is_collecting() -> bool:
+    """Batch 수집 패스 중이면 True (파일 출력/저널 기록 생략용)"""
+    return _runner is not None and _runner.collecting
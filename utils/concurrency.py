@@ -0,0 +1,182 @@
+# utils/concurrency.py
+"""
+LLM 동시 호출 수(in-flight) AIMD 제어기.
+
+- 정상 응답이 limit개 쌓일 때마다 limit += 1 (가산 증가, 대략 RTT당 +1)
+  단, 호출 시점 in-flight가 limit의 절반 미만이었던 응답은 세지 않음 (한도를 쓰지도 않는데 계속 올라가는 것 방지)
+- 429 / Retry-After / 5xx·타임아웃 / p95 지연 상승 → limit *= DECREASE_FACTOR (승산 감소)
+  한 번 줄인 뒤 COOLDOWN_SECONDS 동안은 다시 줄이지 않음 (동시에 날아간 요청들의 429가 연쇄 감소로 이어지지 않도록)
+- Retry-After가 오면 그 시간 동안 새 호출 시작 자체를 멈춤
+- p95 기준선: 지금까지 관측한 구간 p95 중 최솟값. 최근 구간 p95가 기준선 × LATENCY_TOLERANCE를 넘으면 감소
+"""
+from __future__ import annotations
+import os
+import time
+import math
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "32"))
+
+DECREASE_FACTOR = 0.5
+COOLDOWN_SECONDS = 2.0
+LATENCY_WINDOW = 50          # p95 계산에 쓰는 최근 응답 수
+LATENCY_TOLERANCE = 2.0      # 최근 p95 > 기준선 × 이 값 → 감소
+HISTORY_MAX = 500            # run summary에 남기는 limit 변경 이력 최대 개수
+
+def _p95(samples: List[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+class Slot:
+    """acquire 1건. 호출 결과를 record()로 남기면 release 시 제어기에 반영 (안 남기면 오류로 간주하지 않고 무시)"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.utilized = False                    # 호출 시점에 한도를 절반 이상 쓰고 있었는지
+        self.outcome: Optional[str] = None       # "ok" | "rate_limited" | "error"
+        self.retry_after: Optional[float] = None
+
+    def record(self, outcome: str, retry_after: Optional[float] = None) -> None:
+        self.outcome = outcome
+        self.retry_after = retry_after
+
+class AdaptiveLimiter:
+    """
+    with limiter.slot() as s:
+        ... 호출 ...
+        s.record("ok" | "rate_limited" | "error", retry_after)
+    limit 만큼만 동시에 slot을 내주고, 나머지는 대기.
+    """
+
+    def __init__(
+        self,
+        initial: int = LLM_CONCURRENCY_INITIAL,
+        min_limit: int = LLM_CONCURRENCY_MIN,
+        max_limit: int = LLM_CONCURRENCY_MAX,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._successes = 0                       # 마지막 증가 이후 정상 응답 수
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._baseline_p95: Optional[float] = None
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._t0 = time.monotonic()
+        self._history: List[Dict[str, Any]] = []
+        self._counts = {"increases": 0, "decreases": 0, "peak_in_flight": 0, "wait_s": 0.0}
+        self._log("init")
+
+    def _log(self, reason: str) -> None:
+        # 호출부가 _cond를 잡고 있음
+        self._history.append({"t": round(time.monotonic() - self._t0, 3), "limit": self.limit, "reason": reason})
+        if len(self._history) > HISTORY_MAX:
+            del self._history[: len(self._history) - HISTORY_MAX]
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        s = Slot()
+        s.utilized = self._acquire()
+        s.started = time.monotonic()
+        try:
+            yield s
+        finally:
+            self._release(s)
+
+    def _acquire(self) -> bool:
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self._in_flight < self.limit:
+                    break
+                self._cond.wait()
+            self._in_flight += 1
+            self._counts["peak_in_flight"] = max(self._counts["peak_in_flight"], self._in_flight)
+            self._counts["wait_s"] += time.monotonic() - start
+            return self._in_flight * 2 >= self.limit
+
+    def _release(self, s: Slot) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if s.outcome == "ok":
+                self._on_success(now - s.started, now, s.utilized)
+            elif s.outcome == "rate_limited":
+                if s.retry_after:
+                    self._paused_until = max(self._paused_until, now + s.retry_after)
+                self._decrease(now, "429" if s.retry_after is None else f"429 retry-after {s.retry_after:.2f}s")
+            elif s.outcome == "error":
+                self._decrease(now, "error")
+            self._cond.notify_all()
+
+    def _on_success(self, latency: float, now: float, utilized: bool) -> None:
+        self._latencies.append(latency)
+        if len(self._latencies) == self._latencies.maxlen:
+            p95 = _p95(list(self._latencies))
+            if self._baseline_p95 is None or p95 < self._baseline_p95:
+                self._baseline_p95 = p95
+            elif p95 > self._baseline_p95 * LATENCY_TOLERANCE:
+                # 지연 상승 중에는 증가하지 않음 (쿨다운 중이면 감소도 보류)
+                if self._decrease(now, f"p95 {p95 * 1000:.0f}ms > {self._baseline_p95 * 1000:.0f}ms x{LATENCY_TOLERANCE}"):
+                    self._latencies.clear()  # 감소 후 지연은 새로 관측
+                return
+
+        if not utilized:
+            return
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+            self._counts["increases"] += 1
+            self._log("healthy")
+
+    def _decrease(self, now: float, reason: str) -> bool:
+        if now - self._last_decrease < COOLDOWN_SECONDS:
+            return False
+        self._last_decrease = now
+        self._successes = 0
+        new_limit = max(self.min_limit, int(self.limit * DECREASE_FACTOR))
+        if new_limit == self.limit:
+            return False
+        self.limit = new_limit
+        self._counts["decreases"] += 1
+        self._log(reason)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """run summary용: 현재 limit, 범위, 증감 횟수, 최근 p95, limit 변경 이력"""
+        with self._cond:
+            latencies = list(self._latencies)
+            return {
+                "limit": self.limit,
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._counts["peak_in_flight"],
+                "increases": self._counts["increases"],
+                "decreases": self._counts["decreases"],
+                "wait_s": round(self._counts["wait_s"], 3),
+                "p95_ms": round(_p95(latencies) * 1000, 1) if latencies else None,
+                "baseline_p95_ms": round(self._baseline_p95 * 1000, 1) if self._baseline_p95 is not None else None,
+                "history": list(self._history),
+            }
+
+def describe_limiter(stats: Dict[str, Any]) -> str:
+    """limiter stats → 한 줄 요약 (콘솔 출력용)"""
+    changes = " → ".join(str(h["limit"]) for h in stats["history"][-12:])
+    p95 = f"{stats['p95_ms']:.0f}ms" if stats["p95_ms"] is not None else "-"
+    return (
+        f"limit {stats['limit']} (범위 {stats['min']}~{stats['max']}, 최대 in-flight {stats['peak_in_flight']}, "
+        f"증가 {stats['increases']} / 감소 {stats['decreases']}, p95 {p95}) 이력: {changes}"
+    )
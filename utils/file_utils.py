@@ -1,14 +1,25 @@
 # utils/file_utils.py
 import os
 
+# 가이드라인 루트 (locale별 하위 폴더에 category.txt), 환경 변수 GUIDELINE_DIR로 변경 가능
+GUIDELINE_DIR = os.getenv(
+    "GUIDELINE_DIR",
+    "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/policy_docs_new_after",
+)
+
+# 컴파일된 가이드라인 번들 (build_guidelines.py로 생성), 환경 변수 GUIDELINE_BUNDLE로 변경 가능
+GUIDELINE_BUNDLE = os.getenv(
+    "GUIDELINE_BUNDLE",
+    os.path.join(os.path.dirname(os.path.normpath(GUIDELINE_DIR)), "guideline_bundle.json"),
+)
+
 def load_guideline(locale: str, category: str) -> str:
     """
     Load the guideline txt file content for a specific locale and category.
     Example: locale='fr_FR', category='currency'
     → loads: rag_module/policy_docs_new_after/fr_FR/currency.txt
     """
-    base_dir = "/mnt/c/Users/Flitto/Documents/NAC/LLM검수/Advanced/rag_module/policy_docs_new_after"
-    file_path = os.path.join(base_dir, locale, f"{category}.txt")
+    file_path = os.path.join(GUIDELINE_DIR, locale, f"{category}.txt")
 
     if not os.path.exists(file_path):
         print(f"가이드라인 파일이 존재하지 않습니다: {file_path}")
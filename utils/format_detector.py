@@ -0,0 +1,180 @@
+# utils/format_detector.py
+"""
+규칙 기반 포맷 카테고리 감지 (currency / date / numeric / time).
+
+SYSTEM_CATEGORY_BLOCK LLM 호출 전에 명확한 경우만 로컬에서 판정.
+- 숫자/한자 숫자/월·요일 이름/통화 단어가 전혀 없는 문장 → []
+- 모든 숫자가 알려진 패턴에 빠짐없이 설명되는 문장     → 해당 카테고리 목록
+- 그 외 애매한 경우 → None  (LLM에 위임)
+  코드/전화번호/단독 정수/연도, 숫자 없는 날짜·금액("in January", "five dollars"),
+  점으로 이은 버전 문자열(1.2.10), N/N 형태(24/7, 12/31, 1/2)
+"""
+from __future__ import annotations
+import re
+from typing import List, Optional
+
+# 반환 순서 고정 (검수 체인 순서 = 이 순서)
+CATEGORY_ORDER = ["currency", "date", "numeric", "time"]
+
+# =========================
+# 통화
+# =========================
+_CURRENCY_SYMBOLS = (
+    r"NT\$|US\$|HK\$|A\$|C\$|S\$|R\$|"
+    r"[$€£¥₩₹₽₺฿₱₡₨₦₫₭₲₵₿¤ƒ₮₪₴﷼₸₾¢]"
+)
+_CURRENCY_CODES = (
+    r"USD|EUR|KRW|JPY|CNY|RMB|GBP|INR|RUB|TRY|TL|AUD|CAD|CHF|MXN|BRL|PLN|SEK|NOK|DKK|CZK|HUF|"
+    r"ILS|SAR|AED|SGD|HKD|TWD|NTD|THB|MYR|IDR|PHP|VND|ZAR|UAH|NZD"
+)
+# 숫자 뒤에 붙는 로케일별 통화 단위 (ko / ja / zh / pl / id / vi / en ...)
+_CURRENCY_WORDS_AFTER = (
+    r"원|달러|엔|위안|유로|파운드|루피|"
+    r"円|元|美元|欧元|歐元|日元|韩元|韓元|新台幣|台幣|港元|英镑|英鎊|"
+    r"zł|złotych|zł\.|Kč|Ft|lei|руб\.?|рублей|грн|"
+    r"đồng|đ|dollars?|euros?|pounds?|yen|won|yuan|rupees?|baht|lira"
+)
+_AMOUNT = r"\d{1,3}(?:[.,\u00a0\u202f' ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+
+_CURRENCY_PATTERNS = [
+    re.compile(rf"(?:{_CURRENCY_SYMBOLS})\s?(?:{_AMOUNT})(?:\s?[KMBkmb](?![\w]))?"),
+    re.compile(rf"(?:{_AMOUNT})(?:\s?[KMBkmb])?\s?(?:{_CURRENCY_SYMBOLS})"),
+    re.compile(rf"(?<![A-Za-z])(?:{_CURRENCY_CODES})\s?(?:{_AMOUNT})"),
+    re.compile(rf"(?:{_AMOUNT})\s?(?:{_CURRENCY_CODES})(?![A-Za-z])"),
+    re.compile(rf"(?:{_AMOUNT})\s?(?:{_CURRENCY_WORDS_AFTER})(?![A-Za-z])", re.IGNORECASE),
+    re.compile(r"(?:Rp|Rs)\.?\s?(?:" + _AMOUNT + r")"),
+]
+
+# =========================
+# 날짜
+# =========================
+# 로케일별 월 이름 (en / fr / de / es / it / pt / nl / pl / tr / id)
+_MONTH_FULL_NAMES = (
+    r"January|February|March|April|May|June|July|August|September|October|November|December|"
+    r"janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre|"
+    r"Januar|Februar|März|Juni|Juli|Oktober|Dezember|"
+    r"enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre|"
+    r"gennaio|febbraio|aprile|maggio|giugno|luglio|settembre|ottobre|dicembre|"
+    r"janeiro|fevereiro|março|maio|junho|julho|setembro|outubro|novembro|dezembro|"
+    r"januari|februari|maart|mei|augustus|"
+    r"stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia|"
+    r"Ocak|Şubat|Mart|Nisan|Mayıs|Haziran|Temmuz|Ağustos|Eylül|Ekim|Kasım|Aralık|"
+    r"Januari|Februari|Maret|Agustus|Desember"
+)
+_MONTH_ABBREVIATIONS = r"Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec"
+_MONTH_NAMES = f"{_MONTH_FULL_NAMES}|{_MONTH_ABBREVIATIONS}"
+_ORD = r"(?:st|nd|rd|th|er|e|º|ª|\.)?"
+
+_DATE_PATTERNS = [
+    # ISO / 연-월-일
+    re.compile(r"(?<![\d.,])\d{4}[-/.]\d{1,2}[-/.]\d{1,2}(?![\d])"),
+    # 일-월-연 / 월-일-연
+    re.compile(r"(?<![\d.,])\d{1,2}[-/.]\d{1,2}[-/.](?:\d{4}|\d{2})(?![\d])"),
+    # 월 이름 + 일 (+ 연도)
+    re.compile(rf"\b(?:{_MONTH_NAMES})\.?\s+\d{{1,2}}{_ORD}(?:,?\s+\d{{4}})?(?![\d])", re.IGNORECASE),
+    # 일 + 월 이름 (+ 연도)
+    re.compile(rf"(?<![\d])\d{{1,2}}{_ORD}\s+(?:of\s+|de\s+)?(?:{_MONTH_NAMES})\b\.?(?:,?\s+(?:de\s+)?\d{{4}})?", re.IGNORECASE),
+    # 월 이름 + 연도
+    re.compile(rf"\b(?:{_MONTH_NAMES})\.?,?\s+\d{{4}}(?![\d])", re.IGNORECASE),
+    # 한/중/일 (년월일)
+    re.compile(r"\d{2,4}\s?[年년]\s?\d{1,2}\s?[月월](?:\s?\d{1,2}\s?[日일号號])?"),
+    re.compile(r"(?<![\d])\d{1,2}\s?[月월]\s?\d{1,2}\s?[日일号號]"),
+]
+
+# =========================
+# 시간
+# =========================
+_AMPM = r"(?:\s?(?:[AaPp]\.?[Mm]\.?))"
+_TIME_PATTERNS = [
+    re.compile(rf"(?<![\d.:])(?:[01]?\d|2[0-4]):[0-5]\d(?::[0-5]\d)?{_AMPM}?(?![\d:])"),
+    re.compile(rf"(?<![\d.:])(?:0?[1-9]|1[0-2]){_AMPM}(?![A-Za-z])"),
+    re.compile(r"(?<![\d.:])(?:[01]?\d|2[0-4])h[0-5]\d(?![\d])"),
+    re.compile(r"(?:오전|오후|上午|下午|午前|午後)?\s?(?<![\d])(?:[01]?\d|2[0-4])\s?[時时시点點](?:\s?[0-5]?\d\s?[分분])?"),
+]
+
+# =========================
+# 숫자 (구분자/소수점이 있는 명확한 수)
+# =========================
+_NUMERIC_PATTERNS = [
+    # 천 단위 구분 (1,000 / 1.000 / 1 000 / 1'000) + 소수부
+    re.compile(r"(?<![\d.,])\d{1,3}(?:([,.\u00a0\u202f' ])\d{3})(?:\1\d{3})*(?:[.,]\d+)?(?![\d])"),
+    # 소수 (12.5 / 12,5)
+    re.compile(r"(?<![\d.,])\d+[.,]\d+(?![\d.,])"),
+]
+
+# 숫자 없이도 날짜/시간을 표현하는 한자 숫자 → 판단 보류
+_CJK_NUMERAL_REGEX = re.compile(r"[〇零一二三四五六七八九十百千万萬億]+\s?[年月日時时点點分]")
+_DIGIT_REGEX = re.compile(r"\d")
+
+# 숫자 없이 날짜/금액을 표현할 수 있는 단어 (in January / on Monday / five dollars) → 판단 보류
+# 월 약어(Jan, Mar ...)는 숫자 없이 쓰이면 이름 등과 구분이 안 되므로 제외, 대소문자는 로케일 표기 그대로
+_DATE_WORD_REGEX = re.compile(
+    rf"\b(?:{_MONTH_FULL_NAMES}|Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b"
+    r"|[월화수목금토일]요일|[月火水木金土日]曜日|(?:星期|礼拜|禮拜|周|週)[一二三四五六日天]"
+)
+_CURRENCY_WORD_REGEX = re.compile(
+    r"\b(?:dollars?|euros?|pounds?|yen|yuan|rupees?|baht|lira|cents?|bucks?|"
+    r"złotych|рублей|рубль|гривень|đồng)\b"
+    r"|달러|유로|위안|파운드|美元|欧元|歐元|日元|韩元|韓元|港元|英镑|英鎊|新台幣|台幣",
+    re.IGNORECASE,
+)
+
+# 숫자는 있지만 규칙으로 카테고리를 정할 수 없는 형태 → 판단 보류
+# N/N: 날짜(12/31)·분수(1/2)·표현(24/7) 구분 불가
+_SLASH_PAIR_REGEX = re.compile(r"(?<![\d/.,])\d{1,4}/\d{1,4}(?![\d/])")
+# 점으로 이은 세 마디 이상 (1.2.10): 버전 문자열 / 2자리 연도 날짜 구분 불가
+_DOTTED_REGEX = re.compile(r"(?<![\d.,])\d+(?:\.\d+){2,}(?![.,]?\d)")
+# v2 / ver. 3 / Version 1.2 (버전 번호)
+_VERSION_PREFIX_REGEX = re.compile(r"(?<![A-Za-z])v(?:er(?:sion)?)?\.?\s?\d", re.IGNORECASE)
+
+_PATTERNS_BY_CATEGORY = [
+    ("currency", _CURRENCY_PATTERNS),
+    ("date", _DATE_PATTERNS),
+    ("time", _TIME_PATTERNS),
+    ("numeric", _NUMERIC_PATTERNS),
+]
+
+def _mask(text: str, start: int, end: int) -> str:
+    return text[:start] + " " * (end - start) + text[end:]
+
+def _is_ambiguous_dotted(token: str) -> bool:
+    """1.2.10 → True / 1.000.000(천 단위), 2024.01.05·31.12.2024(4자리 연도 날짜) → False"""
+    parts = token.split(".")
+    if all(len(p) == 3 for p in parts[1:]):
+        return False
+    if len(parts) == 3 and (len(parts[0]) == 4 or len(parts[2]) == 4):
+        return False
+    return True
+
+def detect_categories(sentence: str) -> Optional[List[str]]:
+    """
+    문장의 포맷 카테고리를 규칙으로 판정.
+    명확하면 카테고리 목록(CATEGORY_ORDER 순서, 없으면 []), 애매하면 None.
+    """
+    text = sentence or ""
+    if _CJK_NUMERAL_REGEX.search(text):
+        return None
+    if not _DIGIT_REGEX.search(text):
+        if _DATE_WORD_REGEX.search(text) or _CURRENCY_WORD_REGEX.search(text):
+            return None
+        return []
+    if _SLASH_PAIR_REGEX.search(text) or _VERSION_PREFIX_REGEX.search(text):
+        return None
+    if any(_is_ambiguous_dotted(m.group()) for m in _DOTTED_REGEX.finditer(text)):
+        return None
+
+    found = set()
+    remaining = text
+    # 우선순위(통화 → 날짜 → 시간 → 숫자)대로 매칭된 구간을 지워가며 판정
+    for category, patterns in _PATTERNS_BY_CATEGORY:
+        for pattern in patterns:
+            for m in list(pattern.finditer(remaining)):
+                if not _DIGIT_REGEX.search(m.group()):
+                    continue
+                found.add(category)
+                remaining = _mask(remaining, m.start(), m.end())
+
+    # 설명되지 않은 숫자가 남아 있으면 (코드/전화번호/단독 정수 등) LLM에 위임
+    if _DIGIT_REGEX.search(remaining):
+        return None
+    return [c for c in CATEGORY_ORDER if c in found]
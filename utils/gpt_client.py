@@ -1,29 +1,187 @@
-import openai
 import os
 import json
-from typing import List, Tuple
+import atexit
+import time
+import hashlib
+import threading
+from typing import List, Tuple, Optional
 
-# 환경 변수로부터 키 로딩
-openai.api_key = os.getenv("OPENAI_API_KEY")
+from utils.llm_cache import ResponseCache, make_cache_key, DEFAULT_CACHE_PATH
+from utils.llm_client import LLMError, get_chat_client
+from utils.batch_runner import BatchRunner, get_batch_runner, set_batch_runner
+from utils.metrics import inc, record_llm_usage, current_labels
+from utils.tracing import span, timed
+
+# API 키는 utils/llm_client가 환경 변수(OPENAI_API_KEY)에서 로딩
+
+# 응답 캐시 설정 (LLM_CACHE=0 이면 사용 안 함)
+RESPONSE_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+RESPONSE_CACHE_PATH = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+RESPONSE_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """응답 캐시 싱글톤 (첫 호출 시 오픈). 비활성화 시 None."""
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024
+                )
+                # 모아 둔 last_access 갱신을 종료 시 반영
+                atexit.register(_response_cache.close)
+    return _response_cache
+
+def response_cache_stats(since: Optional[dict] = None) -> dict:
+    """
+    캐시 hit/miss 통계. since(이전 스냅샷)를 주면 그 이후 구간의 hit/miss만 계산.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    stats = cache.stats()
+    if since and since.get("enabled", True):
+        for k in ("hits", "misses", "evictions"):
+            stats[k] -= since.get(k, 0)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["enabled"] = True
+    return stats
+
+def merge_response_cache_stats(stats_list: List[dict]) -> dict:
+    """파일/프로세스별 구간 캐시 통계를 합산 (entries/size_bytes는 가장 최근 값 기준 최대치)"""
+    stats_list = [s for s in stats_list if s and s.get("enabled")]
+    if not stats_list:
+        return {"enabled": False}
+    merged = {k: sum(s.get(k, 0) for s in stats_list) for k in ("hits", "misses", "evictions")}
+    lookups = merged["hits"] + merged["misses"]
+    merged["hit_ratio"] = round(merged["hits"] / lookups, 4) if lookups else 0.0
+    merged["entries"] = max(s.get("entries", 0) for s in stats_list)
+    merged["size_bytes"] = max(s.get("size_bytes", 0) for s in stats_list)
+    merged["enabled"] = True
+    return merged
+
+def _parse_reply(reply: str):
+    if reply.startswith("["):
+        try:
+            return json.loads(reply)
+        except json.JSONDecodeError:
+            return []
+    return reply
+
+def _normalize_usage(usage) -> dict:
+    """
+    API usage → 일반 dict. prompt_tokens_details.cached_tokens(실제 prompt cache 적중 토큰)를
+    최상위 "cached_tokens"로 노출 (캐시 미적용 모델/임계값 미만이면 0).
+    """
+    usage = dict(usage or {})
+    details = usage.get("prompt_tokens_details") or {}
+    usage["cached_tokens"] = int(details.get("cached_tokens", 0) or 0)
+    return usage
+
+def start_batch_mode(backend, work_dir: str) -> BatchRunner:
+    """
+    Batch 모드 시작: 이후 ask_gpt는 Batch 결과를 먼저 조회 (utils/batch_runner 참고).
+    병합된 결과는 응답 캐시에도 저장해 다음 실행에서 재사용.
+    """
+    cache = get_response_cache()
+    runner = BatchRunner(backend, work_dir, store=cache.put if cache is not None else None)
+    set_batch_runner(runner)
+    return runner
+
+def _outcome(usage: dict) -> str:
+    for flag in ("cache_hit", "batch_pending", "batch", "error"):
+        if usage.get(flag):
+            return flag
+    return "ok"
 
 def ask_gpt(messages: List[dict], model="gpt-4o", temperature=0.0) -> Tuple[str | list, dict]:
+    """LLM 호출 1회 (Batch 결과 → 응답 캐시 → API 순). 추적이 켜져 있으면 "llm" span으로 기록"""
+    with span("llm", model=model) as s:
+        reply, usage = _ask_gpt(messages, model, temperature)
+        if s:
+            system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+            user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+            s.set(
+                **{k: v for k, v in current_labels().items() if v},
+                outcome=_outcome(usage),
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                cached_tokens=usage.get("cached_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                # 느린 프롬프트 집계용: system 접두사 해시 + user 앞부분
+                system_sha=hashlib.sha256(system.encode("utf-8")).hexdigest()[:12] if system else "",
+                user=user[:160],
+            )
+        return reply, usage
+
+def _ask_gpt(messages: List[dict], model: str, temperature: float) -> Tuple[str | list, dict]:
+    cache = get_response_cache()
+    runner = get_batch_runner()
+    cache_key = None
+    if cache is not None or runner is not None:
+        cache_key = make_cache_key(model, temperature, messages)
+
+    if runner is not None:
+        # Batch 모드: custom_id = 응답 캐시 키. 결과는 Batch 단가로 과금된 usage 그대로 보고
+        batch_hit = runner.lookup(cache_key, {"model": model, "messages": messages, "temperature": temperature})
+        if batch_hit is not None:
+            reply, usage = batch_hit
+            usage = _normalize_usage(usage)
+            usage["batch"] = True
+            record_llm_usage(model, "batch", usage)
+            return _parse_reply(reply), usage
+
+    if cache is not None:
+        with timed("io"):
+            hit = cache.get(cache_key)
+        if hit is not None:
+            reply, original_usage = hit
+            # 캐시 응답은 과금되지 않으므로 usage는 0, 최초 usage는 참고용으로 보관
+            usage = {
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "cached_tokens": 0,
+                "cache_hit": True,
+                "original_usage": original_usage,
+            }
+            record_llm_usage(model, "cache_hit", usage)
+            return _parse_reply(reply), usage
+
+    if runner is not None and runner.collecting:
+        # 수집 패스: 호출 대신 pending에 적재됨 → dry-run과 같은 무변경 응답
+        usage = {
+            "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0,
+            "batch_pending": True,
+        }
+        record_llm_usage(model, "batch_pending", usage)
+        return "error", usage
+
+    started = time.monotonic()
     try:
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-        )
-        reply = response["choices"][0]["message"]["content"].strip()
-        usage = response["usage"]
-
-        if reply.startswith("["):
-            try:
-                return json.loads(reply), usage
-            except json.JSONDecodeError:
-                return [], usage
+        # 연결 풀 + RPM/TPM 제한 + 재시도 (429/5xx/타임아웃)
+        reply, usage = get_chat_client().chat(messages, model=model, temperature=temperature)
+        usage = _normalize_usage(usage)
+        record_llm_usage(model, "ok", usage, time.monotonic() - started)
 
-        return reply, usage
+        if cache is not None:
+            with timed("io"):
+                cache.put(cache_key, reply, dict(usage))
+
+        return _parse_reply(reply), usage
 
-    except Exception as e:
-        print(f"ChatGPT API 오류 발생: {e}")
-        return "error", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    except LLMError as e:
+        # 재시도를 모두 소진했거나 재시도 불가 오류 → 호출부에는 "error"로 전달 (usage에 원인 기록)
+        print(f"ChatGPT API 오류 발생 (status={e.status}): {e}")
+        usage = {
+            "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0,
+            "error": str(e), "error_status": e.status,
+        }
+        record_llm_usage(model, "error", usage, time.monotonic() - started)
+        inc("llm_errors_total", model=model, status=str(e.status or "none"))
+        return "error", usage
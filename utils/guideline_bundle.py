@@ -0,0 +1,130 @@
+# utils/guideline_bundle.py
+"""
+가이드라인 번들: policy_docs_new_after/<locale>/<category>.txt + 예외 문구를
+버전/해시/토큰 수가 포함된 JSON 1개로 컴파일.
+
+- 원본 txt는 수정하지 않음 (기존 exceptions.py처럼 실행할 때마다 append 되어 해시가 바뀌는 문제 방지)
+- 예외 문구([Exceptions])가 이미 들어 있는 파일은 그대로, 없는 파일만 메모리에서 덧붙임 → 몇 번 빌드해도 동일
+- 입력(원본 해시 + 예외 문구 + 버전)이 같으면 재빌드 생략
+"""
+from __future__ import annotations
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from utils.file_utils import GUIDELINE_DIR, GUIDELINE_BUNDLE
+from utils.token_utils import count_tokens
+
+BUNDLE_VERSION = 1
+CATEGORIES = ["currency", "date", "numeric", "time"]
+
+EXCEPTIONS_HEADER = "[Exceptions]"
+EXCEPTIONS_TEXT = """
+[Exceptions]
+
+- Do not apply the formatting rules to numbers that are part of:
+  - telephone numbers
+  - addresses
+  - identification codes
+  - or clearly unordered lists of numbers with no separators
+
+- If the numbers or formats (e.g., 10:00, 12/31, $15) appear to be part of such non-linguistic constructs based on the sentence context, do not apply localization guidelines.
+
+- Always consider the context of the original sentence before making changes.
+"""
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compile_text(raw: str) -> str:
+    """원본 가이드라인 + 예외 문구 (이미 있으면 원본 그대로)"""
+    if EXCEPTIONS_HEADER in raw:
+        return raw
+    return raw + "\n" + EXCEPTIONS_TEXT.strip() + "\n"
+
+def _read_sources(root: str) -> Dict[str, Dict[str, str]]:
+    """{"<locale>/<category>": {"path", "raw"}} (카테고리 txt만)"""
+    sources = {}
+    if not os.path.isdir(root):
+        return sources
+    for locale in sorted(os.listdir(root)):
+        locale_dir = os.path.join(root, locale)
+        if not os.path.isdir(locale_dir):
+            continue
+        for category in CATEGORIES:
+            path = os.path.join(locale_dir, f"{category}.txt")
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                sources[f"{locale}/{category}"] = {"path": path, "raw": f.read()}
+    return sources
+
+def _inputs_hash(sources: Dict[str, Dict[str, str]], model: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"v{BUNDLE_VERSION}|{model}|{_sha256(EXCEPTIONS_TEXT)}".encode("utf-8"))
+    for key in sorted(sources):
+        h.update(f"|{key}={_sha256(sources[key]['raw'])}".encode("utf-8"))
+    return h.hexdigest()
+
+def bundle_is_stale(bundle: Dict[str, Any], root: str = GUIDELINE_DIR) -> bool:
+    """번들을 만든 뒤 원본 txt(또는 예외 문구)가 바뀌었으면 True (기록된 inputs_hash와 현재 입력 비교)"""
+    return bundle.get("inputs_hash") != _inputs_hash(_read_sources(root), bundle.get("model", ""))
+
+def load_bundle(path: str = GUIDELINE_BUNDLE) -> Optional[Dict[str, Any]]:
+    """번들 1회 읽기 (없거나 버전이 다르면 None)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"가이드라인 번들 로드 실패: {path} ({e})")
+        return None
+    if bundle.get("version") != BUNDLE_VERSION:
+        return None
+    return bundle
+
+def build_bundle(
+    root: str = GUIDELINE_DIR,
+    path: str = GUIDELINE_BUNDLE,
+    model: str = "gpt-4o",
+    force: bool = False,
+) -> bool:
+    """
+    번들 빌드. 반환: 새로 썼으면 True, 입력이 같아 생략했으면 False.
+    """
+    sources = _read_sources(root)
+    inputs_hash = _inputs_hash(sources, model)
+
+    existing = load_bundle(path)
+    if not force and existing is not None and existing.get("inputs_hash") == inputs_hash:
+        print(f"⏭️  가이드라인 번들 최신 상태: {path} ({len(existing['entries'])}개)")
+        return False
+
+    entries = {}
+    for key, src in sources.items():
+        text = compile_text(src["raw"])
+        entries[key] = {
+            "text": text,
+            "sha256": _sha256(text),
+            "tokens": count_tokens(text, model),
+            "source": os.path.relpath(src["path"], root),
+            "source_sha256": _sha256(src["raw"]),
+        }
+
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "model": model,
+        "inputs_hash": inputs_hash,
+        "entries": entries,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)  # 로드 중인 프로세스가 반쯤 쓰인 파일을 읽지 않도록
+    print(f"📦 가이드라인 번들 생성: {path} ({len(entries)}개)")
+    return True
@@ -0,0 +1,172 @@
+# utils/guideline_store.py
+from __future__ import annotations
+import os
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+from utils.file_utils import GUIDELINE_DIR, GUIDELINE_BUNDLE
+from utils.token_utils import count_tokens
+from utils.guideline_bundle import bundle_is_stale, load_bundle
+
+class GuidelineEntry(NamedTuple):
+    text: str       # 가이드라인 원문 (가공 금지 — 접두사 캐시 안정성)
+    sha256: str     # 원문 해시 (접두사 캐시 키에 사용)
+    tokens: int     # 원문 토큰 수
+    mtime: float    # 로드 시점 파일(또는 번들) mtime (refresh 시 변경 감지)
+    path: str
+
+def _load_entry(path: str, mtime: float, model: str) -> GuidelineEntry:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return GuidelineEntry(
+        text=text,
+        sha256=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        tokens=count_tokens(text, model),
+        mtime=mtime,
+        path=path,
+    )
+
+class GuidelineStore:
+    """
+    가이드라인 전체를 시작 시 1회 로드해 메모리에 보관.
+    - 컴파일된 번들(build_guidelines.py)이 있으면 번들 1회 읽기, 없으면
+      policy_docs_new_after/<locale>/<category>.txt 전체 스캔
+    - get(): 순수 메모리 조회 (파일 시스템 접근 없음), 없는 (locale, category)도 캐시 → 경고는 1회만
+    - refresh(): mtime이 바뀐/새로 생긴 파일(번들 모드면 번들)만 다시 읽고 맵을 통째로 교체 (조회 중인 맵은 불변)
+    - 번들이 원본 txt보다 오래됐으면(inputs_hash 불일치) 경고 후 txt 직접 로드로 전환
+      (번들 모드에서도 refresh 때 txt mtime을 확인 → 원본을 고치면 txt 기준으로 전환)
+    """
+
+    def __init__(self, root: str = GUIDELINE_DIR, model: str = "gpt-4o", bundle_path: Optional[str] = GUIDELINE_BUNDLE):
+        self.root = root
+        self.model = model
+        self.bundle_path = bundle_path
+        self.source = "dir"
+        self._bundle_mtime: Optional[float] = None
+        self._source_mtimes: Dict[Tuple[str, str], float] = {}   # 번들 모드: 로드 시점 원본 txt mtime
+        self._entries: Mapping[Tuple[str, str], GuidelineEntry] = MappingProxyType({})
+        self._missing: set = set()
+        self._lock = threading.Lock()
+        self.preload()
+
+    def _bundle_entries(self) -> Optional[Dict[Tuple[str, str], GuidelineEntry]]:
+        """번들이 있으면 {(locale, category): entry} (토큰 수는 모델이 같을 때만 번들 값 사용)"""
+        if not self.bundle_path or not os.path.exists(self.bundle_path):
+            return None
+        mtime = os.path.getmtime(self.bundle_path)
+        source_mtimes = {key: m for key, (_, m) in self._scan().items()}
+        bundle = load_bundle(self.bundle_path)
+        if bundle is None:
+            return None
+        if bundle_is_stale(bundle, self.root):
+            print(f"⚠️  가이드라인 번들이 원본과 다릅니다: {self.bundle_path} "
+                  f"→ {self.root}의 txt를 직접 로드 (python build_guidelines.py로 재빌드)")
+            return None
+        same_model = bundle.get("model") == self.model
+        entries = {}
+        for key, e in bundle["entries"].items():
+            locale, category = key.split("/", 1)
+            entries[(locale, category)] = GuidelineEntry(
+                text=e["text"],
+                sha256=e["sha256"],
+                tokens=e["tokens"] if same_model else count_tokens(e["text"], self.model),
+                mtime=mtime,
+                path=self.bundle_path,
+            )
+        self._bundle_mtime = mtime
+        self._source_mtimes = source_mtimes
+        return entries
+
+    def _scan(self) -> Dict[Tuple[str, str], Tuple[str, float]]:
+        """{(locale, category): (path, mtime)}"""
+        found = {}
+        if not os.path.isdir(self.root):
+            print(f"가이드라인 폴더가 존재하지 않습니다: {self.root}")
+            return found
+        for locale in sorted(os.listdir(self.root)):
+            locale_dir = os.path.join(self.root, locale)
+            if not os.path.isdir(locale_dir):
+                continue
+            for name in sorted(os.listdir(locale_dir)):
+                if not name.endswith(".txt"):
+                    continue
+                path = os.path.join(locale_dir, name)
+                found[(locale, name[: -len(".txt")])] = (path, os.path.getmtime(path))
+        return found
+
+    def preload(self) -> None:
+        entries = self._bundle_entries()
+        self.source = "bundle" if entries is not None else "dir"
+        if entries is None:
+            entries = {
+                key: _load_entry(path, mtime, self.model)
+                for key, (path, mtime) in self._scan().items()
+            }
+        with self._lock:
+            self._entries = MappingProxyType(entries)
+            self._missing = set()
+
+    def refresh(self) -> int:
+        """mtime이 바뀐 항목만 다시 로드. 반환: 다시 읽은(번들 모드면 내용이 바뀐) 항목 수"""
+        current = self._entries
+        entries = {}
+        reloaded = 0
+        if self.source == "bundle":
+            bundle_mtime = os.path.getmtime(self.bundle_path) if os.path.exists(self.bundle_path) else None
+            source_mtimes = {key: m for key, (_, m) in self._scan().items()}
+            if bundle_mtime == self._bundle_mtime and source_mtimes == self._source_mtimes:
+                return 0
+            loaded = self._bundle_entries()
+            if loaded is not None:
+                for key, entry in loaded.items():
+                    old = current.get(key)
+                    if old is not None and old.sha256 == entry.sha256:
+                        entry = old
+                    else:
+                        reloaded += 1
+                    entries[key] = entry
+                with self._lock:
+                    self._entries = MappingProxyType(entries)
+                    self._missing = set()
+                return reloaded
+            # 번들이 없어졌거나 원본보다 오래됨 → 아래 txt 스캔으로 전환 (경로가 달라 전 항목 다시 로드)
+            self.source = "dir"
+
+        for key, (path, mtime) in self._scan().items():
+            entry = current.get(key)
+            if entry is None or entry.mtime != mtime or entry.path != path:
+                entry = _load_entry(path, mtime, self.model)
+                reloaded += 1
+            entries[key] = entry
+        if reloaded or len(entries) != len(current):
+            with self._lock:
+                self._entries = MappingProxyType(entries)
+                self._missing = set()  # 새로 생긴 파일이 있을 수 있으므로 부재 캐시 초기화
+        return reloaded
+
+    def get(self, locale: str, category: str) -> Optional[GuidelineEntry]:
+        key = (locale, category)
+        entry = self._entries.get(key)
+        if entry is None and key not in self._missing:
+            with self._lock:
+                if key not in self._missing:
+                    self._missing.add(key)
+                    print(f"가이드라인 파일이 존재하지 않습니다: {os.path.join(self.root, locale, category + '.txt')}")
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_store: Optional[GuidelineStore] = None
+_store_lock = threading.Lock()
+
+def get_guideline_store() -> GuidelineStore:
+    """프로세스 전역 가이드라인 스토어 (첫 호출 시 전체 preload)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = GuidelineStore()
+    return _store
@@ -0,0 +1,124 @@
+# utils/line_dedup.py
+from __future__ import annotations
+import copy
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+def usage_share(usage: Dict[str, int], n: int, j: int) -> Dict[str, int]:
+    """
+    usage를 n등분했을 때 j번째(0-base) 몫. 정수 유지, n개 몫의 합 = 원래 값.
+    """
+    return {
+        k: (v * (j + 1)) // n - (v * j) // n if isinstance(v, int) else v
+        for k, v in usage.items()
+    }
+
+class LineDedup:
+    """
+    실행(run) 전체에서 동일한 라인 키를 한 번만 검수하고 판정을 모든 등장 위치에 공유.
+    - register(key): 사전 스캔 단계에서 등장 횟수 집계
+    - resolve(key, compute) / pending + store + take: 검수 1회, 결과 재사용
+    - usage는 등장 횟수로 나눠 각 등장에 배분 (파일별 usage 합 = 실제 호출 usage 합)
+    - export(keys) / seed(records): 프로세스 풀 모드에서 부모가 먼저 검수한 키를 워커의 파일 dedup으로 전달
+      (이전 파일까지 배분된 몫 수도 함께 넘겨 파일별 usage가 직렬 실행과 같도록)
+    디스크 캐시(utils/llm_cache)와 별개인 프로세스 내 메모리 구조.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._taken: Counter = Counter()
+        self._results: Dict[Hashable, Tuple[Any, Dict[str, int]]] = {}
+        self._exported: Counter = Counter()   # 부모: 워커로 넘긴 등장 수 (키별 몫 번호 진행)
+        self._seeded: Counter = Counter()     # 워커: 넘겨받은 키의 시작 몫 번호 (통계에서 제외)
+        self._lock = threading.Lock()
+
+    def register(self, key: Hashable) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def pending(self, keys: List[Hashable]) -> List[Hashable]:
+        """아직 검수되지 않은 고유 키 (입력 순서 유지)"""
+        seen = set()
+        out = []
+        with self._lock:
+            for key in keys:
+                if key in self._results or key in seen:
+                    continue
+                seen.add(key)
+                out.append(key)
+        return out
+
+    def store(self, key: Hashable, verdict: Any, usage: Dict[str, int]) -> None:
+        with self._lock:
+            self._results.setdefault(key, (verdict, dict(usage)))
+
+    def take(self, key: Hashable) -> Tuple[Any, Dict[str, int]]:
+        """
+        판정 사본 + 이번 등장분 usage 몫.
+        사전 스캔보다 더 많이 등장하면 (이미 전액 배분됐으므로) 초과분 usage는 0.
+        """
+        with self._lock:
+            verdict, usage = self._results[key]
+            n = max(self._counts[key], 1)
+            j = self._taken[key]
+            self._taken[key] += 1
+        if j >= n:
+            share = {k: 0 if isinstance(v, int) else v for k, v in usage.items()}
+        else:
+            share = usage_share(usage, n, j)
+        return copy.deepcopy(verdict), share
+
+    def resolve(self, key: Hashable, compute: Callable[[], Tuple[Any, Dict[str, int]]]) -> Tuple[Any, Dict[str, int]]:
+        """처음 보는 키면 compute() → (verdict, usage)로 검수 후 저장, 이후엔 저장된 판정 재사용."""
+        if self.pending([key]):
+            verdict, usage = compute()
+            self.store(key, verdict, usage)
+        return self.take(key)
+
+    def export(self, keys: List[Hashable]) -> List[Tuple[Hashable, Any, Dict[str, int], int, int]]:
+        """
+        keys(파일 1개의 등장 목록) 중 이미 검수된 키를
+        (key, verdict, usage, 전체 등장 수, 앞 파일들에 배분된 몫 수)로 내보내고 이 파일 등장분만큼 몫 번호를 진행.
+        파일 순서대로 호출해야 직렬 실행과 같은 몫을 받음.
+        """
+        occurrences = Counter(keys)
+        records = []
+        with self._lock:
+            for key, n in occurrences.items():
+                if key not in self._results:
+                    continue
+                verdict, usage = self._results[key]
+                records.append((key, verdict, usage, self._counts[key], self._exported[key]))
+                self._exported[key] += n
+        return records
+
+    def seed(self, records: List[Tuple[Hashable, Any, Dict[str, int], int, int]]) -> None:
+        """export() 결과를 검수 완료로 등록 (register() 뒤에 호출: 등장 수는 실행 전체 기준으로 덮어씀)"""
+        with self._lock:
+            for key, verdict, usage, count, taken in records:
+                self._results[key] = (verdict, dict(usage))
+                self._counts[key] = count
+                self._taken[key] = taken
+                self._seeded[key] = taken
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            occurrences = sum(self._taken.values()) - sum(self._seeded.values())
+            unique = len(self._results) - len(self._seeded)
+        return {
+            "registered_occurrences": sum(self._counts[key] for key in self._counts if key not in self._seeded),
+            "occurrences": occurrences,
+            "unique_checked": unique,
+            "reused": max(occurrences - unique, 0),
+        }
+
+def cross_file_keys(file_keys: List[List[Hashable]]) -> List[Hashable]:
+    """두 개 이상의 파일에 등장하는 키 (첫 등장 순서). 프로세스 풀 모드에서 파일 처리 전에 한 번만 검수할 대상"""
+    files_seen: Counter = Counter()
+    order: Dict[Hashable, None] = {}
+    for keys in file_keys:
+        for key in dict.fromkeys(keys):
+            files_seen[key] += 1
+            order.setdefault(key, None)
+    return [key for key in order if files_seen[key] > 1]
@@ -0,0 +1,307 @@
+# utils/llm_backends.py
+"""
+ChatClient 전송 계층 교체용 백엔드 (네트워크/비용 없이 재현 가능한 벤치마크용).
+
+LLM_BACKEND 환경 변수로 선택:
+- "http"      : 실제 API (기본값)
+- "record"    : 실제 API 호출 + 요청→응답/usage/지연을 카세트(JSONL)에 기록
+- "replay"    : 카세트에서 응답 재생 (없는 요청은 LLM_REPLAY_MISS: "synthetic" | "error")
+- "synthetic" : 프롬프트의 출력 형식 블록을 읽어 스키마에 맞는 JSON/문장을 생성
+
+replay/synthetic은 합성 지연과 429 주입을 지원하고, ChatClient 안쪽(전송 계층)에서 동작하므로
+RPM/TPM 버킷, 재시도, AIMD 동시성 제어, 응답 캐시, Batch 모드는 실제와 똑같이 거침.
+무작위 요소(지연 jitter, 429, 이슈 판정)는 요청 키 해시로 정해져 스레드 순서와 무관하게 재현됨.
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.llm_cache import make_cache_key
+from utils.llm_client import LLMError
+from utils.token_utils import count_tokens, count_message_tokens
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "http")
+LLM_CASSETTE = os.getenv("LLM_CASSETTE", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".llm_cache", "cassette.jsonl",
+))
+LLM_REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "synthetic")
+
+# 합성 지연: base + 출력 토큰당 지연, ±jitter 비율 (replay는 미설정 시 기록된 지연 그대로)
+LLM_FAKE_LATENCY_MS = os.getenv("LLM_FAKE_LATENCY_MS")
+LLM_FAKE_MS_PER_TOKEN = float(os.getenv("LLM_FAKE_MS_PER_TOKEN", "10"))
+LLM_FAKE_JITTER = float(os.getenv("LLM_FAKE_JITTER", "0.3"))
+# 429 주입 비율 / Retry-After
+LLM_FAULT_429_RATE = float(os.getenv("LLM_FAULT_429_RATE", "0"))
+LLM_FAULT_RETRY_AFTER_MS = float(os.getenv("LLM_FAULT_RETRY_AFTER_MS", "1000"))
+# synthetic: true|false 판정 필드를 true로 내는 비율
+LLM_FAKE_ISSUE_RATE = float(os.getenv("LLM_FAKE_ISSUE_RATE", "0.1"))
+LLM_FAKE_SEED = os.getenv("LLM_FAKE_SEED", "0")
+
+# synthetic prompt caching 흉내: 같은 system 접두사가 TTL 안에 다시 오면 128토큰 단위로 cached 처리
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_TTL_SECONDS = 300
+
+SYNTHETIC_DEFAULT_LATENCY_MS = 400
+
+Transport = Callable[[Dict[str, Any]], Tuple[str, Dict[str, Any]]]
+
+def _unit(*parts: Any) -> float:
+    """시드 + parts 해시 → [0, 1) (재현 가능한 난수)"""
+    h = hashlib.sha256("|".join([LLM_FAKE_SEED, *map(str, parts)]).encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "big") / 2 ** 64
+
+def _payload_key(payload: Dict[str, Any]) -> str:
+    return make_cache_key(payload["model"], payload.get("temperature", 0.0), payload["messages"])
+
+class FaultInjector:
+    """요청 키 + 시도 횟수 기준으로 429 주입, 합성 지연 계산"""
+
+    def __init__(
+        self,
+        rate_429: float = LLM_FAULT_429_RATE,
+        retry_after_ms: float = LLM_FAULT_RETRY_AFTER_MS,
+        latency_ms: Optional[float] = None,
+        ms_per_token: float = LLM_FAKE_MS_PER_TOKEN,
+        jitter: float = LLM_FAKE_JITTER,
+    ):
+        self.rate_429 = rate_429
+        self.retry_after_ms = retry_after_ms
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.jitter = jitter
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def maybe_429(self, key: str) -> None:
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        if self.rate_429 > 0 and _unit("429", key, attempt) < self.rate_429:
+            raise LLMError(
+                "HTTP 429: injected rate limit", status=429, retryable=True,
+                retry_after=self.retry_after_ms / 1000.0,
+            )
+
+    def sleep(self, key: str, completion_tokens: int, recorded_ms: Optional[float] = None) -> None:
+        if self.latency_ms is not None:
+            base = self.latency_ms + completion_tokens * self.ms_per_token
+        elif recorded_ms is not None:
+            base = recorded_ms
+        else:
+            base = SYNTHETIC_DEFAULT_LATENCY_MS + completion_tokens * self.ms_per_token
+        factor = 1 + self.jitter * (2 * _unit("latency", key) - 1)
+        time.sleep(max(0.0, base * factor) / 1000.0)
+
+# =========================
+# synthetic 응답 생성
+# =========================
+_FIELD_RE = re.compile(r'^\s*"(\w+)":\s*(.+?),?\s*$')
+
+def _template_fields(system: str) -> List[Tuple[str, str]]:
+    """ "Return strictly ... format:" 뒤의 {...} 블록 → [(필드명, 값 표기)] """
+    start = system.find("{", system.find("Return strictly"))
+    end = system.find("}", start)
+    if start < 0 or end < 0:
+        return []
+    fields = []
+    for line in system[start + 1:end].splitlines():
+        m = _FIELD_RE.match(line)
+        if m:
+            fields.append((m.group(1), m.group(2)))
+    return fields
+
+def _fill(fields: List[Tuple[str, str]], seed: str, translation: str, item_id: Optional[int] = None) -> dict:
+    flags = [name for name, spec in fields if spec == "true|false"]
+    issue = {name: _unit("issue", seed, name) < LLM_FAKE_ISSUE_RATE for name in flags}
+    any_issue = any(issue.values())
+
+    def flagged(name: str) -> bool:
+        # emoji_reasons → emoji_issue, faithfulness_type → faithfulness_issue (접두사 없으면 전체)
+        prefix = name.split("_", 1)[0] if "_" in name else ""
+        related = [f for f in flags if prefix and f.startswith(prefix)]
+        return any(issue[f] for f in related) if related else any_issue
+
+    out = {}
+    for name, spec in fields:
+        if name == "id":
+            out[name] = item_id
+        elif spec == "true|false":
+            out[name] = issue[name]
+        elif spec.startswith("["):
+            if name == "suggestions":
+                out[name] = [translation] if any_issue else []
+            elif name.endswith("reasons") and flagged(name):
+                out[name] = ["synthetic issue"]
+            else:
+                out[name] = []
+        elif "|" in spec:
+            options = [o.strip().strip('"') for o in spec.split("|")]
+            out[name] = options[1 if flagged(name) and len(options) > 1 else 0]
+        else:
+            out[name] = None
+    return out
+
+def _between(text: str, start: str, end: str) -> str:
+    i = text.find(start)
+    if i < 0:
+        return ""
+    i += len(start)
+    j = text.find(end, i)
+    return text[i:j if j >= 0 else None].strip()
+
+def synthetic_reply(messages: List[dict]) -> str:
+    """
+    프롬프트 자체의 출력 형식 설명을 읽어 스키마에 맞는 응답 생성:
+    - "Return strictly ... {...}"        → 필드별 기본값 JSON (true|false는 LLM_FAKE_ISSUE_RATE 비율로 true)
+    - "... JSON array ... one object per item" → 사용자 메시지의 [n] 항목 수만큼 + "id"
+    - "JSON list of strings"             → 유효 카테고리 중 하나 (숫자가 있으면 numeric) 또는 []
+    - "Return only the revised sentence" → 번역문 그대로
+    """
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = messages[-1].get("content", "") if messages else ""
+
+    if "JSON array" in system and "one object per item" in system:
+        fields = _template_fields(system)
+        items = re.split(r"\n\n(?=\[\d+\]\n)", _between(user, "Items:\n\n", "\n\nEvaluate every item"))
+        out = []
+        for block in items:
+            m = re.match(r"\[(\d+)\]\nSource:\n.*?\nTranslation:\n(.*)", block, re.S)
+            if m:
+                out.append(_fill(fields, block, m.group(2).strip(), int(m.group(1))))
+        return json.dumps(out, ensure_ascii=False)
+
+    if "Return strictly" in system:
+        translation = _between(user, "Translation:\n", "\n\nEvaluate")
+        return json.dumps(_fill(_template_fields(system), user, translation), ensure_ascii=False)
+
+    if "JSON list of strings" in system:
+        valid = [c.strip() for c in _between(system, "The only valid categories are:", ".\n").split(",") if c.strip()]
+        sentence = _between(user, "Translated sentence:", "\n\n")
+        if any(ch.isdigit() for ch in sentence) and "numeric" in valid:
+            return json.dumps(["numeric"])
+        return "[]"
+
+    if "Return only the revised sentence" in system:
+        return _between(user, "Translated sentence:\n", "\n\nRevised translation:")
+
+    return "{}"
+
+class SyntheticTransport:
+    """스키마 기반 합성 응답 + 합성 지연/429 + prompt caching 흉내 (usage는 토큰 카운터 기준)"""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        latency = float(LLM_FAKE_LATENCY_MS) if LLM_FAKE_LATENCY_MS else None
+        self.faults = faults or FaultInjector(latency_ms=latency)
+        self._prefix_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _cached_tokens(self, messages: List[dict], model: str) -> int:
+        system = messages[0].get("content", "") if messages and messages[0].get("role") == "system" else ""
+        tokens = count_tokens(system, model)
+        if tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            last = self._prefix_seen.get(key)
+            self._prefix_seen[key] = now
+        if last is None or now - last > PREFIX_CACHE_TTL_SECONDS:
+            return 0
+        return tokens // 128 * 128
+
+    def __call__(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        key = _payload_key(payload)
+        self.faults.maybe_429(key)
+        messages, model = payload["messages"], payload["model"]
+        reply = synthetic_reply(messages)
+        prompt_tokens = count_message_tokens(messages, model)
+        completion_tokens = count_tokens(reply, model)
+        self.faults.sleep(key, completion_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": self._cached_tokens(messages, model)},
+        }
+        return reply, usage
+
+# =========================
+# 카세트 기록/재생
+# =========================
+class RecordingTransport:
+    """실제 전송을 감싸 성공한 요청마다 카세트에 1줄 추가 (키 = 응답 캐시 키)"""
+
+    def __init__(self, inner: Transport, path: str = LLM_CASSETTE):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        started = time.monotonic()
+        reply, usage = self.inner(payload)
+        record = {
+            "key": _payload_key(payload),
+            "model": payload["model"],
+            "temperature": payload.get("temperature", 0.0),
+            "messages": payload["messages"],
+            "reply": reply,
+            "usage": usage,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return reply, usage
+
+class ReplayTransport:
+    """카세트 응답 재생 (같은 키가 여러 번 기록됐으면 마지막 기록). 없는 요청은 on_miss"""
+
+    def __init__(self, path: str = LLM_CASSETTE, on_miss: str = LLM_REPLAY_MISS, faults: Optional[FaultInjector] = None):
+        latency = float(LLM_FAKE_LATENCY_MS) if LLM_FAKE_LATENCY_MS else None
+        self.faults = faults or FaultInjector(latency_ms=latency)
+        self.on_miss = on_miss
+        self.synthetic = SyntheticTransport(self.faults) if on_miss == "synthetic" else None
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self._entries[rec["key"]] = rec
+        else:
+            print(f"카세트 파일이 존재하지 않습니다: {path}")
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        key = _payload_key(payload)
+        rec = self._entries.get(key)
+        if rec is None:
+            self.misses += 1
+            if self.synthetic is None:
+                raise LLMError(f"카세트에 없는 요청: {key[:12]}", status=404, retryable=False)
+            return self.synthetic(payload)
+        self.hits += 1
+        self.faults.maybe_429(key)
+        usage = dict(rec["usage"])
+        self.faults.sleep(key, int(usage.get("completion_tokens", 0) or 0), rec.get("latency_ms"))
+        return rec["reply"], usage
+
+def make_transport(name: str, http: Transport) -> Transport:
+    """LLM_BACKEND 이름 → 전송 함수 (http = ChatClient의 실제 POST)"""
+    if name == "http":
+        return http
+    if name == "record":
+        return RecordingTransport(http)
+    if name == "replay":
+        return ReplayTransport()
+    if name == "synthetic":
+        return SyntheticTransport()
+    raise ValueError(f"알 수 없는 LLM_BACKEND: {name}")
@@ -0,0 +1,161 @@
+# utils/llm_cache.py
+from __future__ import annotations
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Tuple, Dict, Any, List
+
+# 기본 저장 위치: <repo>/.llm_cache/responses.sqlite3
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ".llm_cache",
+    "responses.sqlite3",
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 용량 초과 시 이 비율까지 줄임 (매 put마다 evict가 돌지 않도록 여유 확보)
+_EVICT_TARGET_RATIO = 0.9
+# 용량은 메모리 누적값으로 판단, 이 횟수의 put마다 DB 합계로 다시 맞춤 (다른 프로세스의 기록 반영)
+_RESYNC_EVERY_PUTS = 256
+# hit의 last_access 갱신은 hit마다 commit하지 않고 모아 두었다가 이 개수마다 한 번에 반영
+# (LRU 제거 직전 / stats / close 때도 반영)
+_ACCESS_FLUSH_EVERY = 256
+
+def make_cache_key(model: str, temperature: float, messages: List[Dict[str, Any]]) -> str:
+    """model/temperature/messages(원문 그대로)를 직렬화해 sha256. 1바이트라도 다르면 다른 키."""
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    디스크(SQLite) 기반 LLM 응답 캐시.
+    - key: make_cache_key(model, temperature, messages)
+    - value: 응답 원문 + 최초 호출 시점의 usage
+    - max_bytes 초과 시 last_access 기준 LRU 제거 (전체 크기는 오픈 시 1회 합산 후 put/evict마다 누적 갱신)
+    - get(hit)은 읽기만 하고 last_access는 메모리에 모아 일괄 UPDATE (hit마다 쓰기 트랜잭션 없음)
+    여러 스레드/프로세스에서 같은 파일을 열어도 되도록 WAL 모드 사용.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " reply TEXT NOT NULL,"
+            " usage TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._query_total_bytes()
+        self._puts_since_sync = 0
+        self._pending_access: Dict[str, float] = {}   # key → 마지막 hit 시각 (아직 DB 미반영)
+
+    def _query_total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reply, usage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._pending_access[key] = time.time()
+            if len(self._pending_access) >= _ACCESS_FLUSH_EVERY:
+                self._flush_access()
+            self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def _flush_access(self) -> None:
+        """모아 둔 last_access를 한 트랜잭션으로 반영 (lock 보유 상태에서 호출)"""
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE responses SET last_access = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._pending_access.items()],
+        )
+        self._conn.commit()
+        self._pending_access.clear()
+
+    def put(self, key: str, reply: str, usage: Dict[str, Any]) -> None:
+        usage_json = json.dumps(usage, ensure_ascii=False)
+        size = len(key) + len(reply.encode("utf-8")) + len(usage_json.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, reply, usage, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, reply, usage_json, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._puts_since_sync += 1
+            if self._puts_since_sync >= _RESYNC_EVERY_PUTS:
+                self._total_bytes = self._query_total_bytes()
+                self._puts_since_sync = 0
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def _evict_if_needed(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        # 제거 전 실제 합계로 확인 (다른 프로세스가 이미 줄였을 수 있음)
+        total = self._total_bytes = self._query_total_bytes()
+        self._puts_since_sync = 0
+        if total <= self.max_bytes:
+            return
+        self._flush_access()  # 최근 hit이 LRU 순서에 반영되도록
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC")
+        doomed = []
+        for key, size in cursor:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._total_bytes = total
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._flush_access()
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": total,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.close()
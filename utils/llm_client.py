@@ -0,0 +1,370 @@
+# utils/llm_client.py
+"""
+OpenAI Chat Completions REST 클라이언트 (연결 풀 + RPM/TPM 토큰 버킷 + 재시도).
+
+- requests.Session + HTTPAdapter로 keep-alive 연결 재사용 (스레드 간 공유)
+- 요청 전 예상 토큰(입력 + 예상 출력)만큼 RPM/TPM 버킷에서 차감, 응답 후 실제 usage로 보정
+- 429 / 5xx / 타임아웃 / 연결 오류는 지수 백오프(+jitter)로 재시도, Retry-After 헤더 우선
+- 동시 호출 수는 AIMD 제어기(utils/concurrency)가 429·지연에 맞춰 조절
+- hedge(LLM_HEDGE=1): 최근 p95 지연을 넘긴 호출에 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+  · 진 쪽은 HTTP 요청 자체를 끊을 수 없으므로(requests) 결과만 버림 → 과금은 된다고 보고 usage에 2회분 기록
+  · 실행 전체 hedge 비율은 LLM_HEDGE_MAX_RATE(전체 호출 대비)로 제한
+- base_url을 바꾸면 로컬 스텁 서버로도 테스트 가능 (OPENAI_BASE_URL)
+- 전송 계층(transport)은 교체 가능: 기록/재생/합성 백엔드는 utils/llm_backends (LLM_BACKEND)
+"""
+from __future__ import annotations
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.token_utils import count_message_tokens
+from utils.concurrency import AdaptiveLimiter
+from utils.metrics import inc
+from utils.tracing import add_time, annotate, timed
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_RPM = int(os.getenv("LLM_RPM", "500"))
+LLM_TPM = int(os.getenv("LLM_TPM", "300000"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))  # AIMD 최대 동시 호출 수(LLM_CONCURRENCY_MAX) 이상 권장
+
+# hedge: 기본 꺼짐. 켜면 p95 지연을 넘긴 호출만, 전체 호출의 LLM_HEDGE_MAX_RATE 이하로 복제 전송
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+HEDGE_LATENCY_WINDOW = 200   # p95 계산에 쓰는 최근 정상 응답 수
+HEDGE_MIN_SAMPLES = 20       # 표본이 이보다 적으면 hedge 안 함
+HEDGE_MIN_DELAY = 0.5        # p95가 아무리 짧아도 이 시간(초)은 기다린 뒤 복제
+
+# TPM 차감용 예상 출력 토큰 (응답 후 실제 값으로 보정)
+EXPECTED_OUTPUT_TOKENS = 256
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# 요청 자체가 잘못된 경우 (URL/스킴/헤더 설정 오류, 리다이렉트 루프) → 다시 보내도 같은 결과
+_NON_RETRYABLE_REQUEST_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.TooManyRedirects,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidHeader,
+    requests.exceptions.URLRequired,
+    requests.exceptions.InvalidJSONError,
+)
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 30.0
+
+class LLMError(Exception):
+    """재시도 후에도 실패한 호출 (status: HTTP 상태, 네트워크 오류면 None)"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    분당 한도(capacity/min)를 연속 보충하는 토큰 버킷. acquire(n)은 n만큼 쌓일 때까지 대기.
+    n이 capacity보다 크면 capacity만큼만 기다림 (큰 요청이 영원히 막히지 않도록).
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, n: float) -> float:
+        """n 차감 (부족하면 대기). 반환: 대기한 초"""
+        n = min(float(n), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return waited
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def adjust(self, delta: float) -> None:
+        """예상치와 실제 사용량 차이 보정 (양수 = 추가 차감, 음수 = 환급)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = resp.headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+def _bill_hedged(usage: Dict[str, Any], copies: int) -> Dict[str, Any]:
+    """
+    hedge된 호출의 usage: 응답은 하나지만 끊지 못한 요청도 과금되므로 토큰을 copies배로 기록.
+    진 쪽 usage는 받지 않고 버리므로 같은 프롬프트인 이긴 쪽 usage로 추정 (hedge.billed_estimate)
+    """
+    billed = dict(usage)
+    for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        if key in usage:
+            billed[key] = int(usage.get(key) or 0) * copies
+    details = usage.get("prompt_tokens_details") or {}
+    if details:
+        billed["prompt_tokens_details"] = dict(details, cached_tokens=int(details.get("cached_tokens", 0) or 0) * copies)
+    billed["hedge"] = {"attempts": 2, "billed_copies": copies, "billed_estimate": copies > 1}
+    return billed
+
+class ChatClient:
+    """Chat Completions 호출 1회 = chat(messages, model, temperature) → (reply 원문, usage dict)"""
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        api_key: Optional[str] = None,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        pool_size: int = LLM_POOL_SIZE,
+        transport: Optional[Callable[[Dict[str, Any]], Tuple[str, Dict[str, Any]]]] = None,
+        hedge: bool = LLM_HEDGE,
+        hedge_max_rate: float = LLM_HEDGE_MAX_RATE,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests_bucket = TokenBucket(rpm)
+        self.tokens_bucket = TokenBucket(tpm)
+        self.limiter = AdaptiveLimiter()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # payload → (reply, usage), 실패 시 LLMError. 기본은 실제 HTTP POST
+        self.transport = transport or self._post_once
+
+        # hedge용: 최근 정상 응답 지연(초)과 복제 전송 스레드 (꺼져 있으면 만들지 않음)
+        self.hedge_max_rate = hedge_max_rate
+        self._latencies: deque = deque(maxlen=HEDGE_LATENCY_WINDOW)
+        self._hedge_pool = (
+            ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix="llm-hedge") if hedge else None
+        )
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "retries": 0, "failures": 0, "rate_limited": 0, "throttle_wait_s": 0.0,
+            "hedges": 0, "hedge_wins": 0, "hedge_billed_tokens": 0,
+        }
+
+    def _bump(self, key: str, n: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttle_wait_s"] = round(stats["throttle_wait_s"], 3)
+        stats["concurrency"] = self.limiter.stats()
+        threshold = self._hedge_threshold()
+        stats["hedge"] = {
+            "enabled": self._hedge_pool is not None,
+            "max_rate": self.hedge_max_rate,
+            "rate": round(stats["hedges"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            "threshold_ms": round(threshold * 1000, 1) if threshold is not None else None,
+        }
+        return stats
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return retry_after
+        # full jitter: 0 ~ min(cap, base * 2^attempt)
+        return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * (2 ** attempt)))
+
+    def _post_once(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/chat/completions", json=payload, headers=headers, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            # 타임아웃 / 연결 끊김 / 본문 디코딩·청크 오류 등 전송 오류는 재시도, 설정 오류는 즉시 실패
+            retryable = not isinstance(e, _NON_RETRYABLE_REQUEST_ERRORS)
+            raise LLMError(f"{type(e).__name__}: {e}", retryable=retryable)
+
+        if resp.status_code != 200:
+            retryable = resp.status_code in _RETRYABLE_STATUS
+            raise LLMError(
+                f"HTTP {resp.status_code}: {resp.text[:200]}",
+                status=resp.status_code, retryable=retryable, retry_after=_retry_after(resp),
+            )
+        try:
+            body = resp.json()
+            reply = body["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"잘못된 응답 형식: {e}", status=resp.status_code, retryable=True)
+        return (reply or "").strip(), dict(body.get("usage") or {})
+
+    def _attempt(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """전송 1회 (AIMD slot 1개 점유). 정상 응답 지연은 hedge 기준(p95)에 반영"""
+        t0 = time.monotonic()
+        with self.limiter.slot() as slot:
+            add_time("wait", slot.started - t0)  # 동시 호출 한도 대기
+            try:
+                with timed("net"):
+                    reply, usage = self.transport(payload)
+            except LLMError as e:
+                if e.status == 429:
+                    self._bump("rate_limited")
+                if e.status == 429 or e.retry_after is not None:
+                    slot.record("rate_limited", e.retry_after)
+                elif e.retryable:
+                    slot.record("error")  # 5xx / 타임아웃 → 과부하 신호
+                raise
+            slot.record("ok")
+            latency = time.monotonic() - slot.started
+        with self._lock:
+            self._latencies.append(latency)
+        return reply, usage
+
+    def _hedge_threshold(self) -> Optional[float]:
+        """최근 정상 응답 p95(초). 표본이 부족하면 None"""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return max(HEDGE_MIN_DELAY, ordered[int(0.95 * (len(ordered) - 1))])
+
+    def _take_hedge_budget(self) -> bool:
+        """실행 전체 hedge 비율 상한 안이면 1건 차감"""
+        with self._lock:
+            if self._stats["hedges"] + 1 > self.hedge_max_rate * self._stats["calls"]:
+                return False
+            self._stats["hedges"] += 1
+            return True
+
+    def _send(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """hedge가 켜져 있으면 p95까지 기다려 보고 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용"""
+        threshold = self._hedge_threshold() if self._hedge_pool is not None else None
+        if threshold is None:
+            return self._attempt(payload)
+
+        # 추적 컨텍스트(현재 span)를 전송 스레드로 전달
+        primary = self._hedge_pool.submit(contextvars.copy_context().run, self._attempt, payload)
+        try:
+            return primary.result(timeout=threshold)  # 기준 안에 끝나면(실패 포함) 그대로
+        except FutureTimeout:
+            pass
+        if not self._take_hedge_budget():
+            return primary.result()
+        inc("llm_hedges_total", model=payload["model"])
+
+        waited = self.requests_bucket.acquire(1)
+        self._bump("throttle_wait_s", waited)
+        add_time("wait", waited)
+        backup = self._hedge_pool.submit(contextvars.copy_context().run, self._attempt, payload)
+        pending = {primary, backup}
+        error: Optional[LLMError] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    reply, usage = fut.result()
+                except LLMError as e:
+                    error = error or e  # 다른 쪽 응답을 계속 기다림
+                    continue
+                # 아직 전송 전이면 취소, 이미 전송 중이면 결과만 버림(과금됨). 이미 실패한 쪽은 과금 없음
+                copies = 1 + sum(1 for other in pending if not other.cancel())
+                if fut is backup:
+                    self._bump("hedge_wins")
+                billed = _bill_hedged(usage, copies)
+                self._bump("hedge_billed_tokens", int(billed.get("total_tokens", 0) or 0) - int(usage.get("total_tokens", 0) or 0))
+                return reply, billed
+        raise error
+
+    def chat(self, messages: List[dict], model: str = "gpt-4o", temperature: float = 0.0) -> Tuple[str, Dict[str, Any]]:
+        """재시도 포함 호출. 최종 실패 시 LLMError"""
+        estimated = count_message_tokens(messages, model) + EXPECTED_OUTPUT_TOKENS
+        payload = {"model": model, "messages": messages, "temperature": temperature}
+
+        attempt = 0
+        while True:
+            waited = self.requests_bucket.acquire(1) + self.tokens_bucket.acquire(estimated)
+            self._bump("throttle_wait_s", waited)
+            add_time("wait", waited)
+            self._bump("calls")
+            try:
+                reply, usage = self._send(payload)
+            except LLMError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    self._bump("failures")
+                    annotate(attempts=attempt + 1, error_status=e.status)
+                    raise
+                delay = self._backoff(attempt, e.retry_after)
+                print(f"LLM 호출 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}s 후): {e}")
+                self._bump("retries")
+                inc("llm_retries_total", model=model, status=str(e.status or "none"))
+                attempt += 1
+                with timed("wait"):
+                    time.sleep(delay)
+                continue
+
+            actual = usage.get("total_tokens")
+            if actual is not None:
+                # hedge로 2회분이 과금됐으면 TPM도 2회분 차감
+                self.tokens_bucket.adjust(actual - estimated)
+            annotate(attempts=attempt + 1)
+            return reply, usage
+
+_client: Optional[ChatClient] = None
+_client_lock = threading.Lock()
+
+def get_chat_client() -> ChatClient:
+    """프로세스 전역 클라이언트 (연결 풀/버킷 공유)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # llm_backends가 LLMError를 쓰므로 순환 import를 피해 여기서 로드
+                from utils.llm_backends import LLM_BACKEND, make_transport
+                client = ChatClient()
+                client.transport = make_transport(LLM_BACKEND, client._post_once)
+                _client = client
+    return _client
+
+def chat_client_stats() -> Optional[Dict[str, Any]]:
+    """run summary용 클라이언트 통계 (이 프로세스에서 호출이 한 번도 없었으면 None)"""
+    if _client is None:
+        return None
+    stats = _client.stats()
+    stats["pid"] = os.getpid()
+    return stats
@@ -0,0 +1,219 @@
+# utils/metrics.py
+"""
+실행 계측 (카운터 / 히스토그램) → Prometheus 텍스트 포맷.
+
+- 라벨(pipeline / stage / category / locale)은 contextvar로 전달: with metric_labels(stage="missing"): ask_gpt(...)
+  스레드 풀로 넘기는 작업은 in_context(fn)으로 감싸야 라벨이 따라감 (PrefixScheduler는 submit 시점 컨텍스트 사용)
+- LLM 호출 계측은 ask_gpt / ChatClient가 현재 라벨 + model로 기록 (호출부는 라벨만 설정)
+- 프로세스 풀: 워커는 snapshot()을 결과에 담아 보내고 부모가 absorb() → render()는 자기 것 + 워커 최신 스냅샷 합산
+- 노출: write_metrics(path) 파일 덤프(원자적 교체) 또는 serve_metrics(port) → http://127.0.0.1:port/metrics
+"""
+from __future__ import annotations
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 라벨 이름 (값이 없으면 "")
+CONTEXT_LABELS = ("pipeline", "stage", "category", "locale")
+
+# 초 단위 지연 히스토그램 버킷 (LLM 호출 ~ 파일 처리)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name → (type, help)
+METRICS = {
+    "llm_requests_total": ("counter", "ask_gpt 호출 수 (outcome: ok / error / cache_hit / batch / batch_pending)"),
+    "llm_request_seconds": ("histogram", "실제 API 호출 지연 (재시도·대기 포함)"),
+    "llm_tokens_total": ("counter", "과금 토큰 (kind: cached_prompt / non_cached_prompt / completion)"),
+    "llm_retries_total": ("counter", "ChatClient 재시도 수 (status: HTTP 상태, 네트워크 오류면 none)"),
+    "llm_errors_total": ("counter", "재시도 후 최종 실패 수"),
+    "llm_hedges_total": ("counter", "hedge(복제 전송) 수"),
+    "pipeline_file_seconds": ("histogram", "파일 1개 처리 시간"),
+    "pipeline_lines_total": ("counter", "처리한 줄 수 (빈 줄 제외)"),
+    "pipeline_cost_usd_total": ("counter", "파일 usage 기준 요금(USD)"),
+}
+
+_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("metric_labels", default={})
+
+@contextmanager
+def metric_labels(**labels: str) -> Iterator[None]:
+    """with 블록 안의 계측에 라벨 추가 (바깥 라벨 위에 덮어씀)"""
+    token = _labels.set({**_labels.get(), **{k: str(v) for k, v in labels.items()}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+def set_metric_labels(**labels: str) -> None:
+    """현재 컨텍스트 라벨 갱신 (다음 set까지 유지). 파일 처리 시작처럼 with로 감싸기 어려운 곳용"""
+    _labels.set({**_labels.get(), **{k: str(v) for k, v in labels.items()}})
+
+def current_labels() -> Dict[str, str]:
+    labels = _labels.get()
+    return {k: labels.get(k, "") for k in CONTEXT_LABELS}
+
+def in_context(fn: Callable) -> Callable:
+    """현재 라벨 컨텍스트를 잡아 두고 다른 스레드에서 그 컨텍스트로 fn 실행 (호출마다 복사본 사용)"""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class MetricsRegistry:
+    """프로세스 전역 계측 저장소. 값은 {(name, labels): float | histogram dict}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, Dict[str, Any]] = {}
+        self._workers: Dict[int, Dict[str, Any]] = {}   # pid → 워커 최신 스냅샷
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> _Key:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = self._key(name, {**current_labels(), **labels})
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, {**current_labels(), **labels})
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    h["buckets"][i] += 1
+            h["count"] += 1
+            h["sum"] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """프로세스 간 전달용 (pickle 가능한 일반 자료형, 누적값)"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": [[name, list(labels), v] for (name, labels), v in self._counters.items()],
+                "histograms": [
+                    [name, list(labels), {"buckets": list(h["buckets"]), "count": h["count"], "sum": h["sum"]}]
+                    for (name, labels), h in self._histograms.items()
+                ],
+            }
+
+    def absorb(self, snapshot: Optional[Dict[str, Any]]) -> None:
+        """워커 스냅샷 반영 (같은 pid는 최신 것으로 교체, 자기 프로세스 스냅샷은 무시)"""
+        if not snapshot or snapshot.get("pid") == os.getpid():
+            return
+        with self._lock:
+            self._workers[snapshot["pid"]] = snapshot
+
+    def merged(self) -> Tuple[Dict[_Key, float], Dict[_Key, Dict[str, Any]]]:
+        snapshots = [self.snapshot()]
+        with self._lock:
+            snapshots.extend(self._workers.values())
+        counters: Dict[_Key, float] = {}
+        histograms: Dict[_Key, Dict[str, Any]] = {}
+        for snap in snapshots:
+            for name, labels, v in snap["counters"]:
+                key = (name, tuple(tuple(kv) for kv in labels))
+                counters[key] = counters.get(key, 0.0) + v
+            for name, labels, h in snap["histograms"]:
+                key = (name, tuple(tuple(kv) for kv in labels))
+                acc = histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+                acc["buckets"] = [a + b for a, b in zip(acc["buckets"], h["buckets"])]
+                acc["count"] += h["count"]
+                acc["sum"] += h["sum"]
+        return counters, histograms
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        counters, histograms = self.merged()
+        lines: List[str] = []
+        for name, (kind, help_text) in METRICS.items():
+            series = counters if kind == "counter" else histograms
+            keys = sorted(k for k in series if k[0] == name)
+            if not keys:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in keys:
+                labels = key[1]
+                if kind == "counter":
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(series[key])}")
+                    continue
+                h = series[key]
+                for bound, n in zip(LATENCY_BUCKETS, h["buckets"]):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _fmt_value(bound)),))} {n}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {h['count']}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(h['sum'])}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _fmt_value(v: float) -> str:
+    return repr(int(v)) if float(v).is_integer() else repr(round(v, 6))
+
+registry = MetricsRegistry()
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    registry.inc(name, value, **labels)
+
+def observe(name: str, value: float, **labels: str) -> None:
+    registry.observe(name, value, **labels)
+
+def metrics_snapshot() -> Dict[str, Any]:
+    return registry.snapshot()
+
+def absorb_metrics(snapshot: Optional[Dict[str, Any]]) -> None:
+    registry.absorb(snapshot)
+
+def record_llm_usage(model: str, outcome: str, usage: Dict[str, Any], seconds: Optional[float] = None) -> None:
+    """ask_gpt 1회 결과 기록 (현재 라벨 + model). 토큰은 usage의 과금분 그대로"""
+    inc("llm_requests_total", model=model, outcome=outcome)
+    if seconds is not None:
+        observe("llm_request_seconds", seconds, model=model)
+    prompt = int(usage.get("prompt_tokens", 0) or 0)
+    cached = int(usage.get("cached_tokens", 0) or 0)
+    completion = int(usage.get("completion_tokens", 0) or 0)
+    for kind, n in (("cached_prompt", cached), ("non_cached_prompt", prompt - cached), ("completion", completion)):
+        if n:
+            inc("llm_tokens_total", n, model=model, kind=kind)
+
+def write_metrics(path: str) -> None:
+    """Prometheus 텍스트 파일 덤프 (node_exporter textfile collector 등에서 읽어도 반쯤 쓴 파일이 보이지 않도록 교체)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 스크레이프마다 콘솔 출력하지 않음
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """백그라운드 스레드로 /metrics 엔드포인트 시작 (부모 프로세스에서만 호출)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
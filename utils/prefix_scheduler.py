@@ -0,0 +1,163 @@
+# utils/prefix_scheduler.py
+from __future__ import annotations
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+def _cached_tokens(usage: Dict[str, Any]) -> int:
+    """API usage의 cached_tokens (ask_gpt가 노출) 또는 prompt_tokens_details.cached_tokens (없으면 0)"""
+    if "cached_tokens" in usage:
+        return int(usage["cached_tokens"] or 0)
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens", 0) or 0)
+
+def _new_prefix_stat() -> Dict[str, int]:
+    return {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "response_cache_hits": 0}
+
+def _with_ratio(stats: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for key, s in stats.items():
+        s = dict(s)
+        s["hit_ratio"] = round(s["cached_tokens"] / s["prompt_tokens"], 4) if s["prompt_tokens"] else 0.0
+        out[key] = s
+    return out
+
+def diff_prefix_stats(now: Dict[str, Dict[str, Any]], before: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """두 스냅샷 사이 구간의 접두사별 통계 (파일 단위 집계용)"""
+    out = {}
+    for key, s in now.items():
+        prev = before.get(key, {})
+        delta = {k: s[k] - prev.get(k, 0) for k in _new_prefix_stat()}
+        if delta["requests"]:
+            out[key] = delta
+    return _with_ratio(out)
+
+def merge_prefix_stats(stats_list: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """파일/프로세스별 접두사 통계 합산"""
+    merged: Dict[str, Dict[str, int]] = {}
+    for stats in stats_list:
+        for key, s in (stats or {}).items():
+            acc = merged.setdefault(key, _new_prefix_stat())
+            for k in acc:
+                acc[k] += s.get(k, 0)
+    return _with_ratio(merged)
+
+class ScheduledRequest:
+    """submit()이 돌려주는 핸들. result()에서 아직 전송 전이면 즉시 flush."""
+
+    def __init__(self, scheduler: "PrefixScheduler", prefix_key: str, messages: List[dict], model: str):
+        self.prefix_key = prefix_key
+        self.messages = messages
+        self.model = model
+        self._scheduler = scheduler
+        self.context = contextvars.copy_context()  # 제출 시점 컨텍스트 (계측 라벨이 전송 스레드로 따라가도록)
+        self._done = threading.Event()
+        self._result: Optional[Tuple[Any, Dict[str, Any]]] = None
+
+    def _set(self, result: Tuple[Any, Dict[str, Any]]) -> None:
+        self._result = result
+        self._done.set()
+
+    def result(self) -> Tuple[Any, Dict[str, Any]]:
+        if not self._done.is_set():
+            self._scheduler.flush()
+        self._done.wait()
+        return self._result
+
+class PrefixScheduler:
+    """
+    system 접두사(_system_prefix_cache 키)가 같은 요청끼리 몰아서 연속 전송하는 스케줄러.
+    - submit(prefix_key, messages): 큐에 적재 (window_size 도달 시 즉시 flush)
+    - 첫 적재 후 window_seconds가 지나면 타이머로 flush (여러 스레드가 공유할 때)
+    - flush: 큐를 접두사 키별로 묶어(첫 등장 순서) 그룹 단위로 back-to-back 전송
+    - max_parallel > 1: 그룹의 첫 요청을 단독 전송해 접두사 캐시를 채운 뒤 나머지를 동시 전송
+      (실제 동시 호출 수는 llm_client의 AIMD 제어기가 다시 제한)
+    OpenAI prompt caching은 같은 접두사가 짧은 간격으로 들어올 때 적중하므로
+    줄 단위로 카테고리 감지/검수가 섞여 나가는 것을 막는 용도.
+    접두사별 적중률은 usage.prompt_tokens_details.cached_tokens 기준으로 집계.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Tuple[Any, Dict[str, Any]]],
+        window_size: int = 64,
+        window_seconds: float = 0.5,
+        max_parallel: int = 1,
+    ):
+        self._send = send
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.max_parallel = max_parallel
+        self._queue: List[ScheduledRequest] = []
+        self._lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def submit(self, prefix_key: str, messages: List[dict], model: str = "gpt-4o") -> ScheduledRequest:
+        req = ScheduledRequest(self, prefix_key, messages, model)
+        with self._lock:
+            self._queue.append(req)
+            full = len(self._queue) >= self.window_size
+            if not full and self._timer is None and self.window_seconds > 0:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return req
+
+    def flush(self) -> None:
+        """대기 중인 요청을 접두사별로 묶어 전송 (flush끼리는 직렬화해 그룹이 섞이지 않도록)"""
+        with self._dispatch_lock:
+            with self._lock:
+                queue, self._queue = self._queue, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not queue:
+                return
+
+            groups: "OrderedDict[str, List[ScheduledRequest]]" = OrderedDict()
+            for req in queue:
+                groups.setdefault(req.prefix_key, []).append(req)
+
+            pool = ThreadPoolExecutor(max_workers=self.max_parallel) if self.max_parallel > 1 else None
+            try:
+                for reqs in groups.values():
+                    self._dispatch(reqs[0])
+                    if pool is not None:
+                        list(pool.map(self._dispatch, reqs[1:]))
+                    else:
+                        for req in reqs[1:]:
+                            self._dispatch(req)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+    def _dispatch(self, req: ScheduledRequest) -> None:
+        try:
+            reply, usage = req.context.run(self._send, req.messages, model=req.model)
+        except Exception as e:
+            print(f"PrefixScheduler 전송 오류: {e}")
+            reply, usage = "error", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        self._record(req.prefix_key, usage)
+        req._set((reply, usage))
+
+    def _record(self, prefix_key: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            s = self._stats.setdefault(prefix_key, _new_prefix_stat())
+            s["requests"] += 1
+            if usage.get("cache_hit"):
+                # 로컬 응답 캐시 적중 → API 호출 없음 (적중률 분모에서 제외)
+                s["response_cache_hits"] += 1
+                return
+            s["prompt_tokens"] += int(usage.get("prompt_tokens", 0) or 0)
+            s["cached_tokens"] += _cached_tokens(usage)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """접두사 키별 {requests, prompt_tokens, cached_tokens, response_cache_hits, hit_ratio}"""
+        with self._lock:
+            return _with_ratio(self._stats)
@@ -0,0 +1,84 @@
+# utils/run_journal.py
+from __future__ import annotations
+import os
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from utils.tracing import timed
+
+JOURNAL_DIRNAME = "_journal"
+
+class FileJournal:
+    """
+    입력 파일 1개의 append-only JSONL 저널 (<journal_dir>/<filename>.jsonl).
+    - {"type": "line", "line_no": n, "verdict": {...}, "usage": {...}} : 라인 판정 완료
+    - {"type": "done", "usage": {...}}                                : 파일 처리 완료 (process_file 반환 usage)
+    프로세스가 중간에 죽어도 기록된 줄까지는 남도록 매 기록마다 flush.
+    마지막 줄이 잘려 있으면(쓰는 도중 종료) 그 줄만 무시.
+    """
+
+    def __init__(self, journal_dir: str, filename: str):
+        self.path = os.path.join(journal_dir, f"{filename}.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(journal_dir, exist_ok=True)
+
+    def _read_records(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with timed("io"), open(self.path, "r", encoding="utf-8") as f:
+            for raw in f:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    records.append(json.loads(raw))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def load(self) -> Tuple[Dict[int, Tuple[Any, Dict[str, int]]], Optional[Dict[str, Any]]]:
+        """(완료된 라인 {line_no: (verdict, usage)}, 파일 완료 usage 또는 None)"""
+        lines = {}
+        done = None
+        for rec in self._read_records():
+            if rec.get("type") == "line":
+                lines[int(rec["line_no"])] = (rec.get("verdict"), rec.get("usage", {}))
+            elif rec.get("type") == "done":
+                done = rec.get("usage")
+        return lines, done
+
+    def _append(self, record: dict) -> None:
+        with timed("io"):
+            line = json.dumps(record, ensure_ascii=False)
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                    f.flush()
+
+    def record_line(self, line_no: int, verdict: Any, usage: Dict[str, int]) -> None:
+        self._append({"type": "line", "line_no": line_no, "verdict": verdict, "usage": usage})
+
+    def record_done(self, usage: Dict[str, Any]) -> None:
+        self._append({"type": "done", "usage": usage})
+
+    def reset(self) -> None:
+        """새로 처음부터 처리할 때 기존 저널 삭제"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+def rebuild_usage_log(journal_dir: str) -> Dict[str, Dict[str, Any]]:
+    """저널 디렉토리에서 처리 완료된 파일들의 usage를 모아 {filename: usage}로 복원"""
+    usage_log = {}
+    if not os.path.isdir(journal_dir):
+        return usage_log
+    for name in sorted(os.listdir(journal_dir)):
+        if not name.endswith(".jsonl"):
+            continue
+        filename = name[: -len(".jsonl")]
+        _, done = FileJournal(journal_dir, filename).load()
+        if done is not None:
+            usage_log[filename] = done
+    return usage_log
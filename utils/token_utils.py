@@ -1,30 +1,45 @@
 # token_utils.py
 from __future__ import annotations
+from functools import lru_cache
 from typing import List, Dict, Any
-import tiktoken
+
+from utils.tracing import timed
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None  # 폴백 사용
 
 _MODEL_TO_ENCODING = {
-    "gpt-4o": "o200k_base",         
+    "gpt-4o": "o200k_base",
     "gpt-5": "cl100k_base"
 }
 
-def _get_encoding_name(model: str) -> str:
-    # tiktoken이 직접 모델명을 인식하면 그걸 사용하고,
-    # 아니면 우리가 정의한 매핑 → 마지막엔 cl100k_base로 안전 fallback
+@lru_cache(maxsize=None)
+def get_encoder(model: str):
+    """
+    모델별 tiktoken 인코더 (프로세스당 모델마다 1회만 생성).
+    tiktoken이 직접 모델명을 인식하면 그걸 사용하고,
+    아니면 우리가 정의한 매핑 → 마지막엔 cl100k_base로 안전 fallback.
+    tiktoken 미설치 시 None (폴백 카운트 사용)
+    """
+    if tiktoken is None:
+        return None
     try:
-        tiktoken.encoding_for_model(model)
-        return model
+        return tiktoken.encoding_for_model(model)
     except KeyError:
         pass
-    return _MODEL_TO_ENCODING.get(model, "cl100k_base")
+    return tiktoken.get_encoding(_MODEL_TO_ENCODING.get(model, "cl100k_base"))
 
 def count_tokens(text: str, model: str) -> int:
-    enc_name = _get_encoding_name(model)
-    try:
-        enc = tiktoken.encoding_for_model(enc_name)
-    except KeyError:
-        enc = tiktoken.get_encoding(enc_name)
-    return len(enc.encode(text))
+    if not text:
+        return 0
+    with timed("tokenize"):
+        enc = get_encoder(model)
+        if enc is None:
+            # 매우 보수적인 폴백(공백 단위 근사) — 비용 추정용
+            return max(1, len(text.split()))
+        return len(enc.encode(text))
 
 def count_message_tokens(messages: List[Dict[str, Any]], model: str) -> int:
     """
@@ -36,23 +51,27 @@ def count_message_tokens(messages: List[Dict[str, Any]], model: str) -> int:
         total += count_tokens(m.get("content", "") or "", model)
     return total
 
-def split_and_count_cached_non_cached(messages: List[Dict[str, Any]], model: str) -> Dict[str, int]:
+def split_and_count_cached_non_cached(
+    messages: List[Dict[str, Any]],
+    model: str,
+    system_tokens: int | None = None,
+) -> Dict[str, int]:
     """
     system 메시지를 '전부 cached input', user/assistant를 'non-cached input'으로 가정해 분리 계측.
     (우리 설계상 system=고정접두사, user=변동이므로 합리적)
+    system_tokens: 미리 계산해 둔 system 접두사 토큰 수 (주면 system은 다시 인코딩하지 않음)
     """
     cached = 0
     non_cached = 0
     for m in messages:
         role = m.get("role", "")
         content = m.get("content", "") or ""
-        n = count_tokens(content, model)
         if role == "system":
-            cached += n
+            cached += system_tokens if system_tokens is not None else count_tokens(content, model)
         elif role in ("user", "assistant"):
-            non_cached += n
+            non_cached += count_tokens(content, model)
         else:
-            non_cached += n  # 혹시 모르는 커스텀 role은 비캐시로 처리
+            non_cached += count_tokens(content, model)  # 혹시 모르는 커스텀 role은 비캐시로 처리
     return {
         "cached_input_tokens": cached,
         "non_cached_input_tokens": non_cached
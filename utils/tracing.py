@@ -0,0 +1,213 @@
+# utils/tracing.py
+"""
+span 추적 (run → folder → file → line → llm) → JSONL. 분석은 trace_report.py.
+
+- start_tracing(trace_dir): 켜기 (프로세스마다 trace-<pid>.jsonl, 프로세스 풀이면 initializer로 워커에서도 호출)
+  꺼져 있으면 span/timed는 아무것도 하지 않는 공용 객체를 돌려줌 (호출부 분기 불필요)
+- 현재 span은 contextvar로 전달: 스레드 풀은 contextvars.copy_context()(metrics.in_context)로 넘겨야 부모가 이어짐
+- span 레코드: {id, parent, name, pid, thread, start(epoch), dur_ms, times_ms, attrs}
+  times_ms: timed(kind)로 그 span 안에서 누적한 시간 (net = API 전송, wait = RPM/TPM·동시 호출 한도·백오프 대기,
+  tokenize = 로컬 토큰 계측, io = JSON 입출력·저널·응답 캐시). 하위 span 시간은 포함하지 않음
+- 프로세스 경계를 넘는 부모는 start_span(parent=id)로 직접 지정
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_FILE_PREFIX = "trace-"
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+_ids = itertools.count(1)
+_tracer: Optional["_Tracer"] = None
+
+class _Tracer:
+    """프로세스당 1개. 레코드를 줄 단위로 바로 기록 (중간에 죽어도 끝난 span은 남도록)"""
+
+    def __init__(self, trace_dir: str):
+        os.makedirs(trace_dir, exist_ok=True)
+        self.trace_dir = trace_dir
+        self.pid = os.getpid()
+        self.path = os.path.join(trace_dir, f"{TRACE_FILE_PREFIX}{self.pid}.jsonl")
+        self._lock = threading.Lock()
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._f.write(line + "\n")
+
+class Span:
+    """진행 중인 span. end() 시 기록. set()으로 속성 추가, timed()/add_time()으로 구간 시간 누적"""
+
+    def __init__(self, name: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.id = f"{os.getpid()}-{next(_ids)}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.times: Dict[str, float] = {}
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._token: Optional[contextvars.Token] = None
+        self._ended = False
+
+    def __bool__(self) -> bool:
+        return True
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add_time(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self.times[kind] = self.times.get(kind, 0.0) + seconds
+
+    def activate(self) -> "Span":
+        """이 span을 현재 컨텍스트의 부모로 설정 (end()에서 되돌림). with로 감싸기 어려운 긴 블록용"""
+        self._token = _current.set(self)
+        return self
+
+    def end(self, **attrs: Any) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        self.attrs.update(attrs)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        if _tracer is None:
+            return
+        with self._lock:
+            times = {k: round(v * 1000, 3) for k, v in self.times.items()}
+        _tracer.write({
+            "id": self.id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+            "start": round(self.start, 6),
+            "dur_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "times_ms": times,
+            "attrs": self.attrs,
+        })
+
+class _NullSpan:
+    """추적 꺼짐: 모든 메서드가 no-op, bool 값은 False (비싼 속성 계산은 if s: 로 건너뛰기)"""
+    id = None
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def add_time(self, kind: str, seconds: float) -> None:
+        pass
+
+    def activate(self) -> "_NullSpan":
+        return self
+
+    def end(self, **attrs: Any) -> None:
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Timer:
+    __slots__ = ("kind", "_t0")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self.kind, time.perf_counter() - self._t0)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def start_tracing(trace_dir: str) -> None:
+    """이 프로세스의 추적 시작 (같은 프로세스에서 다시 불러도 1회만)"""
+    global _tracer
+    if _tracer is None or _tracer.pid != os.getpid():
+        _tracer = _Tracer(trace_dir)
+
+def tracing_enabled() -> bool:
+    return _tracer is not None and _tracer.pid == os.getpid()
+
+def current_span_id() -> Optional[str]:
+    """프로세스 풀 작업에 넘길 부모 span id (없으면 None)"""
+    s = _current.get()
+    return s.id if s is not None else None
+
+def start_span(name: str, parent: Optional[str] = None, **attrs: Any):
+    """span 시작 (현재 컨텍스트는 바꾸지 않음). parent 미지정 시 현재 span이 부모"""
+    if not tracing_enabled():
+        return _NULL_SPAN
+    if parent is None:
+        cur = _current.get()
+        parent = cur.id if cur is not None else None
+    return Span(name, parent, attrs)
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attrs: Any) -> Iterator[Any]:
+    """with span("file", path=...) as s: ... → 블록 안 호출의 부모가 됨"""
+    s = start_span(name, parent, **attrs)
+    if not s:
+        yield s
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+@contextmanager
+def use_span(s) -> Iterator[None]:
+    """이미 시작한 span을 잠시 현재 span으로 (여러 줄을 번갈아 진행하는 라운드 실행용)"""
+    if not s:
+        yield
+        return
+    token = _current.set(s)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+def annotate(**attrs: Any) -> None:
+    """현재 span에 속성 추가 (없으면 무시)"""
+    s = _current.get()
+    if s is not None:
+        s.set(**attrs)
+
+def add_time(kind: str, seconds: float) -> None:
+    """현재 span의 kind 시간 누적 (없으면 무시)"""
+    s = _current.get()
+    if s is not None:
+        s.add_time(kind, seconds)
+
+def timed(kind: str):
+    """with timed("io"): ... → 현재 span times_ms[kind]에 누적 (추적 꺼져 있으면 거의 비용 없음)"""
+    if _tracer is None:
+        return _NULL_TIMER
+    return _Timer(kind)